@@ -0,0 +1,34 @@
+"""add notification digest
+
+Revision ID: c3d4e5f6a7b8
+Revises: b2c3d4e5f6a7
+Create Date: 2026-02-15 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d4e5f6a7b8'
+down_revision: Union[str, None] = 'b2c3d4e5f6a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Chave compartilhada pelas notificacoes enviadas no mesmo e-mail digest
+    op.add_column(
+        'notifications',
+        sa.Column('digest_key', sa.String(36), nullable=True),
+    )
+    op.create_index(
+        'ix_notifications_digest_key', 'notifications', ['digest_key'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_digest_key')
+    op.drop_column('notifications', 'digest_key')
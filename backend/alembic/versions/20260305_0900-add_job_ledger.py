@@ -0,0 +1,55 @@
+"""add job ledger
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-03-05 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, None] = 'f6a7b8c9d0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Execuções dos jobs agendados (uma por job e chave, ex: data)
+    op.create_table(
+        'job_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_name', sa.String(100), nullable=False),
+        sa.Column('run_key', sa.String(100), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='running'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_name', 'run_key', name='uq_job_runs_job_run_key'),
+    )
+    op.create_index('ix_job_runs_id', 'job_runs', ['id'])
+
+    # Etapas e itens concluídos de cada execução (checkpoints)
+    op.create_table(
+        'job_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_run_id', sa.Integer(), sa.ForeignKey('job_runs.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('item_key', sa.String(150), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_run_id', 'item_key', name='uq_job_items_run_item_key'),
+    )
+    op.create_index('ix_job_items_id', 'job_items', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_items_id')
+    op.drop_table('job_items')
+    op.drop_index('ix_job_runs_id')
+    op.drop_table('job_runs')
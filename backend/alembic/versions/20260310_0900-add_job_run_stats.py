@@ -0,0 +1,31 @@
+"""add job run stats
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-03-10 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8c9d0e1f2a3'
+down_revision: Union[str, None] = 'a7b8c9d0e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Medições por etapa dos jobs (duração, linhas, e-mails, falhas)
+    op.add_column('job_runs', sa.Column('stats', postgresql.JSONB(), nullable=True))
+    # Consulta das execuções mais recentes por job (admin e /metrics)
+    op.create_index('ix_job_runs_job_started', 'job_runs', ['job_name', 'started_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_runs_job_started')
+    op.drop_column('job_runs', 'stats')
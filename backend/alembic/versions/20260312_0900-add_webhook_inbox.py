@@ -0,0 +1,50 @@
+"""add webhook inbox
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-03-12 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d0e1f2a3b4'
+down_revision: Union[str, None] = 'b8c9d0e1f2a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Inbox de webhooks do Mercado Pago (processada pelo worker)
+    op.create_table(
+        'webhook_inbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(30), nullable=False, server_default='mercadopago'),
+        sa.Column('dedupe_key', sa.String(200), nullable=False),
+        sa.Column('event_type', sa.String(50), nullable=False),
+        sa.Column('action', sa.String(100), nullable=True),
+        sa.Column('resource_id', sa.String(100), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('provider', 'dedupe_key', name='uq_webhook_inbox_provider_dedupe_key'),
+    )
+    op.create_index('ix_webhook_inbox_id', 'webhook_inbox', ['id'])
+    op.create_index('ix_webhook_inbox_status_available', 'webhook_inbox', ['status', 'available_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_webhook_inbox_status_available')
+    op.drop_index('ix_webhook_inbox_id')
+    op.drop_table('webhook_inbox')
@@ -0,0 +1,50 @@
+"""add mercadopago plans cache
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-03-15 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd0e1f2a3b4c5'
+down_revision: Union[str, None] = 'c9d0e1f2a3b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Planos (preapproval_plan) do Mercado Pago reaproveitados entre checkouts
+    op.create_table(
+        'mercadopago_plans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('subscription_plan_id', sa.Integer(), sa.ForeignKey('subscription_plans.id'), nullable=True),
+        sa.Column('definition_key', sa.String(64), nullable=False),
+        sa.Column('reason', sa.String(255), nullable=False),
+        sa.Column('transaction_amount', sa.Float(), nullable=False),
+        sa.Column('frequency', sa.Integer(), nullable=False),
+        sa.Column('frequency_type', sa.String(20), nullable=False),
+        sa.Column('mp_plan_id', sa.String(100), nullable=False),
+        sa.Column('init_point', sa.String(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('mp_plan_id'),
+    )
+    op.create_index('ix_mercadopago_plans_id', 'mercadopago_plans', ['id'])
+    # Um plano ativo por definição
+    op.create_index(
+        'uq_mercadopago_plans_active_definition', 'mercadopago_plans', ['definition_key'],
+        unique=True, postgresql_where=sa.text('is_active')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_mercadopago_plans_active_definition')
+    op.drop_index('ix_mercadopago_plans_id')
+    op.drop_table('mercadopago_plans')
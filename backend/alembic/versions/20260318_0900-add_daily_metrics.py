@@ -0,0 +1,39 @@
+"""add daily metrics rollup
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-03-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f2a3b4c5d6'
+down_revision: Union[str, None] = 'd0e1f2a3b4c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Métricas diárias pré-calculadas do painel administrativo
+    op.create_table(
+        'daily_metrics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('metric', sa.String(50), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('dimension', sa.String(50), nullable=False, server_default=''),
+        sa.Column('value', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('metric', 'day', 'dimension', name='uq_daily_metrics_metric_day_dimension'),
+    )
+    op.create_index('ix_daily_metrics_id', 'daily_metrics', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_daily_metrics_id')
+    op.drop_table('daily_metrics')
@@ -0,0 +1,48 @@
+"""add admin listing indexes
+
+Revision ID: f2a3b4c5d6e7
+Revises: e1f2a3b4c5d6
+Create Date: 2026-03-20 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a3b4c5d6e7'
+down_revision: Union[str, None] = 'e1f2a3b4c5d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Paginação keyset das listagens administrativas (coluna de ordenação, id)
+    op.create_index('ix_users_professional_created', 'users', ['is_professional', 'created_at', 'id'])
+    op.create_index('ix_users_professional_name', 'users', ['is_professional', 'name', 'id'])
+    op.create_index('ix_subscriptions_status_created', 'subscriptions', ['status', 'created_at', 'id'])
+
+    # Busca por nome/e-mail com ILIKE '%termo%' (pg_trgm já criada em add_search_indexes)
+    op.create_index(
+        'ix_users_name_trgm',
+        'users',
+        ['name'],
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_users_email_trgm',
+        'users',
+        ['email'],
+        postgresql_using='gin',
+        postgresql_ops={'email': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_email_trgm')
+    op.drop_index('ix_users_name_trgm')
+    op.drop_index('ix_subscriptions_status_created')
+    op.drop_index('ix_users_professional_name')
+    op.drop_index('ix_users_professional_created')
@@ -0,0 +1,58 @@
+"""add incremental rating aggregates
+
+Revision ID: a3b4c5d6e7f8
+Revises: f2a3b4c5d6e7
+Create Date: 2026-03-22 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3b4c5d6e7f8'
+down_revision: Union[str, None] = 'f2a3b4c5d6e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Soma das notas e histograma por estrela, atualizados a cada avaliação
+    op.add_column('users', sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column(
+        'users',
+        sa.Column('rating_histogram', postgresql.ARRAY(sa.Integer()), nullable=False, server_default='{0,0,0,0,0}')
+    )
+
+    # Preencher a partir das avaliações existentes
+    op.execute("""
+        UPDATE users u SET
+            total_reviews = r.total,
+            rating_sum = r.rating_sum,
+            rating_histogram = r.histogram,
+            average_rating = round(r.rating_sum::numeric / r.total, 2)
+        FROM (
+            SELECT
+                professional_id,
+                count(*) AS total,
+                sum(rating) AS rating_sum,
+                ARRAY[
+                    count(*) FILTER (WHERE rating = 1),
+                    count(*) FILTER (WHERE rating = 2),
+                    count(*) FILTER (WHERE rating = 3),
+                    count(*) FILTER (WHERE rating = 4),
+                    count(*) FILTER (WHERE rating = 5)
+                ]::integer[] AS histogram
+            FROM reviews
+            GROUP BY professional_id
+        ) r
+        WHERE u.id = r.professional_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'rating_histogram')
+    op.drop_column('users', 'rating_sum')
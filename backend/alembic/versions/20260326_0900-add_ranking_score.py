@@ -0,0 +1,38 @@
+"""add search ranking score
+
+Revision ID: c5d6e7f8a9b0
+Revises: b4c5d6e7f8a9
+Create Date: 2026-03-26 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d6e7f8a9b0'
+down_revision: Union[str, None] = 'b4c5d6e7f8a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Pontuação de ranking da busca e os acumulados usados no cálculo.
+    # Preenchidos pelo job ranking_refresh (python -m app.tasks.run_job ranking_refresh)
+    op.add_column('users', sa.Column('ranking_score', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('rating_decayed_sum', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('rating_decayed_weight', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('rating_decayed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('users', sa.Column('appointments_completed', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('appointments_cancelled', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'appointments_cancelled')
+    op.drop_column('users', 'appointments_completed')
+    op.drop_column('users', 'rating_decayed_at')
+    op.drop_column('users', 'rating_decayed_weight')
+    op.drop_column('users', 'rating_decayed_sum')
+    op.drop_column('users', 'ranking_score')
@@ -7,6 +7,14 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "postgresql+asyncpg://user:password@db/faz_de_tudo"
 
+    # Pools de conexão (web e jobs agendados)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_JOBS_POOL_SIZE: int = 2
+    DB_JOBS_MAX_OVERFLOW: int = 4  # Inclui as conexões que seguram os locks dos jobs
+    DB_POOL_TIMEOUT: int = 30  # Segundos aguardando uma conexão livre
+    DB_POOL_RECYCLE: int = 1800  # Segundos até renovar uma conexão
+
     @field_validator('DATABASE_URL')
     @classmethod
     def convert_database_url(cls, v: str) -> str:
@@ -39,6 +47,12 @@ class Settings(BaseSettings):
     # Mercado Pago
     MERCADOPAGO_ACCESS_TOKEN: str = ""
     MERCADOPAGO_PUBLIC_KEY: str = ""
+    MERCADOPAGO_WEBHOOK_SECRET: str = ""  # Assinatura secreta dos webhooks (x-signature). Vazio = não valida
+    MERCADOPAGO_API_URL: str = "https://api.mercadopago.com"
+    MERCADOPAGO_TIMEOUT_SECONDS: float = 10.0
+    MERCADOPAGO_MAX_RETRIES: int = 3  # Falhas de rede, 429 e 5xx
+    MERCADOPAGO_BREAKER_THRESHOLD: int = 5  # Falhas seguidas para abrir o circuit breaker
+    MERCADOPAGO_BREAKER_RESET_SECONDS: float = 30.0
 
     # URLs
     FRONTEND_URL: str = "http://localhost:5173"
@@ -56,6 +70,10 @@ class Settings(BaseSettings):
     CLOUDINARY_API_SECRET: str = ""
     MAX_UPLOAD_SIZE: int = 5 * 1024 * 1024  # 5MB
     ALLOWED_EXTENSIONS: set = {".jpg", ".jpeg", ".png", ".webp"}
+    IMAGE_VARIANT_WIDTHS: list = [320, 640, 1280]  # Larguras das variantes WebP (armazenamento local)
+    IMAGE_THUMBNAIL_SIZE: int = 160  # Miniatura quadrada, em pixels
+    IMAGE_WEBP_QUALITY: int = 80
+    IMAGE_PROCESS_WORKERS: int = 2  # Processos do pool de processamento de imagens
 
     # SMTP Configuration (Titan/GoDaddy)
     SMTP_HOST: str = ""
@@ -74,6 +92,66 @@ class Settings(BaseSettings):
     # Email Provider (smtp ou resend)
     EMAIL_PROVIDER: str = "smtp"  # Mude para "resend" no Railway
 
+    # Digest de notificacoes (agrupa e-mails do mesmo destinatario)
+    NOTIFICATION_DIGEST_ENABLED: bool = True
+    NOTIFICATION_DIGEST_WINDOW_MINUTES: int = 15  # Janela de agrupamento
+
+    # Worker (python -m app.worker): scheduler e envio da fila de e-mails.
+    # Com True a própria API roda o worker (deploy com um único processo)
+    RUN_WORKER_IN_API: bool = True
+    OUTBOX_POLL_SECONDS: float = 2.0
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_CONCURRENCY: int = 5  # E-mails simultâneos por lote
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_SENDING_TIMEOUT_MINUTES: int = 10  # Libera envios presos (worker caiu)
+
+    # Inbox de webhooks (processada pelo worker)
+    WEBHOOK_POLL_SECONDS: float = 2.0
+    WEBHOOK_BATCH_SIZE: int = 20
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_PROCESSING_TIMEOUT_MINUTES: int = 10
+
+    # Reconciliação de assinaturas com o Mercado Pago
+    RECONCILIATION_PAGE_SIZE: int = 100  # Preapprovals por página da busca do MP
+    RECONCILIATION_CONCURRENCY: int = 4  # Páginas buscadas em paralelo
+
+    # Métricas diárias do painel administrativo
+    METRICS_COMPACTION_DAYS: int = 3  # Dias recalculados a partir das tabelas pelo job noturno
+
+    # Resumo de avaliações do perfil público (cache em memória)
+    REVIEW_SUMMARY_TTL_SECONDS: int = 300
+    REVIEW_SUMMARY_CACHE_SIZE: int = 5000  # Profissionais mantidos em cache
+
+    # Pontuação de ranking da busca
+    RANKING_PRIOR_MEAN: float = 4.0  # Nota assumida para quem tem poucas avaliações
+    RANKING_PRIOR_WEIGHT: float = 5.0  # Peso da nota prior (em avaliações)
+    RANKING_HALF_LIFE_DAYS: int = 180  # Meia-vida do peso de uma avaliação
+    RANKING_COMPLETION_WEIGHT: float = 0.2  # Peso da taxa de conclusão na pontuação
+
+    # Exportações administrativas
+    EXPORT_BATCH_SIZE: int = 1000  # Linhas buscadas do cursor do servidor por vez
+
+    # Lock dos jobs agendados entre workers ("postgres" ou "memory" para testes)
+    JOB_LOCK_BACKEND: str = "postgres"
+
+    # Jobs diários de assinatura
+    SUBSCRIPTION_JOBS_CHUNK_SIZE: int = 500  # Assinaturas por transação
+    REVIEW_JOBS_CHUNK_SIZE: int = 200  # Agendamentos por transação
+    JOB_WINDOW_MINUTES: int = 60  # Janela esperada de cada job noturno (alerta de duração)
+
+    # Endpoint /metrics (Prometheus). Vazio = endpoint desabilitado
+    METRICS_TOKEN: str = ""
+
+    # Retenção de notificações (linhas antigas vão para notifications_archive)
+    NOTIFICATION_RETENTION_DAYS: int = 90
+    NOTIFICATION_ARCHIVE_BATCH_SIZE: int = 1000
+
+    # Tempo real (SSE/WebSocket)
+    REALTIME_BACKEND: str = "memory"  # "memory" ou "redis" (varios workers ou worker separado)
+    REDIS_URL: str = ""
+    REALTIME_QUEUE_SIZE: int = 100  # Eventos pendentes por conexao
+    REALTIME_KEEPALIVE_SECONDS: int = 25
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,9 +1,13 @@
 # backend/app/database.py
 import os
+from typing import Any, Dict
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
+from .config import settings
+
 load_dotenv(os.path.join(os.path.dirname(__file__), "..", "..", ".env"))
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://postgres:postgres@db:5432/faz_de_tudo")
@@ -12,10 +16,63 @@ DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://postgres:postgres
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+# Pool das requisições HTTP
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=True,
+    future=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+)
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+# Pool separado e menor para jobs agendados e scripts, assim um job pesado
+# não disputa conexões com o tráfego web
+jobs_engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    future=True,
+    pool_size=settings.DB_JOBS_POOL_SIZE,
+    max_overflow=settings.DB_JOBS_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+)
+JobsSessionLocal = sessionmaker(bind=jobs_engine, class_=AsyncSession, expire_on_commit=False)
+
 Base = declarative_base()
 
+# Registro de todos os engines da aplicação (métricas e shutdown)
+engines = {
+    "web": engine,
+    "jobs": jobs_engine,
+}
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Uso atual de cada pool de conexões"""
+    stats = {}
+    for name, registered_engine in engines.items():
+        pool = registered_engine.pool
+        stats[name] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # SQLAlchemy reporta overflow negativo enquanto o pool não enche
+            "overflow": max(pool.overflow(), 0),
+        }
+    return stats
+
+
+async def dispose_engines():
+    """Fecha as conexões de todos os pools (shutdown da aplicação)"""
+    for registered_engine in engines.values():
+        await registered_engine.dispose()
+
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
@@ -5,25 +5,22 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from datetime import datetime
+from typing import Optional
 from .database import get_db
 from .models import User, SubscriptionPlan, Service
 from .auth_utils import SECRET_KEY, ALGORITHM
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+async def get_user_from_token(token: str, db: AsyncSession) -> Optional[User]:
+    """Valida o JWT e retorna o usuário correspondente (ou None se inválido)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            return None
     except JWTError:
-        raise credentials_exception
+        return None
 
     # Carregar usuário com subscription_plan eager loading
     result = await db.execute(
@@ -31,7 +28,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         .filter(User.email == email)
         .options(selectinload(User.subscription_plan))
     )
-    user = result.scalars().first()
+    return result.scalars().first()
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    user = await get_user_from_token(token, db)
     if user is None:
         raise credentials_exception
     return user
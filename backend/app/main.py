@@ -9,20 +9,17 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
-import pytz
-from .database import engine, Base
+from .database import engine, Base, dispose_engines
 from .routers import (
     users, services, appointments, subscriptions,
     auth, schedule, categories, admin, cep, health, plans,
-    notifications, reviews,
+    notifications, reviews, realtime, metrics, analytics, exports,
 )
-from .services.subscription_jobs import subscription_jobs
-from .services.review_jobs import review_jobs
-
-# Scheduler global
-scheduler = AsyncIOScheduler()
+from .services.realtime import realtime_broker
+from .services.image_processing import shutdown_pool
+from .services.mercadopago_gateway import mercadopago_gateway
+from .config import settings
+from . import worker
 
 # Configurar logging para stdout (Railway)
 logging.basicConfig(
@@ -38,7 +35,7 @@ async def lifespan(app: FastAPI):
     """
     Gerencia o ciclo de vida da aplicacao.
     Cria as tabelas do banco de dados na inicializacao.
-    Inicia o scheduler de jobs.
+    Inicia o worker (scheduler e fila de e-mails) se RUN_WORKER_IN_API.
     """
     # Startup: Criar tabelas
     print("Iniciando aplicacao...")
@@ -47,31 +44,22 @@ async def lifespan(app: FastAPI):
         await conn.run_sync(Base.metadata.create_all)
     print("Tabelas criadas com sucesso!")
 
-    # Iniciar scheduler de jobs
-    print("Configurando scheduler de jobs...")
-    brasilia_tz = pytz.timezone('America/Sao_Paulo')
-    scheduler.add_job(
-        subscription_jobs.run_daily_subscription_jobs,
-        CronTrigger(hour=0, minute=30, timezone=brasilia_tz),
-        id="daily_subscription_jobs",
-        name="Jobs diarios de assinatura",
-        replace_existing=True
-    )
-    scheduler.add_job(
-        review_jobs.run_daily_review_jobs,
-        CronTrigger(hour=1, minute=0, timezone=brasilia_tz),
-        id="daily_review_jobs",
-        name="Jobs diarios de avaliacao",
-        replace_existing=True,
-    )
-    scheduler.start()
-    print("Scheduler iniciado! Jobs agendados: 00:30 assinaturas, 01:00 avaliacoes (Brasilia)")
+    # Canal de eventos em tempo real
+    await realtime_broker.start()
+
+    # Scheduler e fila de e-mails no próprio processo (sem worker dedicado)
+    if settings.RUN_WORKER_IN_API:
+        await worker.start()
 
     yield
 
     # Shutdown: Parar scheduler
-    print("Encerrando scheduler...")
-    scheduler.shutdown()
+    if settings.RUN_WORKER_IN_API:
+        await worker.stop()
+    await realtime_broker.stop()
+    await mercadopago_gateway.close()
+    shutdown_pool()
+    await dispose_engines()
     print("Encerrando aplicacao...")
 
 
@@ -122,6 +110,7 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 # Include routers
 app.include_router(health.router)
+app.include_router(metrics.router)
 app.include_router(users, prefix="/users", tags=["users"])
 app.include_router(services, prefix="/services", tags=["services"])
 app.include_router(
@@ -134,10 +123,13 @@ app.include_router(auth, prefix="/auth", tags=["auth"])
 app.include_router(schedule, prefix="/schedule", tags=["schedule"])
 app.include_router(categories)
 app.include_router(admin, prefix="/admin", tags=["admin"])
+app.include_router(analytics, prefix="/admin/analytics", tags=["admin"])
+app.include_router(exports, prefix="/admin/exports", tags=["admin"])
 app.include_router(cep.router)
 app.include_router(plans, prefix="/plans", tags=["plans"])
 app.include_router(notifications, prefix="/notifications", tags=["notifications"])
 app.include_router(reviews, prefix="/reviews", tags=["reviews"])
+app.include_router(realtime, prefix="/realtime", tags=["realtime"])
 
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
 # backend/app/models.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Time, Date, Float, Text
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Time, Date, Float, Text, Index, LargeBinary, UniqueConstraint
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from .database import Base
 
 class SubscriptionPlan(Base):
@@ -35,6 +36,11 @@ class Category(Base):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Listagens administrativas (paginação keyset em created_at/name, id)
+        Index("ix_users_professional_created", "is_professional", "created_at", "id"),
+        Index("ix_users_professional_name", "is_professional", "name", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -59,6 +65,16 @@ class User(Base):
     # Avaliacao (denormalizados para performance em buscas)
     average_rating = Column(Float, nullable=True)
     total_reviews = Column(Integer, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_histogram = Column(ARRAY(Integer), nullable=False, server_default="{0,0,0,0,0}")  # Avaliacoes por estrela (1 a 5)
+
+    # Ranking da busca (ver services/ranking.py)
+    ranking_score = Column(Float, nullable=False, default=0, server_default="0")
+    rating_decayed_sum = Column(Float, nullable=False, default=0, server_default="0")  # Soma das notas com decaimento
+    rating_decayed_weight = Column(Float, nullable=False, default=0, server_default="0")
+    rating_decayed_at = Column(DateTime(timezone=True), nullable=True)  # Momento de referencia dos acumulados
+    appointments_completed = Column(Integer, nullable=False, default=0, server_default="0")
+    appointments_cancelled = Column(Integer, nullable=False, default=0, server_default="0")
 
     is_active = Column(Boolean, default=True)
     is_professional = Column(Boolean, default=False)
@@ -132,6 +148,10 @@ class Appointment(Base):
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # Listagem administrativa por status (paginação keyset em created_at, id)
+        Index("ix_subscriptions_status_created", "status", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     professional_id = Column(Integer, ForeignKey("users.id"), unique=True)
@@ -184,6 +204,10 @@ class Subscription(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Listagem do usuário ordenada por data (paginação keyset em created_at, id)
+        Index("ix_notifications_user_created", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -194,7 +218,7 @@ class Notification(Base):
     channel = Column(String(20), nullable=False, default="email")  # email, sms, whatsapp, push
 
     # Status
-    status = Column(String(20), default="pending")  # pending, sent, error
+    status = Column(String(20), default="pending")  # pending, queued, sent, error
 
     # Conteúdo
     title = Column(String(255), nullable=False)
@@ -205,11 +229,137 @@ class Notification(Base):
     sent_at = Column(DateTime(timezone=True), nullable=True)
     error_message = Column(Text, nullable=True)
 
+    # Digest: notificacoes enviadas no mesmo e-mail agrupado compartilham a chave
+    digest_key = Column(String(36), nullable=True, index=True)
+
     # Relacionamentos
     user = relationship("User", back_populates="notifications")
     appointment = relationship("Appointment", back_populates="notifications")
 
 
+class EmailOutbox(Base):
+    """
+    Fila de e-mails (transactional outbox).
+    A API e os jobs apenas inserem aqui; o worker (app.worker) faz o envio.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Busca do dispatcher: pendentes prontos para envio, em ordem de chegada
+        Index("ix_email_outbox_status_available", "status", "available_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    notification_id = Column(Integer, nullable=True)  # Notificação atualizada após o envio
+
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    plain_text = Column(Text, nullable=False)
+    html = Column(Text, nullable=True)
+
+    # Status
+    status = Column(String(20), nullable=False, default="pending")  # pending, sending, sent, error
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    available_at = Column(DateTime(timezone=True), server_default=func.now())  # Próxima tentativa
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class MercadoPagoPlan(Base):
+    """
+    Plano de assinatura (preapproval_plan) criado no Mercado Pago.
+    Reaproveitado por todos os checkouts com a mesma definição (valor, frequência).
+    """
+    __tablename__ = "mercadopago_plans"
+    __table_args__ = (
+        # Um plano ativo por definição; invalidados ficam como histórico
+        Index(
+            "uq_mercadopago_plans_active_definition", "definition_key",
+            unique=True, postgresql_where=text("is_active")
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    subscription_plan_id = Column(Integer, ForeignKey("subscription_plans.id"), nullable=True)  # NULL = plano legado (settings)
+    definition_key = Column(String(64), nullable=False)  # Hash da definição enviada ao MP
+
+    reason = Column(String(255), nullable=False)
+    transaction_amount = Column(Float, nullable=False)
+    frequency = Column(Integer, nullable=False)
+    frequency_type = Column(String(20), nullable=False)
+
+    mp_plan_id = Column(String(100), nullable=False, unique=True)
+    init_point = Column(String, nullable=False)  # URL de checkout do plano
+
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class WebhookEvent(Base):
+    """
+    Inbox de webhooks recebidos (Mercado Pago).
+    O endpoint apenas grava o evento e responde 200; o worker processa depois.
+    """
+    __tablename__ = "webhook_inbox"
+    __table_args__ = (
+        # Reentregas do mesmo evento caem na mesma linha
+        UniqueConstraint("provider", "dedupe_key", name="uq_webhook_inbox_provider_dedupe_key"),
+        Index("ix_webhook_inbox_status_available", "status", "available_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(String(30), nullable=False, default="mercadopago")
+    dedupe_key = Column(String(200), nullable=False)
+
+    event_type = Column(String(50), nullable=False)  # preapproval, payment
+    action = Column(String(100), nullable=True)
+    resource_id = Column(String(100), nullable=False)  # data.id do evento
+    payload = Column(JSONB, nullable=False)
+
+    # Status
+    status = Column(String(20), nullable=False, default="pending")  # pending, processing, processed, error
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+    # Timestamps
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    available_at = Column(DateTime(timezone=True), server_default=func.now())  # Próxima tentativa
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class NotificationArchive(Base):
+    """
+    Notificações antigas movidas da tabela notifications pelo job de retenção.
+    A mensagem fica comprimida (zlib); o id original é preservado.
+    """
+    __tablename__ = "notifications_archive"
+    __table_args__ = (
+        Index("ix_notifications_archive_user_created", "user_id", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    appointment_id = Column(Integer, nullable=True)  # Sem FK: o appointment pode ser removido
+
+    type = Column(String(50), nullable=False)
+    channel = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False)
+
+    title = Column(String(255), nullable=False)
+    message_compressed = Column(LargeBinary, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    error_message = Column(Text, nullable=True)
+    digest_key = Column(String(36), nullable=True)
+
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class ReviewToken(Base):
     """Token UUID para avaliacao de servico - uso unico"""
     __tablename__ = "review_tokens"
@@ -232,6 +382,10 @@ class ReviewToken(Base):
 class Review(Base):
     """Avaliacao de um servico prestado"""
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Listagem do perfil publico (paginacao keyset em created_at, id)
+        Index("ix_reviews_professional_created", "professional_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     appointment_id = Column(
@@ -254,3 +408,67 @@ class Review(Base):
     professional = relationship(
         "User", back_populates="reviews_received"
     )
+
+
+class JobRun(Base):
+    """
+    Execução de um job agendado (ledger).
+    Uma linha por job e chave de execução (ex: data); reexecuções retomam a mesma linha.
+    """
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        UniqueConstraint("job_name", "run_key", name="uq_job_runs_job_run_key"),
+        Index("ix_job_runs_job_started", "job_name", "started_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String(100), nullable=False)
+    run_key = Column(String(100), nullable=False)  # Ex: "2026-03-10" para jobs diários
+
+    status = Column(String(20), nullable=False, default="running")  # running, completed, failed
+    attempts = Column(Integer, nullable=False, default=1)
+    error = Column(Text, nullable=True)
+
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Medições por etapa: {"etapa": {"status", "duration_seconds", "rows", "emails", "failures"}}
+    stats = Column(JSONB, nullable=True)
+
+    items = relationship("JobItem", back_populates="job_run", cascade="all, delete-orphan")
+
+
+class JobItem(Base):
+    """Item concluído de uma execução (checkpoint / chave de idempotência)"""
+    __tablename__ = "job_items"
+    __table_args__ = (
+        UniqueConstraint("job_run_id", "item_key", name="uq_job_items_run_item_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_run_id = Column(Integer, ForeignKey("job_runs.id", ondelete="CASCADE"), nullable=False)
+    item_key = Column(String(150), nullable=False)  # Ex: "stage:send_renewal_reminders", "review_email:42"
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    job_run = relationship("JobRun", back_populates="items")
+
+
+class DailyMetric(Base):
+    """
+    Métrica diária pré-calculada para o painel administrativo.
+
+    Eventos (agendamentos, cadastros, cancelamentos, receita) são somados por
+    dia conforme acontecem; fotos do estado atual (profissionais por status,
+    MRR) são gravadas pelo job noturno de compactação.
+    """
+    __tablename__ = "daily_metrics"
+    __table_args__ = (
+        UniqueConstraint("metric", "day", "dimension", name="uq_daily_metrics_metric_day_dimension"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    metric = Column(String(50), nullable=False)  # Ex: "appointments", "cancellations", "mrr"
+    day = Column(Date, nullable=False)
+    dimension = Column(String(50), nullable=False, default="")  # Ex: motivo do cancelamento, UF
+    value = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
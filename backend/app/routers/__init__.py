@@ -17,6 +17,9 @@ from . import categories as _categories
 from . import plans as _plans
 from . import notifications as _notifications
 from . import reviews as _reviews
+from . import realtime as _realtime
+from . import analytics as _analytics
+from . import exports as _exports
 
 # Re‑export only the router objects expected by main.py
 users = _users.router
@@ -30,9 +33,12 @@ categories = _categories.router
 plans = _plans.router
 notifications = _notifications.router
 reviews = _reviews.router
+realtime = _realtime.router
+analytics = _analytics.router
+exports = _exports.router
 
 __all__ = [
     "users", "services", "appointments", "subscriptions",
     "auth", "schedule", "admin", "categories", "plans",
-    "notifications", "reviews",
+    "notifications", "reviews", "realtime", "analytics", "exports",
 ]
@@ -1,14 +1,29 @@
 # backend/app/routers/admin.py
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, extract
+from sqlalchemy import select, func
 from datetime import date, timedelta, datetime
+from typing import Optional
 from pydantic import BaseModel
 from passlib.context import CryptContext
 from ..database import get_db
-from ..models import User, Subscription, Appointment, SubscriptionPlan, Category
+from ..models import User, Subscription, Appointment, SubscriptionPlan, Category, JobRun
 from ..dependencies import get_current_user
 from ..config import settings
+from ..services.cohorts import cohort_analysis
+from ..services.daily_metrics import daily_metrics, month_bounds
+from ..services.job_metrics import run_summary
+from ..services.billing_reconciliation import billing_reconciliation
+from ..services.mercadopago_gateway import MercadoPagoError
+from ..services.admin_listings import (
+    SUBSCRIPTION_SORTS,
+    USER_SORTS,
+    paginate_listing,
+    subscription_listing,
+    subscription_row,
+    user_list_filters,
+    user_row,
+)
 from .auth import validate_password_strength
 
 router = APIRouter()
@@ -20,73 +35,51 @@ async def get_admin_dashboard(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Dashboard administrativo com métricas da plataforma
+    Dashboard administrativo com métricas da plataforma.
+
+    Os números vêm de daily_metrics (eventos somados por dia e foto diária
+    do estado dos profissionais), sem varrer as tabelas a cada carregamento.
     """
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
 
-    # Total de profissionais cadastrados
-    result = await db.execute(
-        select(func.count(User.id)).where(User.is_professional == True)
-    )
-    total_professionals = result.scalar()
+    # Métricas pré-calculadas (daily_metrics): eventos do mês + foto mais recente.
+    # Agendamentos contam o mês inteiro, inclusive os marcados para os próximos dias
+    month_start, month_end = month_bounds(date.today())
+    metrics = await daily_metrics.dashboard_metrics(db, month_start, month_end)
+    if metrics["snapshot_date"] is None:
+        # Primeira carga antes do job noturno: recalcula o mês e tira a foto agora
+        await daily_metrics.initialize()
+        metrics = await daily_metrics.dashboard_metrics(db, month_start, month_end)
 
-    # Total de clientes cadastrados
-    result = await db.execute(
-        select(func.count(User.id)).where(User.is_professional == False, User.is_admin == False)
-    )
-    total_clients = result.scalar()
+    events, gauges = metrics["events"], metrics["gauges"]
 
     # Profissionais por status de assinatura
-    result = await db.execute(
-        select(User.subscription_status, func.count(User.id))
-        .where(User.is_professional == True)
-        .group_by(User.subscription_status)
-    )
-    subscription_stats = {status: count for status, count in result.all()}
-
-    # Faturamento mensal (profissionais ativos * R$ 50)
+    subscription_stats = {status: int(count) for status, count in gauges["professionals"].items()}
+    total_professionals = sum(subscription_stats.values())
+    total_clients = int(gauges["clients"].get("", 0))
     active_professionals = subscription_stats.get('active', 0)
-    monthly_revenue = active_professionals * 50.00
-
-    # Faturamento anual projetado
-    annual_revenue = monthly_revenue * 12
-
-    # Profissionais por estado
-    result = await db.execute(
-        select(User.state, func.count(User.id))
-        .where(User.is_professional == True, User.state.isnot(None))
-        .group_by(User.state)
-    )
-    professionals_by_state = [{"state": state, "count": count} for state, count in result.all()]
-
-    # Profissionais ativos por estado (com assinatura ativa)
-    result = await db.execute(
-        select(User.state, func.count(User.id))
-        .where(
-            and_(
-                User.is_professional == True,
-                User.subscription_status == 'active',
-                User.state.isnot(None)
-            )
-        )
-        .group_by(User.state)
-    )
-    active_professionals_by_state = [{"state": state, "count": count} for state, count in result.all()]
 
-    # Agendamentos do mês atual
-    current_month = date.today().month
-    current_year = date.today().year
-    result = await db.execute(
-        select(func.count(Appointment.id))
-        .where(
-            and_(
-                extract('month', Appointment.date) == current_month,
-                extract('year', Appointment.date) == current_year
-            )
-        )
-    )
-    appointments_this_month = result.scalar()
+    # Profissionais por estado (total e com assinatura ativa)
+    professionals_by_state = [
+        {"state": state, "count": int(count)}
+        for state, count in gauges["professionals_by_state"].items()
+    ]
+    active_professionals_by_state = [
+        {"state": state, "count": int(count)}
+        for state, count in gauges["active_professionals_by_state"].items()
+    ]
+
+    appointments_this_month = int(events["appointments"].get("", 0))
+    new_subscribers_this_month = int(events["new_subscriptions"].get("", 0))
+    cancellations_this_month = int(sum(events["cancellations"].values()))
+
+    # Faturamento pela receita recorrente das assinaturas pagas ativas
+    monthly_revenue = round(gauges["mrr"].get("", 0), 2)
+    annual_revenue = round(monthly_revenue * 12, 2)
+    daily_revenue = round(monthly_revenue / 30, 2)
+    weekly_revenue = round(monthly_revenue / 4.33, 2)
+    per_professional = round(monthly_revenue / active_professionals, 2) if active_professionals else 0.0
 
     # Último agendamento realizado na plataforma
     result = await db.execute(
@@ -97,38 +90,6 @@ async def get_admin_dashboard(
     )
     last_appointment = result.scalar_one_or_none()
 
-    # Novos assinantes do mês atual
-    result = await db.execute(
-        select(func.count(Subscription.id))
-        .where(
-            and_(
-                extract('month', Subscription.created_at) == current_month,
-                extract('year', Subscription.created_at) == current_year
-            )
-        )
-    )
-    new_subscribers_this_month = result.scalar()
-
-    # Cancelamentos do mês atual
-    result = await db.execute(
-        select(func.count(Subscription.id))
-        .where(
-            and_(
-                Subscription.status == 'cancelled',
-                Subscription.cancelled_at.isnot(None),
-                extract('month', Subscription.cancelled_at) == current_month,
-                extract('year', Subscription.cancelled_at) == current_year
-            )
-        )
-    )
-    cancellations_this_month = result.scalar()
-
-    # Faturamento diário (média por dia)
-    daily_revenue = round(active_professionals * (50.00 / 30), 2)
-
-    # Faturamento semanal (média por semana)
-    weekly_revenue = round(active_professionals * (50.00 / 4.33), 2)
-
     # Profissionais mais recentes (últimos 10)
     result = await db.execute(
         select(User)
@@ -155,7 +116,7 @@ async def get_admin_dashboard(
             "weekly": weekly_revenue,
             "monthly": monthly_revenue,
             "annual_projected": annual_revenue,
-            "per_professional": 50.00
+            "per_professional": per_professional
         },
         "last_appointment": {
             "date": last_appointment.date.isoformat() if last_appointment else None,
@@ -163,6 +124,7 @@ async def get_admin_dashboard(
             "created_at": last_appointment.created_at.isoformat() if last_appointment else None,
         } if last_appointment else None,
         "subscription_stats": subscription_stats,
+        "metrics_snapshot_date": metrics["snapshot_date"].isoformat() if metrics["snapshot_date"] else None,
         "professionals_by_state": professionals_by_state,
         "active_professionals_by_state": active_professionals_by_state,
         "recent_professionals": [
@@ -182,79 +144,112 @@ async def get_admin_dashboard(
 
 @router.get("/professionals")
 async def list_all_professionals(
-    status: str = None,
-    state: str = None,
+    status: Optional[str] = None,
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    plan: Optional[str] = Query(None, description="Slug do plano"),
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    q: Optional[str] = Query(None, description="Busca por nome ou e-mail"),
+    sort: str = Query("created_at"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Lista todos os profissionais com filtros opcionais
+    Lista profissionais com filtros, ordenação e paginação por cursor.
+
+    - **cursor**: valor de `next_cursor` da página anterior (`total` só vem na primeira página)
+    - **sort**: created_at ou name; **order**: asc ou desc
     """
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
 
-    query = select(User).where(User.is_professional == True)
+    query = select(
+        User.id,
+        User.name,
+        User.email,
+        User.category,
+        User.city,
+        User.state,
+        User.whatsapp,
+        User.subscription_status,
+        User.subscription_plan_id,
+        User.is_suspended,
+        User.created_at
+    )
 
+    filters = [User.is_professional == True]
     if status:
-        query = query.where(User.subscription_status == status)
-    if state:
-        query = query.where(User.state == state)
-
-    query = query.order_by(User.created_at.desc())
+        filters.append(User.subscription_status == status)
+    if plan:
+        filters.append(
+            User.subscription_plan_id == select(SubscriptionPlan.id)
+            .where(SubscriptionPlan.slug == plan)
+            .scalar_subquery()
+        )
+    filters += user_list_filters(state, city, created_from, created_to, q)
 
-    result = await db.execute(query)
-    professionals = result.scalars().all()
+    rows, next_cursor, total = await paginate_listing(
+        db, query, filters, USER_SORTS, sort, order, size, cursor, User.id
+    )
 
     return {
         "professionals": [
-            {
-                "id": prof.id,
-                "name": prof.name,
-                "email": prof.email,
-                "category": prof.category,
-                "city": prof.city,
-                "state": prof.state,
-                "whatsapp": prof.whatsapp,
-                "subscription_status": prof.subscription_status,
-                "is_suspended": prof.is_suspended,
-                "created_at": prof.created_at.isoformat()
-            }
-            for prof in professionals
+            user_row(row)
+            for row in rows
         ],
-        "total": len(professionals)
+        "total": total,
+        "size": size,
+        "next_cursor": next_cursor
     }
 
 @router.get("/clients")
 async def list_all_clients(
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    q: Optional[str] = Query(None, description="Busca por nome ou e-mail"),
+    sort: str = Query("created_at"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Lista todos os clientes
+    Lista clientes com filtros, ordenação e paginação por cursor
     """
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
 
-    result = await db.execute(
-        select(User)
-        .where(User.is_professional == False, User.is_admin == False)
-        .order_by(User.created_at.desc())
+    query = select(
+        User.id,
+        User.name,
+        User.email,
+        User.city,
+        User.state,
+        User.created_at
+    )
+
+    filters = [User.is_professional == False, User.is_admin == False]
+    filters += user_list_filters(state, city, created_from, created_to, q)
+
+    rows, next_cursor, total = await paginate_listing(
+        db, query, filters, USER_SORTS, sort, order, size, cursor, User.id
     )
-    clients = result.scalars().all()
 
     return {
         "clients": [
-            {
-                "id": client.id,
-                "name": client.name,
-                "email": client.email,
-                "city": client.city,
-                "state": client.state,
-                "created_at": client.created_at.isoformat()
-            }
-            for client in clients
+            user_row(row)
+            for row in rows
         ],
-        "total": len(clients)
+        "total": total,
+        "size": size,
+        "next_cursor": next_cursor
     }
 
 @router.post("/professionals/{professional_id}/suspend")
@@ -307,60 +302,38 @@ async def reactivate_professional(
 
 @router.get("/subscriptions")
 async def list_all_subscriptions(
-    status: str = None,
+    status: Optional[str] = None,
+    plan: Optional[str] = Query(None, description="Slug do plano"),
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    q: Optional[str] = Query(None, description="Busca por nome ou e-mail do profissional"),
+    sort: str = Query("created_at"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Lista todas as assinaturas com informações dos profissionais
+    Lista assinaturas com informações dos profissionais, filtros e
+    paginação por cursor
     """
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
 
-    try:
-        from sqlalchemy.orm import selectinload
-
-        query = select(Subscription).options(
-            selectinload(Subscription.professional)
-        )
-
-        if status:
-            query = query.where(Subscription.status == status)
-
-        query = query.order_by(Subscription.created_at.desc())
-
-        result = await db.execute(query)
-        subscriptions = result.scalars().all()
+    query, filters = subscription_listing(status, plan, state, city, created_from, created_to, q)
+    rows, next_cursor, total = await paginate_listing(
+        db, query, filters, SUBSCRIPTION_SORTS, sort, order, size, cursor, Subscription.id
+    )
 
-        return {
-            "subscriptions": [
-                {
-                    "id": sub.id,
-                    "professional_id": sub.professional_id,
-                    "professional_name": sub.professional.name if sub.professional else None,
-                    "professional_email": sub.professional.email if sub.professional else None,
-                    "professional_category": sub.professional.category if sub.professional else None,
-                    "professional_city": sub.professional.city if sub.professional else None,
-                    "professional_state": sub.professional.state if sub.professional else None,
-                    "plan_amount": sub.plan_amount,
-                    "status": sub.status,
-                    "next_billing_date": sub.next_billing_date.isoformat() if sub.next_billing_date else None,
-                    "last_payment_date": sub.last_payment_date.isoformat() if sub.last_payment_date else None,
-                    "cancelled_at": sub.cancelled_at.isoformat() if sub.cancelled_at else None,
-                    "created_at": sub.created_at.isoformat(),
-                    "mercadopago_subscription_id": sub.mercadopago_subscription_id
-                }
-                for sub in subscriptions
-            ],
-            "total": len(subscriptions)
-        }
-    except Exception as e:
-        # Retorna lista vazia em caso de erro (ex: tabela não existe no banco local)
-        return {
-            "subscriptions": [],
-            "total": 0,
-            "error": str(e)
-        }
+    return {
+        "subscriptions": [subscription_row(row) for row in rows],
+        "total": total,
+        "size": size,
+        "next_cursor": next_cursor
+    }
 
 @router.get("/trial-users")
 async def get_trial_users(
@@ -405,6 +378,26 @@ async def get_trial_users(
         "total": len(trial_users)
     }
 
+@router.get("/cohorts")
+async def get_cohorts(
+    cohorts: int = Query(26, ge=1, le=104, description="Semanas de cadastro"),
+    horizon: int = Query(12, ge=1, le=52, description="Semanas acompanhadas por coorte"),
+    refresh: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Funil trial → pago por coorte semanal de cadastro.
+
+    Para cada semana: cadastros, trials, convertidos e as curvas de
+    conversão e retenção (fração da coorte) semana a semana. O cálculo
+    fica em cache até o dia seguinte (refresh=true recalcula).
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
+
+    return await cohort_analysis.cohorts(db, cohorts, horizon, refresh)
+
 class ExtendTrialRequest(BaseModel):
     user_id: int
     new_trial_end_date: str  # ISO format: "2026-02-15T23:59:59"
@@ -930,3 +923,80 @@ async def delete_category(
         "success": True,
         "message": "Categoria excluída com sucesso"
     }
+
+
+@router.get("/jobs")
+async def list_job_runs(
+    job_name: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Execuções recentes dos jobs agendados com duração, linhas processadas,
+    e-mails enfileirados e falhas de cada etapa.
+
+    window_usage compara a duração com a janela esperada
+    (JOB_WINDOW_MINUTES): valores próximos de 1.0 indicam que o job está
+    chegando no limite.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
+
+    query = select(JobRun)
+    if job_name:
+        query = query.where(JobRun.job_name == job_name)
+
+    result = await db.execute(
+        query.order_by(JobRun.started_at.desc(), JobRun.id.desc()).limit(limit)
+    )
+    runs = result.scalars().all()
+
+    return {
+        "window_minutes": settings.JOB_WINDOW_MINUTES,
+        "runs": [run_summary(run) for run in runs]
+    }
+
+
+@router.post("/billing/reconcile")
+async def reconcile_billing(
+    dry_run: bool = Query(True),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Compara as assinaturas locais com os preapprovals do Mercado Pago e
+    retorna o relatório de divergências.
+
+    Por padrão roda em dry_run (apenas relatório); com dry_run=false aplica
+    as mesmas correções do job diário de reconciliação.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
+
+    try:
+        return await billing_reconciliation.reconcile(dry_run=dry_run)
+    except MercadoPagoError as e:
+        raise HTTPException(status_code=502, detail=f"Erro ao consultar o Mercado Pago: {e}")
+
+
+@router.post("/metrics/recompute")
+async def recompute_daily_metrics(
+    start: date,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Recalcula as métricas diárias de eventos de um período a partir das
+    tabelas (backfill inicial ou correção) e atualiza a foto de hoje.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
+
+    end = end or date.today()
+    if start > end:
+        raise HTTPException(status_code=400, detail="Data inicial maior que a final")
+
+    await daily_metrics.recompute(start, end)
+    await daily_metrics.take_snapshot()
+
+    return {"success": True, "start": start.isoformat(), "end": end.isoformat()}
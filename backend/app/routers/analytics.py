@@ -0,0 +1,71 @@
+"""
+Analytics Router
+Séries temporais do painel administrativo (agendamentos, cadastros,
+cancelamentos e receita) a partir das métricas diárias pré-calculadas
+"""
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_db
+from ..dependencies import get_current_user
+from ..models import User
+from ..services.analytics import SERIES, iter_csv, iter_json, load_timeseries
+
+router = APIRouter()
+
+# Limite de buckets por resposta (anos em dias, décadas em semanas/meses)
+MAX_BUCKETS = 5000
+
+
+@router.get("/timeseries")
+async def get_timeseries(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    bucket: str = Query("day", pattern="^(day|week|month)$"),
+    series: Optional[str] = Query(None, description="Séries separadas por vírgula"),
+    format: str = Query("json", pattern="^(json|csv)$"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Séries temporais agregadas por dia, semana ou mês.
+
+    Séries: appointments, new_professionals, cancellations (total e uma
+    coluna por cancellation_reason_code), revenue (pagamentos pelo
+    plan_amount da assinatura) e mrr (receita recorrente no fim do bucket).
+
+    A resposta é colunar (`buckets` + uma lista por série) em JSON ou CSV,
+    enviada em streaming.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
+
+    end = end or date.today()
+    start = start or end - timedelta(days=90)
+    if start > end:
+        raise HTTPException(status_code=400, detail="Data inicial maior que a final")
+
+    days = (end - start).days + 1
+    if days / {"day": 1, "week": 7, "month": 28}[bucket] > MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail="Período grande demais para o bucket escolhido")
+
+    requested = [name.strip() for name in series.split(",")] if series else list(SERIES)
+    unknown = [name for name in requested if name not in SERIES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Séries desconhecidas: {', '.join(unknown)}")
+
+    timeseries = await load_timeseries(db, start, end, bucket, requested)
+
+    if format == "csv":
+        return StreamingResponse(
+            iter_csv(timeseries),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="analytics-{bucket}-{start}-{end}.csv"'}
+        )
+
+    meta = {"bucket": bucket, "start": start.isoformat(), "end": end.isoformat()}
+    return StreamingResponse(iter_json(timeseries, meta), media_type="application/json")
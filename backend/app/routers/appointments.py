@@ -13,6 +13,8 @@ from ..models import Appointment, User, Service, ReviewToken
 from ..schemas import AppointmentCreate, AppointmentResponse, AppointmentBase, AppointmentStatusUpdate, AppointmentPagination, ManualBlockCreate
 from ..dependencies import get_current_user
 from ..services.notifications import notification_service
+from ..services.ranking import ranking
+from ..services.realtime import publish_appointment_change
 from ..services.notifications.templates import email_templates
 from ..config import settings
 
@@ -142,9 +144,16 @@ async def update_appointment_status(
     else:
         raise HTTPException(status_code=400, detail="Invalid status")
 
+    previous_status = appt.status
     appt.status = new_status
     appt.reason = status_update.reason
 
+    # Contadores de conclusao e pontuacao de ranking do profissional
+    if not appt.is_manual_block:
+        await ranking.record_appointment_status(
+            db, appt.professional_id, previous_status, new_status
+        )
+
     # Se concluido, gerar token de avaliacao na mesma transacao
     token_value = None
     if new_status == "completed":
@@ -157,6 +166,7 @@ async def update_appointment_status(
 
     await db.commit()
     await db.refresh(appt)
+    await publish_appointment_change(appt, "updated")
 
     # Disparar notificacoes em background
     background_tasks.add_task(
@@ -381,6 +391,7 @@ async def create_appointment(
     db.add(new_appt)
     await db.commit()
     await db.refresh(new_appt)
+    await publish_appointment_change(new_appt, "created")
 
     # Gerar link do WhatsApp para o cliente contatar o profissional
     data_hora = datetime.combine(appt.date, appt.start_time)
@@ -543,6 +554,7 @@ async def create_manual_block(
     db.add(manual_block)
     await db.commit()
     await db.refresh(manual_block)
+    await publish_appointment_change(manual_block, "created")
 
     return AppointmentResponse.model_validate(manual_block)
 
@@ -571,6 +583,7 @@ async def delete_manual_block(
 
     await db.delete(block)
     await db.commit()
+    await publish_appointment_change(block, "deleted")
 
 
 async def _send_review_email(
@@ -0,0 +1,50 @@
+"""
+Exports Router
+Exportação em streaming de profissionais, clientes, assinaturas,
+agendamentos e avaliações (CSV ou Parquet)
+"""
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ..dependencies import get_current_user
+from ..models import User
+from ..services.exports import EXPORTS, stream_csv, stream_parquet
+
+router = APIRouter()
+
+
+@router.get("/{name}")
+async def export_table(
+    name: str,
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exporta a tabela inteira em streaming.
+
+    Os dados são lidos com cursor do servidor e enviados lote a lote, então
+    a memória não cresce com o tamanho da tabela. Formatos: CSV ou
+    Parquet (colunar).
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
+
+    if name not in EXPORTS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Exportação desconhecida. Opções: {', '.join(EXPORTS)}"
+        )
+
+    filename = f"{name}-{date.today().isoformat()}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if format == "parquet":
+        return StreamingResponse(
+            stream_parquet(name),
+            media_type="application/vnd.apache.parquet",
+            headers=headers
+        )
+
+    return StreamingResponse(stream_csv(name), media_type="text/csv", headers=headers)
@@ -7,7 +7,7 @@ from typing import Dict, Any
 from fastapi import APIRouter, Depends, status
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..database import get_db
+from ..database import get_db, pool_stats
 import httpx
 
 router = APIRouter(prefix="/health", tags=["health"])
@@ -218,3 +218,17 @@ async def readiness_check(db: AsyncSession = Depends(get_db)):
         "timestamp": datetime.utcnow().isoformat() + "Z",
         "database": database_health
     }
+
+
+@router.get("/pools", status_code=status.HTTP_200_OK)
+async def pool_metrics():
+    """
+    Uso dos pools de conexão com o banco (web e jobs).
+
+    Não abre conexão: apenas lê os contadores dos pools, por isso pode ser
+    consultado com frequência pelo monitoramento.
+    """
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "pools": pool_stats()
+    }
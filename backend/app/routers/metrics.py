@@ -0,0 +1,199 @@
+"""
+Metrics Router
+Endpoint /metrics no formato texto do Prometheus (jobs, fila de e-mails e pools)
+"""
+import hmac
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import get_db, pool_stats
+from ..models import EmailOutbox, JobRun
+from ..services.job_metrics import run_duration_seconds
+
+router = APIRouter(tags=["metrics"])
+
+Sample = Tuple[Dict[str, str], float]
+
+STAGE_FIELDS = {
+    "duration_seconds": "Duração da etapa na última execução",
+    "rows": "Linhas processadas pela etapa na última execução",
+    "emails": "E-mails enfileirados pela etapa na última execução",
+    "failures": "Falhas da etapa na última execução",
+}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_metric(name: str, help_text: str, metric_type: str, samples: List[Sample]) -> List[str]:
+    """
+    Formata uma métrica no formato de exposição do Prometheus
+    (linhas HELP/TYPE seguidas de uma linha por amostra).
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        label_str = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+        lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+    return lines
+
+
+def job_metric_lines(latest_runs: List[JobRun], totals) -> List[str]:
+    """Métricas da última execução de cada job e totais do ledger"""
+    duration, success, finished, stage_samples = [], [], [], {field: [] for field in STAGE_FIELDS}
+
+    for run in latest_runs:
+        labels = {"job": run.job_name}
+        run_duration = run_duration_seconds(run)
+        if run_duration is not None:
+            duration.append((labels, run_duration))
+            finished.append((labels, run.finished_at.timestamp()))
+        success.append((labels, 1 if run.status == "completed" else 0))
+
+        for stage, stats in (run.stats or {}).items():
+            for field in STAGE_FIELDS:
+                stage_samples[field].append(
+                    ({"job": run.job_name, "stage": stage}, stats.get(field, 0))
+                )
+
+    lines = []
+    lines += format_metric(
+        "contratapro_job_window_seconds",
+        "Janela esperada para cada job noturno", "gauge",
+        [({}, settings.JOB_WINDOW_MINUTES * 60)]
+    )
+    lines += format_metric(
+        "contratapro_job_last_duration_seconds",
+        "Duração da última execução finalizada", "gauge", duration
+    )
+    lines += format_metric(
+        "contratapro_job_last_success",
+        "1 se a última execução concluiu, 0 se falhou ou está em andamento", "gauge", success
+    )
+    lines += format_metric(
+        "contratapro_job_last_finished_timestamp_seconds",
+        "Horário de término da última execução", "gauge", finished
+    )
+    for field, help_text in STAGE_FIELDS.items():
+        lines += format_metric(
+            f"contratapro_job_stage_{field}", help_text, "gauge", stage_samples[field]
+        )
+
+    lines += format_metric(
+        "contratapro_job_runs",
+        "Execuções registradas no ledger por status", "gauge",
+        [({"job": row.job_name, "status": row.status}, row.runs) for row in totals]
+    )
+
+    # Toda tentativa que não concluiu (exceto a que está rodando) foi uma falha
+    failed_attempts: Dict[str, int] = {}
+    for row in totals:
+        failed = row.attempts - (row.runs if row.status in ("completed", "running") else 0)
+        failed_attempts[row.job_name] = failed_attempts.get(row.job_name, 0) + failed
+    lines += format_metric(
+        "contratapro_job_failed_attempts_total",
+        "Tentativas de execução que falharam", "counter",
+        [({"job": job}, count) for job, count in failed_attempts.items()]
+    )
+    return lines
+
+
+def outbox_metric_lines(status_counts, oldest_pending: Optional[datetime]) -> List[str]:
+    """Métricas da fila de e-mails"""
+    lines = format_metric(
+        "contratapro_email_outbox_messages",
+        "E-mails na fila por status", "gauge",
+        [({"status": status}, count) for status, count in status_counts]
+    )
+    age = (datetime.now(timezone.utc) - oldest_pending).total_seconds() if oldest_pending else 0
+    lines += format_metric(
+        "contratapro_email_outbox_oldest_pending_seconds",
+        "Idade do e-mail pendente mais antigo", "gauge", [({}, max(age, 0))]
+    )
+    return lines
+
+
+def pool_metric_lines(stats: Dict[str, Dict[str, int]]) -> List[str]:
+    """Métricas dos pools de conexão (web e jobs)"""
+    lines = format_metric(
+        "contratapro_db_pool_size",
+        "Tamanho configurado do pool", "gauge",
+        [({"pool": pool}, values["size"]) for pool, values in stats.items()]
+    )
+    lines += format_metric(
+        "contratapro_db_pool_connections",
+        "Conexões do pool por estado", "gauge",
+        [
+            ({"pool": pool, "state": state}, values[state])
+            for pool, values in stats.items()
+            for state in ("checked_in", "checked_out", "overflow")
+        ]
+    )
+    return lines
+
+
+def _check_token(authorization: Optional[str]):
+    # Sem token configurado o endpoint fica desabilitado (não expõe as métricas)
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Comparação em tempo constante (bytes: o cabeçalho pode ter caracteres não ASCII)
+    expected = f"Bearer {settings.METRICS_TOKEN}".encode()
+    if not hmac.compare_digest((authorization or "").encode(), expected):
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Métricas no formato do Prometheus.
+
+    Os dados dos jobs vêm de job_runs (gravados pelo worker), então o
+    endpoint reflete os jobs mesmo quando eles rodam em outro processo.
+    Exige `Authorization: Bearer <METRICS_TOKEN>`; sem METRICS_TOKEN
+    configurado o endpoint responde 404.
+    """
+    _check_token(authorization)
+
+    # Última execução de cada job
+    result = await db.execute(
+        select(JobRun)
+        .distinct(JobRun.job_name)
+        .order_by(JobRun.job_name, JobRun.started_at.desc())
+    )
+    latest_runs = result.scalars().all()
+
+    result = await db.execute(
+        select(
+            JobRun.job_name,
+            JobRun.status,
+            func.count(JobRun.id).label("runs"),
+            func.sum(JobRun.attempts).label("attempts")
+        )
+        .group_by(JobRun.job_name, JobRun.status)
+    )
+    totals = result.all()
+
+    result = await db.execute(
+        select(EmailOutbox.status, func.count(EmailOutbox.id))
+        .group_by(EmailOutbox.status)
+    )
+    status_counts = result.all()
+
+    result = await db.execute(
+        select(func.min(EmailOutbox.created_at)).where(EmailOutbox.status == "pending")
+    )
+    oldest_pending = result.scalar()
+
+    lines = job_metric_lines(latest_runs, totals)
+    lines += outbox_metric_lines(status_counts, oldest_pending)
+    lines += pool_metric_lines(pool_stats())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
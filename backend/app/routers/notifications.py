@@ -1,27 +1,72 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from sqlalchemy import func, and_
+from sqlalchemy.orm import aliased
+from sqlalchemy import func, and_, or_, distinct
 from typing import Optional
-from datetime import date
+from datetime import date, datetime, time, timedelta
 
 from ..database import get_db
-from ..models import Notification, Appointment, User
+from ..models import Notification, NotificationArchive, Appointment, User, Service
 from ..schemas import NotificationResponse, NotificationPagination
 from ..dependencies import get_current_user
 from ..config import settings
 from ..services.notifications.email_adapter import email_adapter
 from ..services.notifications.resend_adapter import resend_adapter
 from ..services.notifications.notification_service import get_email_adapter
+from ..services.notifications.retention import decompress_message
+from ..services.pagination import SortField, decode_cursor, encode_cursor, keyset_page, parse_datetime
 
 router = APIRouter()
 
 
+# Ordenação da listagem (mais recentes primeiro), usando o índice (user_id, created_at, id)
+NOTIFICATION_SORT = SortField(Notification.created_at, parse_datetime)
+
+
+def _enriched_notifications_query():
+    """
+    Query base de notificações com appointment, serviço, profissional e cliente
+    carregados via JOIN, evitando uma consulta extra por notificação.
+    """
+    professional = aliased(User)
+    client = aliased(User)
+
+    query = (
+        select(
+            Notification,
+            Appointment.date,
+            Appointment.start_time,
+            Service.title,
+            professional.name,
+            client.name
+        )
+        .select_from(Notification)
+        .outerjoin(Appointment, Appointment.id == Notification.appointment_id)
+        .outerjoin(Service, Service.id == Appointment.service_id)
+        .outerjoin(professional, professional.id == Appointment.professional_id)
+        .outerjoin(client, client.id == Appointment.client_id)
+    )
+    return query, professional, client
+
+
+def _to_response(row) -> NotificationResponse:
+    """Monta a resposta a partir de uma linha da query enriquecida"""
+    notif, appt_date, appt_start, service_title, professional_name, client_name = row
+    resp = NotificationResponse.model_validate(notif)
+    resp.appointment_date = appt_date
+    resp.appointment_start_time = appt_start
+    resp.service_title = service_title
+    resp.professional_name = professional_name
+    resp.client_name = client_name
+    return resp
+
+
 @router.get("/me", response_model=NotificationPagination)
 async def get_my_notifications(
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
     type_filter: Optional[str] = None,
     status_filter: Optional[str] = None,
     start_date: Optional[date] = None,
@@ -35,13 +80,14 @@ async def get_my_notifications(
 
     - **page**: Número da página (começa em 1)
     - **size**: Itens por página (máx 50)
+    - **cursor**: Cursor retornado em `next_cursor` (paginação keyset, ignora `page` e não calcula `total`)
     - **type_filter**: Filtrar por tipo (new_appointment, appointment_updated, appointment_cancelled)
-    - **status_filter**: Filtrar por status (pending, sent, error)
+    - **status_filter**: Filtrar por status (pending, queued, sent, error)
     - **start_date**: Data inicial do filtro
     - **end_date**: Data final do filtro
     - **search**: Busca por nome de serviço, profissional ou cliente
     """
-    skip = (page - 1) * size
+    query, professional, client = _enriched_notifications_query()
 
     # Filtro base
     filters = [Notification.user_id == current_user.id]
@@ -53,80 +99,72 @@ async def get_my_notifications(
     if status_filter:
         filters.append(Notification.status == status_filter)
 
+    # Intervalos em created_at (em vez de func.date) para usar o índice
     if start_date:
-        filters.append(func.date(Notification.created_at) >= start_date)
+        filters.append(Notification.created_at >= datetime.combine(start_date, time.min))
 
     if end_date:
-        filters.append(func.date(Notification.created_at) <= end_date)
+        filters.append(
+            Notification.created_at < datetime.combine(end_date + timedelta(days=1), time.min)
+        )
 
-    filter_stmt = and_(*filters)
+    # Busca no banco, antes da paginação, para que total e páginas fiquem corretos
+    if search:
+        pattern = f"%{search}%"
+        filters.append(
+            or_(
+                Service.title.ilike(pattern),
+                professional.name.ilike(pattern),
+                client.name.ilike(pattern),
+                Notification.title.ilike(pattern)
+            )
+        )
 
-    # Contar total
-    count_query = select(func.count()).select_from(Notification).filter(filter_stmt)
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    filter_stmt = and_(*filters)
 
-    # Buscar itens
-    query = (
-        select(Notification)
-        .filter(filter_stmt)
-        .order_by(Notification.created_at.desc())
-        .offset(skip)
-        .limit(size)
-    )
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, "created_at", NOTIFICATION_SORT)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    total = None
+    if after is None:
+        # Contar total (apenas no modo por página)
+        # Os JOINs só são necessários no count quando há busca textual
+        if search:
+            count_query = query.with_only_columns(func.count(Notification.id))
+        else:
+            count_query = select(func.count(Notification.id))
+        count_result = await db.execute(count_query.filter(filter_stmt))
+        total = count_result.scalar()
+
+    # Paginação keyset com cursor: custo constante independente da profundidade
+    query = keyset_page(query.filter(filter_stmt), NOTIFICATION_SORT, Notification.id, True, size, after)
+    if after is None:
+        query = query.offset((page - 1) * size)
 
     result = await db.execute(query)
-    notifications = result.scalars().all()
-
-    # Enriquecer com dados do appointment
-    items = []
-    for notif in notifications:
-        resp = NotificationResponse.model_validate(notif)
-
-        if notif.appointment_id:
-            appt_result = await db.execute(
-                select(Appointment)
-                .options(
-                    selectinload(Appointment.service),
-                    selectinload(Appointment.professional),
-                    selectinload(Appointment.client)
-                )
-                .filter(Appointment.id == notif.appointment_id)
-            )
-            appt = appt_result.scalars().first()
-
-            if appt:
-                resp.appointment_date = appt.date
-                resp.appointment_start_time = appt.start_time
-                if appt.service:
-                    resp.service_title = appt.service.title
-                if appt.professional:
-                    resp.professional_name = appt.professional.name
-                if appt.client:
-                    resp.client_name = appt.client.name
+    rows = result.all()
+    items = [_to_response(row) for row in rows[:size]]
 
-        items.append(resp)
+    next_cursor = None
+    if len(rows) > size:
+        last = items[-1]
+        next_cursor = encode_cursor("created_at", last.created_at, last.id)
 
-    # Filtrar por busca se fornecido (busca client-side nos dados enriquecidos)
-    if search:
-        search_lower = search.lower()
-        items = [
-            item for item in items
-            if (item.service_title and search_lower in item.service_title.lower()) or
-               (item.professional_name and search_lower in item.professional_name.lower()) or
-               (item.client_name and search_lower in item.client_name.lower()) or
-               (search_lower in item.title.lower())
-        ]
-        total = len(items)
-
-    pages = (total + size - 1) // size if total > 0 else 0
+    pages = None
+    if total is not None:
+        pages = (total + size - 1) // size if total > 0 else 0
 
     return {
         "items": items,
         "total": total,
         "page": page,
         "size": size,
-        "pages": pages
+        "pages": pages,
+        "next_cursor": next_cursor
     }
 
 
@@ -166,6 +204,55 @@ async def get_email_status(
     }
 
 
+@router.get("/digest-stats")
+async def get_digest_stats(
+    days: int = Query(7, ge=1, le=90),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Métricas do digest de notificações (apenas admin).
+    Para cada dia: notificações agrupadas, e-mails digest enviados e e-mails economizados.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Apenas administradores podem acessar")
+
+    since = datetime.now() - timedelta(days=days)
+    sent_day = func.date(Notification.sent_at)
+
+    result = await db.execute(
+        select(
+            sent_day,
+            func.count(Notification.id),
+            func.count(distinct(Notification.digest_key))
+        )
+        .where(
+            Notification.digest_key.isnot(None),
+            Notification.status == "sent",
+            Notification.sent_at >= since
+        )
+        .group_by(sent_day)
+        .order_by(sent_day)
+    )
+
+    daily = [
+        {
+            "date": str(day),
+            "notifications": notifications,
+            "digest_emails": digests,
+            "emails_saved": notifications - digests
+        }
+        for day, notifications, digests in result.all()
+    ]
+
+    return {
+        "enabled": settings.NOTIFICATION_DIGEST_ENABLED,
+        "window_minutes": settings.NOTIFICATION_DIGEST_WINDOW_MINUTES,
+        "daily": daily,
+        "total_emails_saved": sum(d["emails_saved"] for d in daily)
+    }
+
+
 # Manter endpoint antigo para compatibilidade
 @router.get("/smtp-status")
 async def get_smtp_status(
@@ -266,40 +353,40 @@ async def get_notification_detail(
     db: AsyncSession = Depends(get_db)
 ):
     """Retorna detalhes de uma notificação específica."""
+    query, _, _ = _enriched_notifications_query()
     result = await db.execute(
-        select(Notification).filter(
+        query.filter(
             Notification.id == notification_id,
             Notification.user_id == current_user.id
         )
     )
-    notification = result.scalars().first()
-
-    if not notification:
-        raise HTTPException(status_code=404, detail="Notificação não encontrada")
+    row = result.first()
 
-    resp = NotificationResponse.model_validate(notification)
+    if row:
+        return _to_response(row)
 
-    # Enriquecer com dados do appointment
-    if notification.appointment_id:
-        appt_result = await db.execute(
-            select(Appointment)
-            .options(
-                selectinload(Appointment.service),
-                selectinload(Appointment.professional),
-                selectinload(Appointment.client)
-            )
-            .filter(Appointment.id == notification.appointment_id)
+    # Notificações fora da janela de retenção ficam no arquivo
+    archived_result = await db.execute(
+        select(NotificationArchive).filter(
+            NotificationArchive.id == notification_id,
+            NotificationArchive.user_id == current_user.id
         )
-        appt = appt_result.scalars().first()
-
-        if appt:
-            resp.appointment_date = appt.date
-            resp.appointment_start_time = appt.start_time
-            if appt.service:
-                resp.service_title = appt.service.title
-            if appt.professional:
-                resp.professional_name = appt.professional.name
-            if appt.client:
-                resp.client_name = appt.client.name
+    )
+    archived = archived_result.scalars().first()
 
-    return resp
+    if not archived:
+        raise HTTPException(status_code=404, detail="Notificação não encontrada")
+
+    return NotificationResponse(
+        id=archived.id,
+        user_id=archived.user_id,
+        appointment_id=archived.appointment_id,
+        type=archived.type,
+        channel=archived.channel,
+        status=archived.status,
+        title=archived.title,
+        message=decompress_message(archived.message_compressed),
+        created_at=archived.created_at,
+        sent_at=archived.sent_at,
+        error_message=archived.error_message
+    )
@@ -0,0 +1,93 @@
+"""
+Realtime Router
+Stream de notificações e alterações de agenda (substitui o polling do frontend)
+"""
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..dependencies import get_user_from_token
+from ..services.realtime import realtime_broker
+
+router = APIRouter()
+
+
+async def _authenticate(token: str):
+    """
+    Autentica pelo token na query string.
+    EventSource e WebSocket do navegador não permitem enviar o header Authorization.
+    A sessão é fechada logo em seguida para não prender conexões do pool
+    durante todo o stream.
+    """
+    async with AsyncSessionLocal() as db:
+        return await get_user_from_token(token, db)
+
+
+@router.get("/stream")
+async def stream_events(request: Request, token: str = Query(...)):
+    """
+    Server-Sent Events com os eventos do usuário autenticado.
+
+    Eventos:
+    - **notification**: nova notificação criada
+    - **appointment**: agendamento criado, alterado ou removido (delta da agenda)
+    """
+    user = await _authenticate(token)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+
+    async def event_stream():
+        async with realtime_broker.subscribe(user.id) as queue:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), timeout=settings.REALTIME_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    # Comentário SSE mantém a conexão viva em proxies
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, token: str = Query(...)):
+    """Mesmos eventos do /stream via WebSocket ({"event": ..., "data": ...})"""
+    user = await _authenticate(token)
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    async with realtime_broker.subscribe(user.id) as queue:
+        receiver = asyncio.create_task(websocket.receive_text())
+        getter = asyncio.create_task(queue.get())
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    {getter, receiver}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if receiver in done:
+                    # Mensagens do cliente (ex: ping) são ignoradas;
+                    # a desconexão levanta WebSocketDisconnect aqui
+                    receiver.result()
+                    receiver = asyncio.create_task(websocket.receive_text())
+                if getter in done:
+                    await websocket.send_json(getter.result())
+                    getter = asyncio.create_task(queue.get())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiver.cancel()
+            getter.cancel()
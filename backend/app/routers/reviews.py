@@ -1,14 +1,17 @@
 # Endpoints publicos para avaliacoes de prestadores
 import math
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func
 
 from ..database import get_db
-from ..models import Review, ReviewToken, User, Appointment
+from ..models import Review, ReviewToken, Appointment
+from ..services.pagination import SortField, decode_cursor, keyset_page, page_result, parse_datetime
+from ..services.ratings import ratings
+from ..services.review_summary import review_summaries
 from ..schemas import (
     ReviewCreate,
     ReviewResponse,
@@ -87,51 +90,75 @@ async def submit_review(
     # Invalidar token
     review_token.used_at = datetime.now()
 
-    # Recalcular media do profissional
-    await _update_professional_rating(
-        db, appointment.professional_id
+    # Somar nos agregados do profissional (mesma transacao)
+    await ratings.add_review(
+        db, appointment.professional_id, review_data.rating
     )
 
     await db.commit()
     await db.refresh(new_review)
 
+    await review_summaries.broadcast_invalidation([appointment.professional_id])
+
     return new_review
 
 
+# Ordenação da listagem pública (mais recentes primeiro)
+REVIEW_SORT = SortField(Review.created_at, parse_datetime)
+
+
 @router.get("/providers/{provider_id}/reviews")
 async def get_provider_reviews(
     provider_id: int,
-    page: int = 1,
-    size: int = 5,
+    page: int = Query(1, ge=1),
+    size: int = Query(5, ge=1, le=50),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    """Endpoint publico para listagem paginada de avaliacoes."""
-    offset = (page - 1) * size
+    """
+    Endpoint publico para listagem paginada de avaliacoes.
 
-    # Total de avaliacoes
-    count_result = await db.execute(
-        select(func.count(Review.id)).filter(
-            Review.professional_id == provider_id
-        )
-    )
-    total = count_result.scalar() or 0
-
-    # Buscar pagina
-    reviews_result = await db.execute(
-        select(Review)
-        .filter(Review.professional_id == provider_id)
-        .order_by(Review.created_at.desc())
-        .offset(offset)
-        .limit(size)
+    Com cursor (next_cursor da pagina anterior) a pagina comeca depois da
+    ultima avaliacao lida, usando o indice (professional_id, created_at, id).
+    O total vem do resumo cacheado, sem COUNT na tabela de avaliacoes.
+    """
+    summary = await review_summaries.get(db, provider_id)
+    total = summary.total_reviews if summary else 0
+
+    query = select(
+        Review.id,
+        Review.rating,
+        Review.comment,
+        Review.customer_name,
+        Review.created_at,
+    ).filter(Review.professional_id == provider_id)
+
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, "created_at", REVIEW_SORT)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor invalido",
+            )
+
+    query = keyset_page(query, REVIEW_SORT, Review.id, True, size, after)
+    if after is None and page > 1:
+        # Compatibilidade: navegacao por numero de pagina
+        query = query.offset((page - 1) * size)
+
+    reviews_result = await db.execute(query)
+    reviews_list, next_cursor = page_result(
+        reviews_result.mappings().all(), "created_at", "created_at", size
     )
-    reviews_list = reviews_result.scalars().all()
 
     items = [
         ReviewCommentResponse(
-            rating=r.rating,
-            comment=r.comment,
-            customer_name=r.customer_name,
-            created_at=r.created_at,
+            rating=r["rating"],
+            comment=r["comment"],
+            customer_name=r["customer_name"],
+            created_at=r["created_at"],
         )
         for r in reviews_list
     ]
@@ -142,6 +169,7 @@ async def get_provider_reviews(
         "page": page,
         "size": size,
         "pages": math.ceil(total / size) if total > 0 else 0,
+        "next_cursor": next_cursor,
     }
 
 
@@ -155,71 +183,14 @@ async def get_provider_reviews_summary(
 ):
     """
     Endpoint publico para resumo de avaliacoes de um profissional.
-    Nao requer autenticacao.
+    Nao requer autenticacao. Servido do cache em memoria.
     """
-    # Verificar se profissional existe
-    pro_result = await db.execute(
-        select(User).filter(
-            User.id == provider_id,
-            User.is_professional.is_(True),
-        )
-    )
-    professional = pro_result.scalars().first()
+    summary = await review_summaries.get(db, provider_id)
 
-    if not professional:
+    if summary is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Profissional nao encontrado",
         )
 
-    # Buscar ultimos comentarios (mais recentes, limitado a 10)
-    reviews_result = await db.execute(
-        select(Review)
-        .filter(Review.professional_id == provider_id)
-        .order_by(Review.created_at.desc())
-        .limit(10)
-    )
-    latest_reviews = reviews_result.scalars().all()
-
-    latest_comments = [
-        ReviewCommentResponse(
-            rating=r.rating,
-            comment=r.comment,
-            customer_name=r.customer_name,
-            created_at=r.created_at,
-        )
-        for r in latest_reviews
-        if r.comment
-    ]
-
-    return ReviewsSummaryResponse(
-        average_rating=professional.average_rating,
-        total_reviews=professional.total_reviews or 0,
-        latest_comments=latest_comments,
-    )
-
-
-async def _update_professional_rating(
-    db: AsyncSession,
-    professional_id: int,
-):
-    """Recalcula e atualiza a media de avaliacoes do profissional"""
-    result = await db.execute(
-        select(
-            func.avg(Review.rating),
-            func.count(Review.id),
-        ).filter(Review.professional_id == professional_id)
-    )
-    row = result.first()
-    avg_rating = (
-        round(float(row[0]), 2) if row[0] else None
-    )
-    total = row[1] or 0
-
-    pro_result = await db.execute(
-        select(User).filter(User.id == professional_id)
-    )
-    professional = pro_result.scalars().first()
-    if professional:
-        professional.average_rating = avg_rating
-        professional.total_reviews = total
+    return summary
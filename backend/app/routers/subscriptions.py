@@ -1,12 +1,10 @@
 # backend/app/routers/subscriptions.py
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import date, timedelta, datetime
 from pydantic import BaseModel
 from typing import Optional
-import mercadopago
-import httpx
 import logging
 
 from ..database import get_db
@@ -15,13 +13,15 @@ from ..dependencies import get_current_user
 from ..config import settings
 from ..services.notifications.notification_service import notification_service
 from ..services.notifications.templates import email_templates
+from ..services.billing import BillingAggregate, billing
+from ..services.mercadopago_gateway import MercadoPagoError, mercadopago_gateway
+from ..services.mercadopago_plans import checkout_url, mercadopago_plans
+from ..services.webhook_inbox import parse_event, store_event, verify_signature
+from ..services.admin_listings import SUBSCRIPTION_SORTS, paginate_listing, subscription_listing, subscription_row
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Inicializar SDK do Mercado Pago
-sdk = mercadopago.SDK(settings.MERCADOPAGO_ACCESS_TOKEN)
-
 
 class SubscriptionResponse(BaseModel):
     message: str
@@ -90,29 +90,18 @@ async def subscribe_to_plan(
             detail=f"Plano '{plan_slug}' não encontrado ou inativo"
         )
 
-    # Verificar se já tem assinatura ativa
-    result = await db.execute(
-        select(Subscription).where(
-            Subscription.professional_id == current_user.id
-        )
-    )
-    existing_subscription = result.scalar_one_or_none()
+    # Verificar se já tem assinatura ativa (assinatura e plano anterior em uma consulta)
+    aggregate = await billing.load(db, professional_id=current_user.id)
+    existing_subscription = aggregate.subscription if aggregate else None
 
     # Verificar se já usou o trial
-    if plan_slug == "trial" and existing_subscription:
-        if existing_subscription.plan_id:
-            # Buscar plano anterior
-            result = await db.execute(
-                select(SubscriptionPlan).where(
-                    SubscriptionPlan.id == existing_subscription.plan_id
-                )
+    if plan_slug == "trial" and aggregate:
+        previous_plan = aggregate.plan
+        if previous_plan and previous_plan.slug == "trial":
+            raise HTTPException(
+                status_code=400,
+                detail="Você já utilizou o período de trial. Escolha um plano pago."
             )
-            previous_plan = result.scalar_one_or_none()
-            if previous_plan and previous_plan.slug == "trial":
-                raise HTTPException(
-                    status_code=400,
-                    detail="Você já utilizou o período de trial. Escolha um plano pago."
-                )
 
     # Se já tem assinatura ativa (não cancelada/expirada), não pode criar outra
     if existing_subscription and existing_subscription.status in ["active", "pending"]:
@@ -128,14 +117,17 @@ async def subscribe_to_plan(
 
         if existing_subscription:
             # Reativar assinatura existente como trial
-            existing_subscription.plan_id = plan.id
-            existing_subscription.status = "active"
-            existing_subscription.trial_ends_at = trial_end_date
-            existing_subscription.plan_amount = 0.0
-            existing_subscription.cancelled_at = None
-            existing_subscription.cancellation_reason = None
-            existing_subscription.mercadopago_preapproval_id = None
-            existing_subscription.init_point = None
+            billing.transition(
+                aggregate,
+                "active",
+                plan_id=plan.id,
+                trial_ends_at=trial_end_date,
+                plan_amount=0.0,
+                cancelled_at=None,
+                cancellation_reason=None,
+                mercadopago_preapproval_id=None,
+                init_point=None
+            )
             subscription = existing_subscription
         else:
             # Criar nova assinatura trial
@@ -147,9 +139,9 @@ async def subscribe_to_plan(
                 plan_amount=0.0
             )
             db.add(subscription)
+            current_user.subscription_status = "active"
 
         # Atualizar usuário
-        current_user.subscription_status = "active"
         current_user.subscription_plan_id = plan.id
         current_user.trial_ends_at = datetime.combine(trial_end_date, datetime.min.time())
         current_user.subscription_started_at = datetime.now()
@@ -186,76 +178,34 @@ async def subscribe_to_plan(
         )
 
     try:
-        # Separar nome em first_name e last_name para o Mercado Pago
-        name_parts = current_user.name.split(" ", 1) if current_user.name else ["Usuário", ""]
-        first_name = name_parts[0]
-        last_name = name_parts[1] if len(name_parts) > 1 else first_name
-
-        plan_data = {
-            "reason": f"Plano {plan.name} - ContrataPro",
-            "auto_recurring": {
-                "frequency": settings.SUBSCRIPTION_FREQUENCY,
-                "frequency_type": settings.SUBSCRIPTION_FREQUENCY_TYPE,
-                "transaction_amount": plan.price,
-                "currency_id": "BRL",
-            },
-            "payer_email": current_user.email,
-            "back_url": f"{settings.FRONTEND_URL}/subscription/callback",
-            "external_reference": str(current_user.id),
-        }
-
-        # Adicionar informações do pagador para melhor qualidade de integração
-        # Isso melhora a taxa de aprovação e habilita o checkout corretamente
-        if current_user.cpf:
-            plan_data["payer"] = {
-                "first_name": first_name,
-                "last_name": last_name,
-                "email": current_user.email,
-                "identification": {
-                    "type": "CPF",
-                    "number": current_user.cpf.replace(".", "").replace("-", "")
-                }
-            }
-
-        logger.info(f"Criando plano pago no MP: {plan_data}")
-
-        async with httpx.AsyncClient() as client:
-            plan_response = await client.post(
-                "https://api.mercadopago.com/preapproval_plan",
-                json=plan_data,
-                headers={
-                    "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}",
-                    "Content-Type": "application/json"
-                }
-            )
-
-        if plan_response.status_code not in [200, 201]:
-            logger.error(f"Erro ao criar plano MP: {plan_response.status_code} - {plan_response.text}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Erro ao criar plano no Mercado Pago"
+        # Plano do MP compartilhado por todos os assinantes deste plano (cacheado)
+        try:
+            mp_plan_id, mp_init_point = await mercadopago_plans.get_or_create(
+                reason=f"Plano {plan.name} - ContrataPro",
+                amount=plan.price,
+                subscription_plan_id=plan.id
             )
-
-        mp_plan = plan_response.json()
-        mp_plan_id = mp_plan["id"]
-        mp_init_point = mp_plan.get("init_point")
-
-        if not mp_init_point:
+            mp_init_point = checkout_url(mp_init_point, current_user.id)
+        except MercadoPagoError as e:
+            logger.error(f"Erro ao obter plano MP: {str(e)}")
             raise HTTPException(
                 status_code=500,
-                detail="Erro: Mercado Pago não retornou URL de checkout"
+                detail="Erro ao criar plano no Mercado Pago"
             )
 
         # Criar/atualizar assinatura no banco como pending
         if existing_subscription:
-            existing_subscription.plan_id = plan.id
-            existing_subscription.status = "pending"
-            existing_subscription.trial_ends_at = None
-            existing_subscription.plan_amount = plan.price
-            existing_subscription.mercadopago_preapproval_id = mp_plan_id
-            existing_subscription.init_point = mp_init_point
-            existing_subscription.cancelled_at = None
-            existing_subscription.cancellation_reason = None
+            billing.transition(
+                aggregate,
+                "pending",
+                plan_id=plan.id,
+                trial_ends_at=None,
+                plan_amount=plan.price,
+                mercadopago_preapproval_id=mp_plan_id,
+                init_point=mp_init_point,
+                cancelled_at=None,
+                cancellation_reason=None
+            )
             subscription = existing_subscription
         else:
             subscription = Subscription(
@@ -267,10 +217,10 @@ async def subscribe_to_plan(
                 init_point=mp_init_point
             )
             db.add(subscription)
+            current_user.subscription_status = "pending"
 
         # Atualizar usuário
         current_user.subscription_plan_id = plan.id
-        current_user.subscription_status = "pending"
 
         await db.commit()
         await db.refresh(subscription)
@@ -358,70 +308,13 @@ async def create_subscription(
 
     # Criar preferência de assinatura no Mercado Pago
     try:
-        # Separar nome em first_name e last_name para o Mercado Pago
-        name_parts = current_user.name.split(" ", 1) if current_user.name else ["Usuário", ""]
-        first_name = name_parts[0]
-        last_name = name_parts[1] if len(name_parts) > 1 else first_name
-
-        # PASSO 1: Criar plano de assinatura (preapproval_plan) usando API REST diretamente
-        plan_data = {
-            "reason": "Plano Mensal - ContrataPro",
-            "auto_recurring": {
-                "frequency": settings.SUBSCRIPTION_FREQUENCY,
-                "frequency_type": settings.SUBSCRIPTION_FREQUENCY_TYPE,
-                "transaction_amount": settings.SUBSCRIPTION_AMOUNT,
-                "currency_id": "BRL",
-            },
-            "payer_email": current_user.email,
-            "back_url": f"{settings.FRONTEND_URL}/subscription/callback",
-            "external_reference": str(current_user.id),
-        }
-
-        # Adicionar informações do pagador para melhor qualidade de integração
-        if current_user.cpf:
-            plan_data["payer"] = {
-                "first_name": first_name,
-                "last_name": last_name,
-                "email": current_user.email,
-                "identification": {
-                    "type": "CPF",
-                    "number": current_user.cpf.replace(".", "").replace("-", "")
-                }
-            }
-
-        logger.info(f"Criando plano de assinatura: {plan_data}")
-
-        # Fazer chamada HTTP direta para criar o plano
-        async with httpx.AsyncClient() as client:
-            plan_response = await client.post(
-                "https://api.mercadopago.com/preapproval_plan",
-                json=plan_data,
-                headers={
-                    "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}",
-                    "Content-Type": "application/json"
-                }
-            )
-
-        if plan_response.status_code not in [200, 201]:
-            logger.error(f"Erro ao criar plano MP: {plan_response.status_code} - {plan_response.text}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Erro ao criar plano de assinatura no Mercado Pago: {plan_response.text}"
-            )
-
-        plan = plan_response.json()
-        plan_id = plan["id"]
-        plan_init_point = plan.get("init_point")
-        logger.info(f"Plano criado com sucesso. ID: {plan_id}, init_point: {plan_init_point}")
-
-        # Usar o init_point do plano para redirecionar ao checkout
-        # O usuário criará a assinatura ao completar o pagamento
-        if not plan_init_point:
-            logger.error(f"Plano criado mas sem init_point: {plan}")
-            raise HTTPException(
-                status_code=500,
-                detail="Plano criado mas sem URL de checkout"
-            )
+        # Plano do MP compartilhado por todos os assinantes (cacheado).
+        # O usuário criará a assinatura ao completar o pagamento no init_point
+        plan_id, plan_init_point = await mercadopago_plans.get_or_create(
+            reason="Plano Mensal - ContrataPro",
+            amount=settings.SUBSCRIPTION_AMOUNT
+        )
+        plan_init_point = checkout_url(plan_init_point, current_user.id)
 
         # Criar ou atualizar assinatura no banco
         if existing_subscription and existing_subscription.status == "cancelled":
@@ -475,12 +368,8 @@ async def create_subscription_with_card(
         )
 
     # Verificar se já tem assinatura ativa
-    result = await db.execute(
-        select(Subscription).where(
-            Subscription.professional_id == current_user.id
-        )
-    )
-    existing_subscription = result.scalar_one_or_none()
+    aggregate = await billing.load(db, professional_id=current_user.id)
+    existing_subscription = aggregate.subscription if aggregate else None
 
     if existing_subscription and existing_subscription.status not in ["cancelled", "pending"]:
         raise HTTPException(
@@ -494,54 +383,11 @@ async def create_subscription_with_card(
         first_name = name_parts[0]
         last_name = name_parts[1] if len(name_parts) > 1 else first_name
 
-        # PASSO 1: Criar plano de assinatura
-        plan_data = {
-            "reason": "Plano Mensal - ContrataPro",
-            "auto_recurring": {
-                "frequency": settings.SUBSCRIPTION_FREQUENCY,
-                "frequency_type": settings.SUBSCRIPTION_FREQUENCY_TYPE,
-                "transaction_amount": settings.SUBSCRIPTION_AMOUNT,
-                "currency_id": "BRL",
-            },
-            "payer_email": current_user.email,
-            "back_url": f"{settings.FRONTEND_URL}/subscription/callback",
-            "external_reference": str(current_user.id),
-        }
-
-        # Adicionar informações do pagador para melhor qualidade de integração
-        if current_user.cpf:
-            plan_data["payer"] = {
-                "first_name": first_name,
-                "last_name": last_name,
-                "email": current_user.email,
-                "identification": {
-                    "type": "CPF",
-                    "number": current_user.cpf.replace(".", "").replace("-", "")
-                }
-            }
-
-        logger.info(f"Criando plano de assinatura: {plan_data}")
-
-        async with httpx.AsyncClient() as client:
-            plan_response = await client.post(
-                "https://api.mercadopago.com/preapproval_plan",
-                json=plan_data,
-                headers={
-                    "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}",
-                    "Content-Type": "application/json"
-                }
-            )
-
-        if plan_response.status_code not in [200, 201]:
-            logger.error(f"Erro ao criar plano MP: {plan_response.status_code} - {plan_response.text}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Erro ao criar plano: {plan_response.text}"
-            )
-
-        plan = plan_response.json()
-        plan_id = plan["id"]
-        logger.info(f"Plano criado: {plan_id}")
+        # PASSO 1: Plano de assinatura (criado uma vez e reaproveitado)
+        plan_id, _ = await mercadopago_plans.get_or_create(
+            reason="Plano Mensal - ContrataPro",
+            amount=settings.SUBSCRIPTION_AMOUNT
+        )
 
         # PASSO 2: Criar assinatura (preapproval) com o card_token_id
         preapproval_data = {
@@ -574,15 +420,7 @@ async def create_subscription_with_card(
 
         logger.info(f"Criando assinatura com card_token: {preapproval_data}")
 
-        async with httpx.AsyncClient() as client:
-            preapproval_response = await client.post(
-                "https://api.mercadopago.com/preapproval",
-                json=preapproval_data,
-                headers={
-                    "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}",
-                    "Content-Type": "application/json"
-                }
-            )
+        preapproval_response = await mercadopago_gateway.post("/preapproval", json=preapproval_data)
 
         if preapproval_response.status_code not in [200, 201]:
             logger.error(f"Erro ao criar preapproval: {preapproval_response.status_code} - {preapproval_response.text}")
@@ -598,27 +436,31 @@ async def create_subscription_with_card(
         logger.info(f"Assinatura criada: {preapproval_id}, status: {preapproval_status}")
 
         # PASSO 3: Salvar no banco de dados
+        new_status = "active" if preapproval_status == "authorized" else "pending"
         if existing_subscription:
-            existing_subscription.mercadopago_preapproval_id = preapproval_id
-            existing_subscription.status = "active" if preapproval_status == "authorized" else "pending"
-            existing_subscription.plan_amount = settings.SUBSCRIPTION_AMOUNT
-            existing_subscription.last_payment_date = date.today()
-            existing_subscription.next_billing_date = date.today() + timedelta(days=30)
-            existing_subscription.cancelled_at = None
+            billing.transition(
+                aggregate,
+                new_status,
+                mercadopago_preapproval_id=preapproval_id,
+                plan_amount=settings.SUBSCRIPTION_AMOUNT,
+                last_payment_date=date.today(),
+                next_billing_date=date.today() + timedelta(days=30),
+                cancelled_at=None
+            )
             subscription = existing_subscription
         else:
             subscription = Subscription(
                 professional_id=current_user.id,
                 mercadopago_preapproval_id=preapproval_id,
                 plan_amount=settings.SUBSCRIPTION_AMOUNT,
-                status="active" if preapproval_status == "authorized" else "pending",
+                status=new_status,
                 last_payment_date=date.today(),
                 next_billing_date=date.today() + timedelta(days=30)
             )
             db.add(subscription)
 
-        # Atualizar status do usuário
-        current_user.subscription_status = "active" if preapproval_status == "authorized" else "pending"
+            # Atualizar status do usuário
+            current_user.subscription_status = new_status
 
         await db.commit()
         await db.refresh(subscription)
@@ -771,18 +613,15 @@ async def cancel_subscription(
             detail="Apenas profissionais podem cancelar assinaturas"
         )
 
-    result = await db.execute(
-        select(Subscription).where(
-            Subscription.professional_id == current_user.id
-        )
-    )
-    subscription = result.scalar_one_or_none()
+    # Assinatura, usuario e plano em uma consulta
+    aggregate = await billing.load(db, professional_id=current_user.id)
 
-    if not subscription:
+    if not aggregate:
         raise HTTPException(
             status_code=404,
             detail="Assinatura nao encontrada"
         )
+    subscription, _, plan = aggregate
 
     if subscription.status == "cancelled":
         raise HTTPException(
@@ -797,18 +636,7 @@ async def cancel_subscription(
             detail=f"Cancelamento ja agendado para {subscription.scheduled_cancellation_date.strftime('%d/%m/%Y')}"
         )
 
-    # Buscar plano para verificar se e trial ou pago
-    plan = None
-    plan_name = "Plano Profissional"
-    if subscription.plan_id:
-        plan_result = await db.execute(
-            select(SubscriptionPlan).where(
-                SubscriptionPlan.id == subscription.plan_id
-            )
-        )
-        plan = plan_result.scalar_one_or_none()
-        if plan:
-            plan_name = plan.name
+    plan_name = plan.name if plan else "Plano Profissional"
 
     is_trial = (
         subscription.trial_ends_at is not None or
@@ -819,14 +647,7 @@ async def cancel_subscription(
     # Cancelar no Mercado Pago (para parar a recorrencia)
     try:
         if subscription.mercadopago_preapproval_id:
-            cancel_response = sdk.preapproval().update(
-                subscription.mercadopago_preapproval_id,
-                {"status": "cancelled"}
-            )
-
-            if cancel_response["status"] not in [200, 201]:
-                logger.error(f"Erro ao cancelar no MP: {cancel_response}")
-            else:
+            if await mercadopago_gateway.cancel_preapproval(subscription.mercadopago_preapproval_id):
                 logger.info(f"Assinatura cancelada no MP: {subscription.mercadopago_preapproval_id}")
     except Exception as e:
         logger.error(f"Erro ao cancelar assinatura no MP: {str(e)}")
@@ -837,9 +658,7 @@ async def cancel_subscription(
 
     if is_trial:
         # TRIAL: Cancela imediatamente
-        subscription.status = "cancelled"
-        subscription.cancelled_at = datetime.now()
-        current_user.subscription_status = "cancelled"
+        billing.transition(aggregate, "cancelled")
 
         await db.commit()
 
@@ -1015,15 +834,7 @@ async def debug_subscription_checkout(
         })
 
         # Criar plano
-        async with httpx.AsyncClient() as client:
-            plan_response = await client.post(
-                "https://api.mercadopago.com/preapproval_plan",
-                json=plan_data,
-                headers={
-                    "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}",
-                    "Content-Type": "application/json"
-                }
-            )
+        plan_response = await mercadopago_gateway.post("/preapproval_plan", json=plan_data)
 
         plan_result = plan_response.json()
         debug_info["steps"].append({
@@ -1048,13 +859,7 @@ async def debug_subscription_checkout(
         })
 
         # Tentar buscar detalhes do plano criado
-        async with httpx.AsyncClient() as client:
-            detail_response = await client.get(
-                f"https://api.mercadopago.com/preapproval_plan/{plan_result.get('id')}",
-                headers={
-                    "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}"
-                }
-            )
+        detail_response = await mercadopago_gateway.get(f"/preapproval_plan/{plan_result.get('id')}")
 
         debug_info["steps"].append({
             "step": 4,
@@ -1088,15 +893,11 @@ async def reset_pending_subscription(
             detail="Apenas profissionais podem resetar assinaturas"
         )
 
-    result = await db.execute(
-        select(Subscription).where(
-            Subscription.professional_id == current_user.id
-        )
-    )
-    subscription = result.scalar_one_or_none()
+    aggregate = await billing.load(db, professional_id=current_user.id)
 
-    if not subscription:
+    if not aggregate:
         return {"message": "Nenhuma assinatura encontrada", "can_subscribe": True}
+    subscription = aggregate.subscription
 
     if subscription.status == "active":
         raise HTTPException(
@@ -1107,29 +908,22 @@ async def reset_pending_subscription(
     # Cancelar no Mercado Pago se existir preapproval_id
     if subscription.mercadopago_preapproval_id:
         try:
-            async with httpx.AsyncClient() as client:
-                cancel_response = await client.put(
-                    f"https://api.mercadopago.com/preapproval/{subscription.mercadopago_preapproval_id}",
-                    json={"status": "cancelled"},
-                    headers={
-                        "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}",
-                        "Content-Type": "application/json"
-                    }
-                )
-                logger.info(f"Reset MP preapproval: {cancel_response.status_code}")
+            cancelled = await mercadopago_gateway.cancel_preapproval(subscription.mercadopago_preapproval_id)
+            logger.info(f"Reset MP preapproval: {'cancelado' if cancelled else 'falhou'}")
         except Exception as e:
             logger.error(f"Erro ao cancelar preapproval no MP: {str(e)}")
             # Continua mesmo com erro
 
     # Resetar assinatura para permitir nova criação
-    subscription.status = "cancelled"
-    subscription.mercadopago_preapproval_id = None
-    subscription.init_point = None
-    subscription.cancelled_at = datetime.now()
-    subscription.cancellation_reason = "Reset para nova assinatura"
-
-    # Atualizar usuário
-    current_user.subscription_status = "inactive"
+    billing.transition(
+        aggregate,
+        "cancelled",
+        user_status="inactive",
+        mercadopago_preapproval_id=None,
+        init_point=None,
+        cancelled_at=datetime.now(),
+        cancellation_reason="Reset para nova assinatura"
+    )
 
     await db.commit()
 
@@ -1156,15 +950,10 @@ async def activate_subscription_manual(
             detail="Apenas profissionais podem ativar assinaturas"
         )
 
-    result = await db.execute(
-        select(Subscription).where(
-            Subscription.professional_id == current_user.id
-        )
-    )
-    subscription = result.scalar_one_or_none()
+    aggregate = await billing.load(db, professional_id=current_user.id)
 
     # Se não existe assinatura, criar uma nova
-    if not subscription:
+    if not aggregate:
         subscription = Subscription(
             professional_id=current_user.id,
             plan_amount=1.00,  # R$ 1.00 para teste
@@ -1172,16 +961,20 @@ async def activate_subscription_manual(
         )
         db.add(subscription)
         await db.flush()  # Para obter o ID
+        aggregate = BillingAggregate(subscription, current_user, None)
         logger.info(f"Nova assinatura criada automaticamente para usuário {current_user.id}")
+    subscription = aggregate.subscription
 
     if subscription.status == "active":
         return {"message": "Assinatura já está ativa"}
 
     # Ativar assinatura
-    subscription.status = "active"
-    subscription.last_payment_date = date.today()
-    subscription.next_billing_date = date.today() + timedelta(days=30)
-    current_user.subscription_status = "active"
+    billing.transition(
+        aggregate,
+        "active",
+        last_payment_date=date.today(),
+        next_billing_date=date.today() + timedelta(days=30)
+    )
 
     await db.commit()
 
@@ -1263,12 +1056,8 @@ async def change_subscription_plan(
             )
 
     # Buscar assinatura atual
-    result = await db.execute(
-        select(Subscription).where(
-            Subscription.professional_id == current_user.id
-        )
-    )
-    existing_subscription = result.scalar_one_or_none()
+    aggregate = await billing.load(db, professional_id=current_user.id)
+    existing_subscription = aggregate.subscription if aggregate else None
 
     # Verificar se ja tem mudanca agendada
     if existing_subscription and existing_subscription.scheduled_plan_id:
@@ -1310,15 +1099,7 @@ async def change_subscription_plan(
     if new_plan.price == 0 or new_plan.slug == "trial":
         if existing_subscription and existing_subscription.mercadopago_preapproval_id:
             try:
-                async with httpx.AsyncClient() as client:
-                    await client.put(
-                        f"https://api.mercadopago.com/preapproval/{existing_subscription.mercadopago_preapproval_id}",
-                        json={"status": "cancelled"},
-                        headers={
-                            "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}",
-                            "Content-Type": "application/json"
-                        }
-                    )
+                await mercadopago_gateway.cancel_preapproval(existing_subscription.mercadopago_preapproval_id)
                 logger.info(f"Assinatura MP cancelada para mudanca de plano: {existing_subscription.mercadopago_preapproval_id}")
             except Exception as e:
                 logger.error(f"Erro ao cancelar assinatura MP: {str(e)}")
@@ -1327,14 +1108,17 @@ async def change_subscription_plan(
         trial_end_date = date.today() + timedelta(days=trial_days)
 
         if existing_subscription:
-            existing_subscription.plan_id = new_plan.id
-            existing_subscription.status = "active"
-            existing_subscription.trial_ends_at = trial_end_date
-            existing_subscription.plan_amount = 0.0
-            existing_subscription.mercadopago_preapproval_id = None
-            existing_subscription.init_point = None
-            existing_subscription.scheduled_plan_id = None
-            existing_subscription.scheduled_plan_change_date = None
+            billing.transition(
+                aggregate,
+                "active",
+                plan_id=new_plan.id,
+                trial_ends_at=trial_end_date,
+                plan_amount=0.0,
+                mercadopago_preapproval_id=None,
+                init_point=None,
+                scheduled_plan_id=None,
+                scheduled_plan_change_date=None
+            )
         else:
             new_subscription = Subscription(
                 professional_id=current_user.id,
@@ -1344,9 +1128,9 @@ async def change_subscription_plan(
                 plan_amount=0.0
             )
             db.add(new_subscription)
+            current_user.subscription_status = "active"
 
         current_user.subscription_plan_id = new_plan.id
-        current_user.subscription_status = "active"
         current_user.trial_ends_at = datetime.combine(trial_end_date, datetime.min.time())
 
         await db.commit()
@@ -1435,28 +1219,20 @@ async def change_subscription_plan(
     if existing_subscription and existing_subscription.mercadopago_preapproval_id:
         if existing_subscription.status in ["active", "pending"]:
             try:
-                async with httpx.AsyncClient() as client:
-                    await client.put(
-                        f"https://api.mercadopago.com/preapproval/{existing_subscription.mercadopago_preapproval_id}",
-                        json={"status": "cancelled"},
-                        headers={
-                            "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}",
-                            "Content-Type": "application/json"
-                        }
-                    )
+                await mercadopago_gateway.cancel_preapproval(existing_subscription.mercadopago_preapproval_id)
                 logger.info(f"Assinatura MP anterior cancelada: {existing_subscription.mercadopago_preapproval_id}")
             except Exception as e:
                 logger.error(f"Erro ao cancelar assinatura MP anterior: {str(e)}")
 
     # Criar nova assinatura no MP
     try:
-        name_parts = current_user.name.split(" ", 1) if current_user.name else ["Usuario", ""]
-        first_name = name_parts[0]
-        last_name = name_parts[1] if len(name_parts) > 1 else first_name
-
         # Para upgrade com pro-rata, definir a primeira cobranca como o pro-rata
-        # e as proximas como o valor cheio
+        # e as proximas como o valor cheio (assinatura propria do usuario)
         if prorata_amount > 0:
+            name_parts = current_user.name.split(" ", 1) if current_user.name else ["Usuario", ""]
+            first_name = name_parts[0]
+            last_name = name_parts[1] if len(name_parts) > 1 else first_name
+
             # Criar assinatura com primeira cobranca = pro-rata
             plan_data = {
                 "reason": f"Upgrade para Plano {new_plan.name} - ContrataPro",
@@ -1475,54 +1251,41 @@ async def change_subscription_plan(
                 "back_url": f"{settings.FRONTEND_URL}/subscription/callback",
                 "external_reference": f"{current_user.id}_upgrade",
             }
-        else:
-            # Assinatura normal (trial para pago ou sem pro-rata)
-            plan_data = {
-                "reason": f"Plano {new_plan.name} - ContrataPro",
-                "auto_recurring": {
-                    "frequency": settings.SUBSCRIPTION_FREQUENCY,
-                    "frequency_type": settings.SUBSCRIPTION_FREQUENCY_TYPE,
-                    "transaction_amount": new_plan.price,
-                    "currency_id": "BRL",
-                },
-                "payer_email": current_user.email,
-                "back_url": f"{settings.FRONTEND_URL}/subscription/callback",
-                "external_reference": str(current_user.id),
-            }
 
-        if current_user.cpf:
-            plan_data["payer"] = {
-                "first_name": first_name,
-                "last_name": last_name,
-                "email": current_user.email,
-                "identification": {
-                    "type": "CPF",
-                    "number": current_user.cpf.replace(".", "").replace("-", "")
+            if current_user.cpf:
+                plan_data["payer"] = {
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "email": current_user.email,
+                    "identification": {
+                        "type": "CPF",
+                        "number": current_user.cpf.replace(".", "").replace("-", "")
+                    }
                 }
-            }
 
-        logger.info(f"Criando novo plano MP para mudanca: {plan_data}")
+            logger.info(f"Criando novo plano MP para mudanca: {plan_data}")
 
-        async with httpx.AsyncClient() as client:
-            plan_response = await client.post(
-                "https://api.mercadopago.com/preapproval",
-                json=plan_data,
-                headers={
-                    "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}",
-                    "Content-Type": "application/json"
-                }
-            )
+            plan_response = await mercadopago_gateway.post("/preapproval", json=plan_data)
 
-        if plan_response.status_code not in [200, 201]:
-            logger.error(f"Erro ao criar plano MP: {plan_response.status_code} - {plan_response.text}")
-            raise HTTPException(
-                status_code=500,
-                detail="Erro ao criar novo plano no Mercado Pago"
-            )
+            if plan_response.status_code not in [200, 201]:
+                logger.error(f"Erro ao criar plano MP: {plan_response.status_code} - {plan_response.text}")
+                raise HTTPException(
+                    status_code=500,
+                    detail="Erro ao criar novo plano no Mercado Pago"
+                )
 
-        mp_plan = plan_response.json()
-        mp_plan_id = mp_plan["id"]
-        mp_init_point = mp_plan.get("init_point")
+            mp_plan = plan_response.json()
+            mp_plan_id = mp_plan["id"]
+            mp_init_point = mp_plan.get("init_point")
+        else:
+            # Assinatura normal (trial para pago ou sem pro-rata): plano do MP
+            # compartilhado pelos assinantes do novo plano (cacheado)
+            mp_plan_id, mp_init_point = await mercadopago_plans.get_or_create(
+                reason=f"Plano {new_plan.name} - ContrataPro",
+                amount=new_plan.price,
+                subscription_plan_id=new_plan.id
+            )
+            mp_init_point = checkout_url(mp_init_point, current_user.id)
 
         if not mp_init_point:
             raise HTTPException(
@@ -1532,16 +1295,19 @@ async def change_subscription_plan(
 
         # Atualizar assinatura no banco
         if existing_subscription:
-            existing_subscription.plan_id = new_plan.id
-            existing_subscription.status = "pending"
-            existing_subscription.trial_ends_at = None
-            existing_subscription.plan_amount = new_plan.price
-            existing_subscription.mercadopago_preapproval_id = mp_plan_id
-            existing_subscription.init_point = mp_init_point
-            existing_subscription.cancelled_at = None
-            existing_subscription.cancellation_reason = None
-            existing_subscription.scheduled_plan_id = None
-            existing_subscription.scheduled_plan_change_date = None
+            billing.transition(
+                aggregate,
+                "pending",
+                plan_id=new_plan.id,
+                trial_ends_at=None,
+                plan_amount=new_plan.price,
+                mercadopago_preapproval_id=mp_plan_id,
+                init_point=mp_init_point,
+                cancelled_at=None,
+                cancellation_reason=None,
+                scheduled_plan_id=None,
+                scheduled_plan_change_date=None
+            )
         else:
             new_subscription = Subscription(
                 professional_id=current_user.id,
@@ -1552,9 +1318,9 @@ async def change_subscription_plan(
                 init_point=mp_init_point
             )
             db.add(new_subscription)
+            current_user.subscription_status = "pending"
 
         current_user.subscription_plan_id = new_plan.id
-        current_user.subscription_status = "pending"
         current_user.trial_ends_at = None
 
         await db.commit()
@@ -1657,15 +1423,7 @@ async def admin_force_trial(
     # Cancelar assinatura MP se existir
     if subscription and subscription.mercadopago_preapproval_id:
         try:
-            async with httpx.AsyncClient() as client:
-                await client.put(
-                    f"https://api.mercadopago.com/preapproval/{subscription.mercadopago_preapproval_id}",
-                    json={"status": "cancelled"},
-                    headers={
-                        "Authorization": f"Bearer {settings.MERCADOPAGO_ACCESS_TOKEN}",
-                        "Content-Type": "application/json"
-                    }
-                )
+            await mercadopago_gateway.cancel_preapproval(subscription.mercadopago_preapproval_id)
             logger.info(f"[ADMIN] Assinatura MP cancelada: {subscription.mercadopago_preapproval_id}")
         except Exception as e:
             logger.error(f"[ADMIN] Erro ao cancelar assinatura MP: {str(e)}")
@@ -1676,13 +1434,16 @@ async def admin_force_trial(
     reason = request_data.reason if request_data and request_data.reason else "Forçado por administrador"
 
     if subscription:
-        subscription.plan_id = trial_plan.id
-        subscription.status = "active"
-        subscription.trial_ends_at = trial_end_date
-        subscription.plan_amount = 0.0
-        subscription.mercadopago_preapproval_id = None
-        subscription.init_point = None
-        subscription.cancellation_reason = f"[ADMIN] {reason}"
+        billing.transition(
+            BillingAggregate(subscription, target_user, trial_plan),
+            "active",
+            plan_id=trial_plan.id,
+            trial_ends_at=trial_end_date,
+            plan_amount=0.0,
+            mercadopago_preapproval_id=None,
+            init_point=None,
+            cancellation_reason=f"[ADMIN] {reason}"
+        )
     else:
         subscription = Subscription(
             professional_id=user_id,
@@ -1692,9 +1453,9 @@ async def admin_force_trial(
             plan_amount=0.0
         )
         db.add(subscription)
+        target_user.subscription_status = "active"
 
     target_user.subscription_plan_id = trial_plan.id
-    target_user.subscription_status = "active"
     target_user.trial_ends_at = datetime.combine(trial_end_date, datetime.min.time())
 
     await db.commit()
@@ -1729,172 +1490,72 @@ async def mercadopago_webhook(
     """
     Webhook para receber notificações do Mercado Pago
     Documentação: https://www.mercadopago.com.br/developers/pt/docs/subscriptions/integration-configuration/subscription-payments-notification
+
+    Apenas valida e grava o evento na inbox (webhook_inbox), respondendo 200
+    na hora. O worker busca os detalhes no Mercado Pago e aplica a mudança
+    (ver services/webhook_inbox.py). Reentregas do mesmo evento são ignoradas.
     """
     try:
         body = await request.json()
-        logger.info(f"Webhook recebido: {body}")
-
-        # Verificar tipo de notificação
-        notification_type = body.get("type")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Payload inválido")
 
-        if notification_type == "preapproval":
-            # Notificação de assinatura
-            preapproval_id = body.get("data", {}).get("id")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Payload inválido")
 
-            if not preapproval_id:
-                logger.error("Webhook sem preapproval_id")
-                return {"status": "error", "message": "Missing preapproval_id"}
+    logger.info(f"Webhook recebido: {body}")
 
-            # Buscar detalhes da assinatura no MP
-            preapproval_response = sdk.preapproval().get(preapproval_id)
-            preapproval_data = preapproval_response["response"]
+    event = parse_event(body)
+    if event is None:
+        # Tipo não tratado ou sem data.id: 200 para o MP não reenviar
+        return {"status": "ignored"}
 
-            if preapproval_response["status"] != 200:
-                logger.error(
-                    f"Erro ao buscar preapproval: {preapproval_response}"
-                )
-                return {"status": "error"}
-
-            # Buscar assinatura no banco
-            result = await db.execute(
-                select(Subscription).where(
-                    Subscription.mercadopago_preapproval_id == preapproval_id
-                )
-            )
-            subscription = result.scalar_one_or_none()
+    if settings.MERCADOPAGO_WEBHOOK_SECRET and not verify_signature(
+        settings.MERCADOPAGO_WEBHOOK_SECRET,
+        request.headers.get("x-signature"),
+        request.headers.get("x-request-id"),
+        event.resource_id
+    ):
+        logger.warning(f"Webhook com assinatura inválida: {event.dedupe_key}")
+        raise HTTPException(status_code=401, detail="Assinatura inválida")
 
-            if not subscription:
-                logger.error(
-                    f"Assinatura não encontrada: {preapproval_id}"
-                )
-                return {"status": "error", "message": "Subscription not found"}
-
-            # Atualizar status baseado no status do MP
-            mp_status = preapproval_data.get("status")
-            external_reference = preapproval_data.get("external_reference")
-
-            # Buscar usuário
-            result = await db.execute(
-                select(User).where(
-                    User.id == int(external_reference)
-                )
-            )
-            user = result.scalar_one_or_none()
-
-            if mp_status == "authorized":
-                subscription.status = "active"
-                subscription.mercadopago_payer_id = preapproval_data.get(
-                    "payer_id"
-                )
-                subscription.last_payment_date = date.today()
-                subscription.next_billing_date = (
-                    date.today() + timedelta(days=30)
-                )
-                if user:
-                    user.subscription_status = "active"
-
-                    # Buscar nome do plano e enviar notificação
-                    if subscription.plan_id:
-                        plan_result = await db.execute(
-                            select(SubscriptionPlan).where(
-                                SubscriptionPlan.id == subscription.plan_id
-                            )
-                        )
-                        plan = plan_result.scalar_one_or_none()
-                        if plan:
-                            await notification_service.notify_subscription_activated(
-                                user_email=user.email,
-                                user_name=user.name,
-                                plan_name=plan.name,
-                                plan_price=subscription.plan_amount or plan.price,
-                                is_trial=False
-                            )
-
-            elif mp_status == "paused":
-                subscription.status = "paused"
-                if user:
-                    user.subscription_status = "inactive"
-
-            elif mp_status == "cancelled":
-                subscription.status = "cancelled"
-                subscription.cancelled_at = datetime.now()
-                if user:
-                    user.subscription_status = "cancelled"
-
-            await db.commit()
-            logger.info(
-                f"Assinatura atualizada: {subscription.id} -> {mp_status}"
-            )
-
-        elif notification_type == "payment":
-            # Notificação de pagamento individual
-            payment_id = body.get("data", {}).get("id")
-
-            if payment_id:
-                payment_response = sdk.payment().get(payment_id)
-                payment_data = payment_response["response"]
-
-                if payment_response["status"] == 200:
-                    preapproval_id = payment_data.get("preapproval_id")
-
-                    if preapproval_id:
-                        result = await db.execute(
-                            select(Subscription).where(
-                                Subscription.mercadopago_preapproval_id ==
-                                preapproval_id
-                            )
-                        )
-                        subscription = result.scalar_one_or_none()
-
-                        if subscription:
-                            subscription.last_payment_date = date.today()
-                            subscription.next_billing_date = (
-                                date.today() + timedelta(days=30)
-                            )
-                            await db.commit()
-                            logger.info(
-                                f"Pagamento processado: {payment_id}"
-                            )
-
-        return {"status": "ok"}
+    created = await store_event(db, event, body)
+    await db.commit()
 
-    except Exception as e:
-        logger.error(f"Erro no webhook: {str(e)}")
-        return {"status": "error", "message": str(e)}
+    if not created:
+        logger.info(f"Webhook duplicado ignorado: {event.dedupe_key}")
+    return {"status": "ok"}
 
 
 @router.get("/admin/all")
 async def list_all_subscriptions(
+    status: Optional[str] = None,
+    plan: Optional[str] = Query(None, description="Slug do plano"),
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    q: Optional[str] = Query(None, description="Busca por nome ou e-mail do profissional"),
+    sort: str = Query("created_at"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Lista todas as assinaturas (apenas admin)"""
+    """Lista assinaturas paginadas por cursor (apenas admin)"""
     if not current_user.is_admin:
         raise HTTPException(
             status_code=403,
             detail="Apenas administradores podem acessar"
         )
 
-    result = await db.execute(select(Subscription))
-    subscriptions = result.scalars().all()
+    query, filters = subscription_listing(status, plan, None, None, created_from, created_to, q)
+    rows, next_cursor, total = await paginate_listing(
+        db, query, filters, SUBSCRIPTION_SORTS, sort, order, size, cursor, Subscription.id
+    )
 
     return {
-        "subscriptions": [
-            {
-                "id": sub.id,
-                "professional_id": sub.professional_id,
-                "status": sub.status,
-                "plan_amount": sub.plan_amount,
-                "next_billing_date": (
-                    sub.next_billing_date.isoformat()
-                    if sub.next_billing_date else None
-                ),
-                "last_payment_date": (
-                    sub.last_payment_date.isoformat()
-                    if sub.last_payment_date else None
-                ),
-                "mercadopago_preapproval_id": sub.mercadopago_preapproval_id
-            }
-            for sub in subscriptions
-        ]
+        "subscriptions": [subscription_row(row) for row in rows],
+        "total": total,
+        "size": size,
+        "next_cursor": next_cursor
     }
@@ -9,6 +9,7 @@ from ..schemas import UserCreate, UserResponse, ProfessionalPublic, Professional
 from ..auth_utils import get_password_hash
 from ..dependencies import get_current_user
 from ..services.image_storage import image_storage
+from ..services.image_processing import image_set
 from .auth import validate_password_strength
 from ..slug_utils import generate_unique_slug
 
@@ -97,7 +98,11 @@ async def upload_profile_picture(
     await db.commit()
     await db.refresh(current_user)
 
-    return {"profile_picture": image_url, "message": "Foto de perfil atualizada com sucesso!"}
+    return {
+        "profile_picture": image_url,
+        "images": image_set(image_url).as_dict(),
+        "message": "Foto de perfil atualizada com sucesso!"
+    }
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
@@ -263,13 +268,18 @@ async def search_professionals_by_service(
     if city:
         query = query.filter(User.city.ilike(f"%{city}%"))
 
-    # Ordenar por prioridade do plano (Ouro aparece primeiro)
+    # Ordenar por prioridade do plano (Ouro aparece primeiro) e, dentro da
+    # mesma prioridade, pela pontuação de ranking pré-calculada
     from ..models import SubscriptionPlan
     query = query.join(
         SubscriptionPlan,
         User.subscription_plan_id == SubscriptionPlan.id,
         isouter=True
-    ).order_by(SubscriptionPlan.priority_in_search.desc())
+    ).order_by(
+        SubscriptionPlan.priority_in_search.desc(),
+        User.ranking_score.desc(),
+        User.id
+    )
 
     result = await db.execute(query)
     professionals = result.scalars().all()
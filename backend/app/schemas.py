@@ -1,7 +1,8 @@
 # backend/app/schemas.py
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, computed_field
+from typing import Any, Dict, Optional, List
 from datetime import time, date, datetime
+from .services.image_processing import image_set
 
 # Subscription Plan Schemas
 class SubscriptionPlanBase(BaseModel):
@@ -105,6 +106,12 @@ class ProfessionalPublic(BaseModel):
     average_rating: Optional[float] = None
     total_reviews: int = 0
 
+    @computed_field
+    @property
+    def profile_picture_variants(self) -> Optional[Dict[str, Any]]:
+        """URLs para srcset (variantes WebP e miniatura)"""
+        return image_set(self.profile_picture).as_dict() if self.profile_picture else None
+
     class Config:
         from_attributes = True
 
@@ -124,6 +131,12 @@ class ProfessionalSearchResult(BaseModel):
     average_rating: Optional[float] = None
     total_reviews: int = 0
 
+    @computed_field
+    @property
+    def profile_picture_variants(self) -> Optional[Dict[str, Any]]:
+        """URLs para srcset (variantes WebP e miniatura)"""
+        return image_set(self.profile_picture).as_dict() if self.profile_picture else None
+
     class Config:
         from_attributes = True
 
@@ -151,6 +164,12 @@ class ServiceResponse(ServiceBase):
     image_url: Optional[str] = None
     created_at: Optional[datetime] = None
 
+    @computed_field
+    @property
+    def image_variants(self) -> Optional[Dict[str, Any]]:
+        """URLs para srcset (variantes WebP e miniatura)"""
+        return image_set(self.image_url).as_dict() if self.image_url else None
+
     class Config:
         from_attributes = True
 
@@ -267,10 +286,11 @@ class NotificationResponse(NotificationBase):
 
 class NotificationPagination(BaseModel):
     items: List[NotificationResponse]
-    total: int
+    total: Optional[int] = None  # None na paginação por cursor
     page: int
     size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -305,6 +325,7 @@ class ReviewCommentResponse(BaseModel):
 class ReviewsSummaryResponse(BaseModel):
     average_rating: Optional[float] = None
     total_reviews: int = 0
+    rating_distribution: Dict[str, int] = {}  # Quantidade por estrela ("1" a "5")
     latest_comments: List[ReviewCommentResponse] = []
 
     class Config:
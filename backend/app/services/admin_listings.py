@@ -0,0 +1,163 @@
+"""
+Listagens administrativas (profissionais, clientes e assinaturas).
+
+Ordenacoes aceitas, filtros e a execucao paginada por cursor (ver
+pagination.py), compartilhados pelas rotas de /admin e /subscriptions/admin.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Subscription, SubscriptionPlan, User
+from .pagination import SortField, decode_cursor, keyset_page, page_result, parse_datetime
+
+# Ordenacoes aceitas nas listagens de usuarios (cada uma com indice (coluna, id))
+USER_SORTS = {
+    "created_at": SortField(User.created_at, parse_datetime),
+    "name": SortField(User.name, str),
+}
+
+
+def user_list_filters(
+    state: Optional[str],
+    city: Optional[str],
+    created_from: Optional[date],
+    created_to: Optional[date],
+    q: Optional[str]
+) -> list:
+    """Filtros comuns das listagens de profissionais e clientes"""
+    filters = []
+    if state:
+        filters.append(User.state == state)
+    if city:
+        filters.append(User.city.ilike(city))
+    # Intervalos em created_at (em vez de func.date) para usar o indice
+    if created_from:
+        filters.append(User.created_at >= datetime.combine(created_from, time.min))
+    if created_to:
+        filters.append(User.created_at < datetime.combine(created_to + timedelta(days=1), time.min))
+    if q:
+        # Indices trigram em name e email
+        pattern = f"%{q.strip()}%"
+        filters.append(or_(User.name.ilike(pattern), User.email.ilike(pattern)))
+    return filters
+
+
+async def paginate_listing(
+    db: AsyncSession,
+    query,
+    filters: list,
+    sorts: dict,
+    sort: str,
+    order: str,
+    size: int,
+    cursor: Optional[str],
+    id_column
+):
+    """
+    Executa a listagem paginada por cursor.
+
+    Returns:
+        tuple: (linhas da pagina, next_cursor, total - apenas na primeira pagina)
+    """
+    if sort not in sorts:
+        raise HTTPException(status_code=400, detail=f"Ordenação inválida. Opções: {', '.join(sorts)}")
+    field = sorts[sort]
+
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort, field)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    total = None
+    if not cursor:
+        count_query = query.with_only_columns(func.count(id_column)).order_by(None)
+        result = await db.execute(count_query.where(*filters))
+        total = result.scalar()
+
+    result = await db.execute(
+        keyset_page(query.where(*filters), field, id_column, order == "desc", size, after)
+    )
+    rows, next_cursor = page_result(result.mappings().all(), sort, sort, size)
+    return rows, next_cursor, total
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def user_row(row) -> dict:
+    return {**row, "created_at": _iso(row["created_at"])}
+
+
+# Ordenacoes aceitas na listagem de assinaturas
+SUBSCRIPTION_SORTS = {
+    "created_at": SortField(Subscription.created_at, parse_datetime),
+    "id": SortField(Subscription.id, int),
+}
+
+
+def subscription_listing(
+    status: Optional[str],
+    plan: Optional[str],
+    state: Optional[str],
+    city: Optional[str],
+    created_from: Optional[date],
+    created_to: Optional[date],
+    q: Optional[str]
+):
+    """Projecao (assinatura + profissional) e filtros da listagem de assinaturas"""
+    query = (
+        select(
+            Subscription.id,
+            Subscription.professional_id,
+            User.name.label("professional_name"),
+            User.email.label("professional_email"),
+            User.category.label("professional_category"),
+            User.city.label("professional_city"),
+            User.state.label("professional_state"),
+            Subscription.plan_id,
+            Subscription.plan_amount,
+            Subscription.status,
+            Subscription.next_billing_date,
+            Subscription.last_payment_date,
+            Subscription.cancelled_at,
+            Subscription.created_at,
+            Subscription.mercadopago_subscription_id,
+            Subscription.mercadopago_preapproval_id
+        )
+        .select_from(Subscription)
+        .outerjoin(User, User.id == Subscription.professional_id)
+    )
+
+    filters = []
+    if status:
+        filters.append(Subscription.status == status)
+    if plan:
+        filters.append(
+            Subscription.plan_id == select(SubscriptionPlan.id)
+            .where(SubscriptionPlan.slug == plan)
+            .scalar_subquery()
+        )
+    if created_from:
+        filters.append(Subscription.created_at >= datetime.combine(created_from, time.min))
+    if created_to:
+        filters.append(Subscription.created_at < datetime.combine(created_to + timedelta(days=1), time.min))
+    filters += user_list_filters(state, city, None, None, q)
+    return query, filters
+
+
+def subscription_row(row) -> dict:
+    return {
+        **row,
+        "next_billing_date": _iso(row["next_billing_date"]),
+        "last_payment_date": _iso(row["last_payment_date"]),
+        "cancelled_at": _iso(row["cancelled_at"]),
+        "created_at": _iso(row["created_at"]),
+    }
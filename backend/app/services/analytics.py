@@ -0,0 +1,161 @@
+"""
+Series temporais do painel administrativo a partir de daily_metrics.
+
+As series sao agregadas por dia, semana ou mes (date_trunc no banco, sobre
+a tabela de rollup, nunca sobre appointments/users/subscriptions) e
+devolvidas em formato colunar: uma lista de buckets e uma lista de valores
+por serie. Buckets sem dados entram com zero, entao todas as colunas tem o
+mesmo tamanho. iter_json/iter_csv geram a resposta em pedacos para o
+StreamingResponse, sem montar o documento inteiro em memoria.
+"""
+
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import func, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..models import DailyMetric
+
+BUCKETS = ("day", "week", "month")
+
+# Series de eventos (somadas no bucket)
+EVENT_SERIES = ("appointments", "new_professionals", "cancellations", "revenue")
+
+# Series de foto (ultimo valor do bucket)
+GAUGE_SERIES = ("mrr",)
+
+SERIES = EVENT_SERIES + GAUGE_SERIES
+
+# Cancelamentos sem codigo de motivo
+NO_REASON = "sem_motivo"
+
+
+class TimeSeries(NamedTuple):
+    buckets: List[date]
+    columns: Dict[str, List[float]]
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """Primeiro dia do bucket (semana comeca na segunda, como date_trunc)"""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_starts(start: date, end: date, bucket: str) -> List[date]:
+    """Todos os buckets de [start, end], em ordem"""
+    current = bucket_start(start, bucket)
+    starts = []
+    while current <= end:
+        starts.append(current)
+        if bucket == "month":
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if bucket == "week" else 1)
+    return starts
+
+
+def build_columns(
+    buckets: List[date],
+    values: Dict[str, Dict[date, float]]
+) -> Dict[str, List[float]]:
+    """Preenche com zero os buckets sem valor em cada serie"""
+    return {
+        name: [round(by_bucket.get(bucket, 0), 2) for bucket in buckets]
+        for name, by_bucket in values.items()
+    }
+
+
+async def load_timeseries(
+    db: AsyncSession,
+    start: date,
+    end: date,
+    bucket: str,
+    series: Iterable[str] = SERIES
+) -> TimeSeries:
+    """
+    Carrega as series pedidas agregadas por bucket.
+
+    cancellations vem com o total e uma coluna por motivo
+    (cancellations:<cancellation_reason_code>).
+    """
+    series = [name for name in SERIES if name in set(series)]
+    values: Dict[str, Dict[date, float]] = defaultdict(dict)
+    for name in series:
+        values[name] = {}
+
+    if bucket not in BUCKETS:
+        raise ValueError(f"Bucket invalido: {bucket}")
+    # Literal (nao parametro) para o GROUP BY reconhecer a mesma expressao do SELECT
+    period = func.date_trunc(literal_column(f"'{bucket}'"), DailyMetric.day).label("period")
+
+    events = [name for name in series if name in EVENT_SERIES]
+    if events:
+        result = await db.execute(
+            select(period, DailyMetric.metric, DailyMetric.dimension, func.sum(DailyMetric.value))
+            .where(DailyMetric.metric.in_(events), DailyMetric.day.between(start, end))
+            .group_by(period, DailyMetric.metric, DailyMetric.dimension)
+        )
+        for period_start, metric, dimension, value in result.all():
+            day = period_start.date() if hasattr(period_start, "date") else period_start
+            values[metric][day] = values[metric].get(day, 0) + value
+            if metric == "cancellations":
+                column = values[f"cancellations:{dimension or NO_REASON}"]
+                column[day] = column.get(day, 0) + value
+
+    gauges = [name for name in series if name in GAUGE_SERIES]
+    if gauges:
+        # Ultima foto de cada bucket
+        result = await db.execute(
+            select(period, DailyMetric.metric, DailyMetric.value)
+            .distinct(period, DailyMetric.metric)
+            .where(
+                DailyMetric.metric.in_(gauges),
+                DailyMetric.dimension == "",
+                DailyMetric.day.between(start, end)
+            )
+            .order_by(period, DailyMetric.metric, DailyMetric.day.desc())
+        )
+        for period_start, metric, value in result.all():
+            day = period_start.date() if hasattr(period_start, "date") else period_start
+            values[metric][day] = value
+
+    buckets = bucket_starts(start, end, bucket)
+    return TimeSeries(buckets, build_columns(buckets, values))
+
+
+def iter_json(timeseries: TimeSeries, meta: Optional[Dict[str, str]] = None) -> Iterator[str]:
+    """JSON colunar: {..meta, "buckets": [...], "series": {"nome": [...]}}"""
+    yield "{"
+    for key, value in (meta or {}).items():
+        yield f"{json.dumps(key)}:{json.dumps(value)},"
+    yield '"buckets":' + json.dumps([bucket.isoformat() for bucket in timeseries.buckets])
+    yield ',"series":{'
+    for index, (name, column) in enumerate(timeseries.columns.items()):
+        yield ("," if index else "") + f"{json.dumps(name)}:{json.dumps(column)}"
+    yield "}}"
+
+
+def iter_csv(timeseries: TimeSeries, chunk_rows: int = 500) -> Iterator[str]:
+    """CSV com uma linha por bucket e uma coluna por serie"""
+    names = list(timeseries.columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["bucket", *names])
+
+    for index, bucket in enumerate(timeseries.buckets, start=1):
+        writer.writerow([bucket.isoformat(), *(timeseries.columns[name][index - 1] for name in names)])
+        if index % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
@@ -0,0 +1,221 @@
+"""
+Dominio de cobranca: maquina de estados das assinaturas.
+
+Toda mudanca de status de uma assinatura passa por aqui:
+- TRANSITIONS define as transicoes validas; o resto levanta InvalidTransition;
+- load() carrega o agregado (assinatura + profissional + plano) em uma unica
+  consulta, travando a assinatura, em vez de buscar cada um separadamente;
+- transition() aplica o novo status na assinatura e o status correspondente
+  em users.subscription_status. As duas alteracoes vao no mesmo flush;
+- bulk_transition() faz o mesmo para um conjunto de assinaturas em um unico
+  statement (UPDATE de subscriptions em CTE + UPDATE de users);
+- activation_changes() da as colunas gravadas quando o preapproval e
+  autorizado no MP (webhook e reconciliacao).
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import and_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..models import Subscription, SubscriptionPlan, User
+
+logger = logging.getLogger(__name__)
+
+# Status de origem -> status de destino permitidos
+TRANSITIONS: Dict[str, frozenset] = {
+    "pending": frozenset({"pending", "active", "cancelled", "expired"}),
+    "active": frozenset({"active", "pending", "paused", "suspended", "cancelled", "expired"}),
+    "paused": frozenset({"paused", "active", "pending", "cancelled"}),
+    "suspended": frozenset({"suspended", "active", "pending", "cancelled"}),
+    "cancelled": frozenset({"cancelled", "pending", "active"}),
+    "expired": frozenset({"expired", "pending", "active", "cancelled"}),
+}
+
+# Status da assinatura -> users.subscription_status
+USER_STATUS = {
+    "pending": "pending",
+    "active": "active",
+    "paused": "inactive",
+    "suspended": "suspended",
+    "cancelled": "cancelled",
+    "expired": "expired",
+}
+
+
+class InvalidTransition(ValueError):
+    """Transicao de status nao permitida pela maquina de estados"""
+
+    def __init__(self, from_status: Optional[str], to_status: str):
+        super().__init__(f"Transição de assinatura inválida: {from_status} -> {to_status}")
+        self.from_status = from_status
+        self.to_status = to_status
+
+
+def _gateway_date(value: Any) -> Optional[date]:
+    """Data de um campo ISO 8601 do Mercado Pago (None se ausente ou invalido)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).date()
+    except ValueError:
+        return None
+
+
+def activation_changes(preapproval: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Colunas da assinatura ao ativar um preapproval autorizado.
+
+    Usa a ultima cobranca e a proxima data de pagamento informadas pelo MP;
+    sem elas, considera o pagamento feito hoje e o proximo em 30 dias.
+    """
+    last_payment = _gateway_date((preapproval.get("summarized") or {}).get("last_charged_date")) or date.today()
+    next_billing = _gateway_date(preapproval.get("next_payment_date")) or last_payment + timedelta(days=30)
+    return {
+        "mercadopago_payer_id": preapproval.get("payer_id"),
+        "last_payment_date": last_payment,
+        "next_billing_date": next_billing,
+    }
+
+
+class BillingAggregate(NamedTuple):
+    subscription: Subscription
+    user: User
+    plan: Optional[SubscriptionPlan]
+
+
+def can_transition(from_status: Optional[str], to_status: str) -> bool:
+    """Assinatura sem status (recem-criada) e tratada como pending"""
+    return to_status in TRANSITIONS.get(from_status or "pending", frozenset())
+
+
+class BillingService:
+    """Transicoes de assinatura com o agregado carregado uma unica vez"""
+
+    async def load(
+        self,
+        db: AsyncSession,
+        *,
+        professional_id: Optional[int] = None,
+        subscription_id: Optional[int] = None,
+        preapproval_id: Optional[str] = None,
+        lock: bool = True
+    ) -> Optional[BillingAggregate]:
+        """
+        Carrega assinatura, profissional e plano em uma consulta.
+
+        Informe um dos filtros. Com lock=True a assinatura fica travada
+        (FOR UPDATE) ate o fim da transacao.
+        """
+        if professional_id is not None:
+            condition = Subscription.professional_id == professional_id
+        elif subscription_id is not None:
+            condition = Subscription.id == subscription_id
+        elif preapproval_id is not None:
+            condition = Subscription.mercadopago_preapproval_id == preapproval_id
+        else:
+            raise ValueError("Informe professional_id, subscription_id ou preapproval_id")
+
+        query = (
+            select(Subscription, User, SubscriptionPlan)
+            .join(User, User.id == Subscription.professional_id)
+            .outerjoin(SubscriptionPlan, SubscriptionPlan.id == Subscription.plan_id)
+            .where(condition)
+        )
+        if lock:
+            query = query.with_for_update(of=Subscription)
+
+        result = await db.execute(query)
+        row = result.first()
+        return BillingAggregate(*row) if row else None
+
+    def transition(
+        self,
+        aggregate: BillingAggregate,
+        to_status: str,
+        *,
+        user_status: Optional[str] = None,
+        **changes: Any
+    ) -> str:
+        """
+        Aplica a transicao na assinatura e no usuario (sem commit).
+
+        Args:
+            aggregate: Agregado carregado por load()
+            to_status: Novo status da assinatura
+            user_status: Sobrescreve o users.subscription_status padrao
+            **changes: Demais colunas da assinatura a alterar
+
+        Returns:
+            str: Status anterior da assinatura
+
+        Raises:
+            InvalidTransition: Transicao nao permitida
+        """
+        subscription, user, _ = aggregate
+        previous = subscription.status
+        if not can_transition(previous, to_status):
+            raise InvalidTransition(previous, to_status)
+
+        if to_status == "cancelled" and previous != "cancelled" and "cancelled_at" not in changes:
+            changes["cancelled_at"] = datetime.now()
+
+        for column, value in changes.items():
+            if not hasattr(Subscription, column):
+                raise AttributeError(f"Subscription não tem a coluna {column}")
+            setattr(subscription, column, value)
+
+        subscription.status = to_status
+        if user is not None:
+            user.subscription_status = user_status or USER_STATUS[to_status]
+
+        if previous != to_status:
+            logger.info(f"Assinatura {subscription.id}: {previous} -> {to_status}")
+        return previous
+
+    async def bulk_transition(
+        self,
+        db: AsyncSession,
+        to_status: str,
+        *conditions,
+        user_status: Optional[str] = None,
+        **changes: Any
+    ) -> List[int]:
+        """
+        Transiciona todas as assinaturas que atendem as condicoes em um unico
+        statement, atualizando tambem o status dos usuarios.
+
+        So assinaturas cujo status atual permite a transicao sao alteradas.
+
+        Returns:
+            list: IDs das assinaturas alteradas
+        """
+        sources: Sequence[str] = [
+            status for status, targets in TRANSITIONS.items() if to_status in targets
+        ]
+        table = Subscription.__table__
+        users = User.__table__
+
+        changed = (
+            update(table)
+            .where(and_(table.c.status.in_(sources), *conditions))
+            .values(status=to_status, **changes)
+            .returning(table.c.id, table.c.professional_id)
+            .cte("changed")
+        )
+        result = await db.execute(
+            update(users)
+            .where(users.c.id == changed.c.professional_id)
+            .values(subscription_status=user_status or USER_STATUS[to_status])
+            .returning(changed.c.id)
+        )
+        ids = [subscription_id for (subscription_id,) in result.all()]
+        logger.info(f"{len(ids)} assinaturas -> {to_status}")
+        return ids
+
+
+# Instancia singleton
+billing = BillingService()
@@ -0,0 +1,368 @@
+"""
+Reconciliacao das assinaturas locais com o Mercado Pago.
+
+Webhooks podem se perder (MP fora do ar, evento descartado apos muitas
+tentativas), entao o status local de uma assinatura pode divergir do
+preapproval no Mercado Pago. Este job percorre todos os preapprovals da
+conta e corrige a base local:
+
+- as paginas da busca do MP sao buscadas em paralelo, com concorrencia
+  limitada (RECONCILIATION_CONCURRENCY) para nao estourar o rate limit;
+- cada pagina e comparada com as assinaturas locais em uma unica consulta
+  (WHERE preapproval_id IN (...)), sem uma ida ao banco por assinatura;
+- as correcoes sao aplicadas em UPDATEs agrupados por status, na transacao
+  da pagina. Ativacoes gravam tambem pagador e datas de cobranca, como o
+  webhook (billing.activation_changes), e somam a receita em daily_metrics
+  (o UPDATE em massa nao passa pelo after_flush).
+
+Divergencias que nao devem ser corrigidas automaticamente (ex: assinatura
+cancelada aqui e autorizada no MP) entram apenas no relatorio.
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..config import settings
+from ..database import JobsSessionLocal
+from ..models import Subscription, User
+from .billing import USER_STATUS, activation_changes, can_transition
+from .daily_metrics import payment_deltas, record_increments
+from .job_ledger import job_ledger
+from .job_metrics import job_metrics
+from .mercadopago_gateway import MercadoPagoGateway, mercadopago_gateway
+
+logger = logging.getLogger(__name__)
+
+# Status do preapproval no MP -> status da assinatura
+MP_STATUS = {
+    "authorized": "active",
+    "paused": "paused",
+    "cancelled": "cancelled",
+    "pending": "pending",
+}
+
+# Status do preapproval no MP -> (status da assinatura, subscription_status do usuario)
+STATUS_MAP = {mp_status: (status, USER_STATUS[status]) for mp_status, status in MP_STATUS.items()}
+
+# Status locais que esperam um preapproval vivo no MP
+LIVE_STATUSES = ("active", "paused")
+
+# Quantidade de ids guardados por tipo de divergencia no relatorio
+REPORT_SAMPLE_SIZE = 50
+
+
+class LocalSubscription(NamedTuple):
+    id: int
+    preapproval_id: str
+    status: str
+    user_id: int
+    user_status: Optional[str]
+    scheduled_cancellation_date: Optional[date]
+
+
+class Correction(NamedTuple):
+    subscription_id: int
+    user_id: int
+    from_status: str
+    status: str
+    user_status: str
+    # Demais colunas da assinatura (ativacao: pagador e datas de cobranca)
+    changes: Optional[Dict[str, Any]] = None
+
+
+class PageDiff(NamedTuple):
+    corrections: List[Correction]
+    report_only: List[Dict[str, Any]]
+    missing_locally: List[str]
+
+
+def diff_page(remote: Iterable[Dict[str, Any]], local: Dict[str, LocalSubscription]) -> PageDiff:
+    """
+    Compara os preapprovals de uma pagina com as assinaturas locais.
+
+    Args:
+        remote: Preapprovals retornados pelo MP
+        local: Assinaturas locais indexadas pelo id do preapproval
+    """
+    corrections: List[Correction] = []
+    report_only: List[Dict[str, Any]] = []
+    missing_locally: List[str] = []
+
+    for preapproval in remote:
+        preapproval_id = str(preapproval.get("id"))
+        mp_status = preapproval.get("status")
+        subscription = local.get(preapproval_id)
+
+        if subscription is None:
+            missing_locally.append(preapproval_id)
+            continue
+
+        target = STATUS_MAP.get(mp_status)
+        if target is None:
+            report_only.append({
+                "subscription_id": subscription.id,
+                "preapproval_id": preapproval_id,
+                "local_status": subscription.status,
+                "mp_status": mp_status,
+                "reason": "Status do MP desconhecido",
+            })
+            continue
+
+        status, user_status = target
+        if subscription.status == status and subscription.user_status == user_status:
+            continue
+
+        # Cancelamento agendado: o MP ja parou a recorrencia, mas a assinatura
+        # continua ativa ate scheduled_cancellation_date (job diario)
+        if mp_status == "cancelled" and subscription.scheduled_cancellation_date:
+            continue
+
+        reason = None
+        if subscription.status in ("cancelled", "expired") and status != "cancelled":
+            reason = "Assinatura encerrada localmente e viva no MP"
+        elif subscription.status == "active" and status == "pending":
+            reason = "Assinatura ativa localmente e pendente no MP"
+        elif not can_transition(subscription.status, status):
+            reason = "Transição não permitida pela máquina de estados"
+
+        if reason:
+            report_only.append({
+                "subscription_id": subscription.id,
+                "preapproval_id": preapproval_id,
+                "local_status": subscription.status,
+                "mp_status": mp_status,
+                "reason": reason,
+            })
+            continue
+
+        corrections.append(Correction(
+            subscription_id=subscription.id,
+            user_id=subscription.user_id,
+            from_status=subscription.status,
+            status=status,
+            user_status=user_status,
+            changes=activation_changes(preapproval) if status == "active" else None
+        ))
+
+    return PageDiff(corrections, report_only, missing_locally)
+
+
+class DriftReport:
+    """Resumo das divergencias encontradas em uma reconciliacao"""
+
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.checked = 0
+        self.corrected = 0
+        self.transitions: Dict[str, int] = {}
+        self.report_only: List[Dict[str, Any]] = []
+        self.missing_locally: List[str] = []
+        self.missing_remote: List[int] = []
+        self.missing_locally_count = 0
+        self.report_only_count = 0
+        self.missing_remote_count = 0
+
+    def add_page(self, checked: int, diff: PageDiff):
+        self.checked += checked
+        self.corrected += len(diff.corrections)
+        for correction in diff.corrections:
+            key = f"{correction.from_status}->{correction.status}"
+            self.transitions[key] = self.transitions.get(key, 0) + 1
+
+        self.report_only_count += len(diff.report_only)
+        self.missing_locally_count += len(diff.missing_locally)
+        self.report_only.extend(diff.report_only[:REPORT_SAMPLE_SIZE - len(self.report_only)])
+        self.missing_locally.extend(
+            diff.missing_locally[:REPORT_SAMPLE_SIZE - len(self.missing_locally)]
+        )
+
+    def add_missing_remote(self, subscription_ids: List[int]):
+        self.missing_remote_count = len(subscription_ids)
+        self.missing_remote = subscription_ids[:REPORT_SAMPLE_SIZE]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "dry_run": self.dry_run,
+            "checked": self.checked,
+            "corrected": self.corrected,
+            "transitions": self.transitions,
+            "report_only": {"count": self.report_only_count, "items": self.report_only},
+            "missing_locally": {"count": self.missing_locally_count, "ids": self.missing_locally},
+            "missing_remote": {"count": self.missing_remote_count, "ids": self.missing_remote},
+        }
+
+
+class BillingReconciliationService:
+    """Compara e corrige assinaturas locais a partir do Mercado Pago"""
+
+    def __init__(self, gateway: Optional[MercadoPagoGateway] = None):
+        self.gateway = gateway or mercadopago_gateway
+
+    async def run_reconciliation_job(self):
+        """Job diario (recomendado: 03:00), uma execucao por dia no ledger"""
+        async with job_ledger.run("billing_reconciliation", date.today().isoformat()) as run_id:
+            if run_id is None:
+                return
+            await job_ledger.stage(run_id, "reconcile_subscriptions", self.reconcile)
+
+    async def reconcile(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Percorre os preapprovals do MP e corrige as assinaturas locais.
+
+        Args:
+            dry_run: Apenas gera o relatorio, sem alterar o banco
+
+        Raises:
+            MercadoPagoError: Falha ao buscar uma pagina no Mercado Pago
+        """
+        report = DriftReport(dry_run=dry_run)
+        seen: Set[str] = set()
+
+        async def handle_page(results: List[Dict[str, Any]]):
+            seen.update(str(preapproval.get("id")) for preapproval in results)
+            async with JobsSessionLocal() as db:
+                diff = await self._reconcile_page(db, results, dry_run)
+                if not dry_run:
+                    await db.commit()
+            report.add_page(len(results), diff)
+            job_metrics.count(rows=len(diff.corrections), failures=len(diff.report_only))
+
+        await self.fetch_pages(handle_page)
+
+        async with JobsSessionLocal() as db:
+            report.add_missing_remote(await self._missing_remote(db, seen))
+
+        summary = report.as_dict()
+        logger.info(
+            f"Reconciliacao MP{' (dry run)' if dry_run else ''}: "
+            f"{report.checked} verificadas, {report.corrected} corrigidas, "
+            f"{report.report_only_count} para revisao, "
+            f"{report.missing_locally_count} sem assinatura local, "
+            f"{report.missing_remote_count} sem preapproval no MP"
+        )
+        return summary
+
+    async def fetch_pages(self, handle_page: Callable[[List[Dict[str, Any]]], Awaitable[None]]) -> int:
+        """
+        Busca todas as paginas de preapprovals com concorrencia limitada e
+        entrega cada uma a handle_page assim que chega.
+
+        Returns:
+            int: Total de preapprovals informado pelo MP
+        """
+        page_size = settings.RECONCILIATION_PAGE_SIZE
+        semaphore = asyncio.Semaphore(settings.RECONCILIATION_CONCURRENCY)
+
+        first = await self.gateway.search_preapprovals(offset=0, limit=page_size)
+        total = first.get("paging", {}).get("total", 0)
+        await handle_page(first.get("results", []))
+
+        async def fetch(offset: int):
+            async with semaphore:
+                page = await self.gateway.search_preapprovals(offset=offset, limit=page_size)
+                await handle_page(page.get("results", []))
+
+        await asyncio.gather(*(fetch(offset) for offset in range(page_size, total, page_size)))
+        return total
+
+    async def _reconcile_page(
+        self,
+        db: AsyncSession,
+        results: List[Dict[str, Any]],
+        dry_run: bool
+    ) -> PageDiff:
+        ids = [str(preapproval.get("id")) for preapproval in results]
+        if not ids:
+            return PageDiff([], [], [])
+
+        result = await db.execute(
+            select(
+                Subscription.id,
+                Subscription.mercadopago_preapproval_id,
+                Subscription.status,
+                User.id,
+                User.subscription_status,
+                Subscription.scheduled_cancellation_date
+            )
+            .join(User, User.id == Subscription.professional_id)
+            .where(Subscription.mercadopago_preapproval_id.in_(ids))
+            .with_for_update(of=Subscription)
+        )
+        local = {row[1]: LocalSubscription(*row) for row in result.all()}
+
+        diff = diff_page(results, local)
+        if not dry_run:
+            await self._apply(db, diff.corrections)
+        return diff
+
+    async def _apply(self, db: AsyncSession, corrections: List[Correction]):
+        """Aplica as correcoes com um UPDATE por status de destino"""
+        groups: Dict[tuple, List[Correction]] = {}
+        for correction in corrections:
+            groups.setdefault((correction.status, correction.user_status), []).append(correction)
+
+        for (status, user_status), group in groups.items():
+            values: Dict[str, Any] = {"status": status}
+            if status == "cancelled":
+                values["cancelled_at"] = func.coalesce(
+                    Subscription.__table__.c.cancelled_at, datetime.now()
+                )
+
+            if status == "active":
+                await self._record_revenue(db, group)
+                # Datas de cobranca diferentes por assinatura: UPDATE em lote pela chave primaria
+                await db.execute(
+                    update(Subscription),
+                    [{"id": c.subscription_id, **values, **(c.changes or {})} for c in group]
+                )
+            else:
+                await db.execute(
+                    update(Subscription.__table__)
+                    .where(Subscription.id.in_([c.subscription_id for c in group]))
+                    .values(**values)
+                )
+            await db.execute(
+                update(User.__table__)
+                .where(User.id.in_([c.user_id for c in group]))
+                .values(subscription_status=user_status)
+            )
+            logger.info(f"Reconciliacao MP: {len(group)} assinaturas -> {status}")
+
+    async def _record_revenue(self, db: AsyncSession, group: List[Correction]):
+        """Receita dos pagamentos gravados pelas ativacoes (antes do UPDATE)"""
+        result = await db.execute(
+            select(Subscription.id, Subscription.last_payment_date, Subscription.plan_amount)
+            .where(Subscription.id.in_([c.subscription_id for c in group]))
+        )
+        current = {sub_id: (previous, amount) for sub_id, previous, amount in result.all()}
+
+        payments = []
+        for correction in group:
+            previous, amount = current.get(correction.subscription_id, (None, None))
+            payments.append((previous, (correction.changes or {}).get("last_payment_date"), amount))
+        await record_increments(db, payment_deltas(payments))
+
+    async def _missing_remote(self, db: AsyncSession, seen: Set[str]) -> List[int]:
+        """Assinaturas vivas localmente cujo preapproval nao veio na busca do MP"""
+        result = await db.execute(
+            select(Subscription.id, Subscription.mercadopago_preapproval_id)
+            .where(
+                Subscription.status.in_(LIVE_STATUSES),
+                Subscription.mercadopago_preapproval_id.isnot(None)
+            )
+            .order_by(Subscription.id)
+        )
+        return [
+            subscription_id for subscription_id, preapproval_id in result.all()
+            if preapproval_id not in seen
+        ]
+
+
+# Instancia singleton
+billing_reconciliation = BillingReconciliationService()
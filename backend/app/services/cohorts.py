@@ -0,0 +1,230 @@
+"""
+Coortes semanais de cadastro e funil trial -> pago dos profissionais.
+
+Extrai uma linha compacta por profissional (cadastro, trial, conversao,
+cancelamento) e monta todas as coortes em uma unica passada: cada linha
+soma +1/-1 em vetores de diferencas da sua coorte (semana da conversao,
+semana do cancelamento), e as curvas saem das somas acumuladas. O custo e
+O(linhas + coortes x semanas), sem consultas por coorte.
+
+Definicoes (a data da primeira cobranca nao e gravada):
+- coorte: semana (segunda-feira) do cadastro;
+- conversao: assinatura com valor > 0 e pelo menos um pagamento. Data: fim
+  do trial (ou a ultima cobranca, se anterior); sem trial, a criacao da
+  assinatura;
+- retencao: pagantes ao fim da semana (convertidos ainda nao cancelados),
+  sobre o total de cadastros da coorte.
+
+O resultado fica em cache em memoria ate o dia seguinte.
+"""
+
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..models import Subscription, User
+
+logger = logging.getLogger(__name__)
+
+# Cancelamentos sem codigo de motivo
+NO_REASON = "sem_motivo"
+
+
+class CohortRow(NamedTuple):
+    signup: date
+    had_trial: bool
+    paid_on: Optional[date]
+    cancelled_on: Optional[date]
+    paying: bool
+    reason: Optional[str]
+
+
+def _as_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def to_row(
+    created_at: datetime,
+    user_trial_ends_at: Optional[datetime],
+    status: Optional[str],
+    plan_amount: Optional[float],
+    sub_trial_ends_at: Optional[date],
+    last_payment_date: Optional[date],
+    sub_created_at: Optional[datetime],
+    cancelled_at: Optional[datetime],
+    reason_code: Optional[str]
+) -> CohortRow:
+    """Linha compacta a partir das colunas do extrato"""
+    signup = _as_date(created_at)
+    trial_end = _as_date(user_trial_ends_at) or sub_trial_ends_at
+    paid = bool(plan_amount) and plan_amount > 0 and last_payment_date is not None
+
+    paid_on = None
+    if paid:
+        if trial_end:
+            paid_on = min(trial_end, last_payment_date)
+        else:
+            paid_on = _as_date(sub_created_at) or last_payment_date
+        paid_on = max(paid_on, signup)
+
+    cancelled = status == "cancelled"
+    cancelled_on = _as_date(cancelled_at) if cancelled and cancelled_at else None
+    paying = paid and status == "active" and sub_trial_ends_at is None
+
+    return CohortRow(
+        signup=signup,
+        had_trial=trial_end is not None,
+        paid_on=paid_on,
+        cancelled_on=cancelled_on,
+        paying=paying,
+        reason=(reason_code or NO_REASON) if cancelled else None,
+    )
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def build_cohorts(
+    rows: Iterable[CohortRow],
+    today: date,
+    cohorts: int = 26,
+    horizon: int = 12
+) -> Dict[str, Any]:
+    """
+    Coortes das ultimas `cohorts` semanas com curvas de `horizon` semanas.
+
+    Semanas ainda nao iniciadas ficam None nas curvas.
+    """
+    first = week_start(today) - timedelta(weeks=cohorts - 1)
+    starts = [first + timedelta(weeks=index) for index in range(cohorts)]
+
+    signups = [0] * cohorts
+    trials = [0] * cohorts
+    converted = [0] * cohorts
+    # Vetores de diferencas: +1 na semana do evento, acumulados no final
+    conversion_diff = [[0] * horizon for _ in range(cohorts)]
+    paying_diff = [[0] * horizon for _ in range(cohorts)]
+
+    funnel = Counter()
+    reasons: Counter = Counter()
+
+    for row in rows:
+        funnel["signups"] += 1
+        funnel["trials"] += row.had_trial
+        funnel["converted"] += row.paid_on is not None
+        funnel["paying"] += row.paying
+        if row.reason:
+            funnel["cancelled"] += 1
+            reasons[row.reason] += 1
+
+        index = (row.signup - first).days // 7
+        if index < 0 or index >= cohorts:
+            continue
+
+        signups[index] += 1
+        trials[index] += row.had_trial
+        if row.paid_on is None:
+            continue
+
+        converted[index] += 1
+        paid_week = (row.paid_on - starts[index]).days // 7
+        if paid_week >= horizon:
+            continue
+        conversion_diff[index][paid_week] += 1
+        paying_diff[index][paid_week] += 1
+
+        if row.cancelled_on and row.cancelled_on >= row.paid_on:
+            cancelled_week = (row.cancelled_on - starts[index]).days // 7
+            if cancelled_week < horizon:
+                paying_diff[index][cancelled_week] -= 1
+
+    result = []
+    for index, start in enumerate(starts):
+        observed = min(horizon, (today - start).days // 7 + 1)
+        result.append({
+            "week": start.isoformat(),
+            "signups": signups[index],
+            "trials": trials[index],
+            "converted": converted[index],
+            "conversion": _curve(conversion_diff[index], signups[index], observed),
+            "retention": _curve(paying_diff[index], signups[index], observed),
+        })
+
+    return {
+        "cohorts": result,
+        "funnel": {
+            key: funnel[key] for key in ("signups", "trials", "converted", "paying", "cancelled")
+        },
+        "cancellation_reasons": dict(reasons.most_common()),
+    }
+
+
+def _curve(diff: List[int], total: int, observed: int) -> List[Optional[float]]:
+    """Soma acumulada dos eventos como fracao da coorte"""
+    curve: List[Optional[float]] = []
+    running = 0
+    for week, delta in enumerate(diff):
+        running += delta
+        if week >= observed:
+            curve.append(None)
+        else:
+            curve.append(round(running / total, 4) if total else 0.0)
+    return curve
+
+
+class CohortAnalysisService:
+    """Extrato dos profissionais e coortes com cache diario"""
+
+    def __init__(self):
+        self._cache: Dict[Tuple[date, int, int], Dict[str, Any]] = {}
+
+    async def cohorts(
+        self,
+        db: AsyncSession,
+        cohorts: int = 26,
+        horizon: int = 12,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        today = date.today()
+        key = (today, cohorts, horizon)
+        if not refresh and key in self._cache:
+            return self._cache[key]
+
+        rows = await self._extract(db)
+        data = {"generated_on": today.isoformat(), **build_cohorts(rows, today, cohorts, horizon)}
+
+        # Entradas de outros dias nao servem mais
+        self._cache = {k: v for k, v in self._cache.items() if k[0] == today}
+        self._cache[key] = data
+        logger.info(f"Coortes recalculadas: {len(rows)} profissionais")
+        return data
+
+    async def _extract(self, db: AsyncSession) -> List[CohortRow]:
+        result = await db.execute(
+            select(
+                User.created_at,
+                User.trial_ends_at,
+                Subscription.status,
+                Subscription.plan_amount,
+                Subscription.trial_ends_at,
+                Subscription.last_payment_date,
+                Subscription.created_at,
+                Subscription.cancelled_at,
+                Subscription.cancellation_reason_code
+            )
+            .select_from(User)
+            .outerjoin(Subscription, Subscription.professional_id == User.id)
+            .where(User.is_professional.is_(True), User.created_at.isnot(None))
+        )
+        return [to_row(*row) for row in result.all()]
+
+
+# Instancia singleton
+cohort_analysis = CohortAnalysisService()
@@ -0,0 +1,403 @@
+"""
+Metricas diarias pre-calculadas (daily_metrics) do painel administrativo.
+
+Dois tipos de metrica:
+- eventos, somados por dia no momento em que acontecem: um listener de
+  after_flush da sessao olha os objetos inseridos/alterados no flush e faz
+  um upsert incremental (value = value + delta) na mesma transacao;
+- fotos do estado atual (profissionais por status, por UF, MRR), gravadas
+  pelo job noturno com a data do dia.
+
+O job noturno tambem recalcula os eventos dos ultimos METRICS_COMPACTION_DAYS
+dias a partir das tabelas (consultas por intervalo, que usam indice), o que
+corrige o que foi alterado fora do ORM (UPDATEs em massa dos jobs). Receita
+nao e recalculada: so o ultimo pagamento de cada assinatura fica gravado.
+Por isso quem grava pagamentos com UPDATE em massa (ex: reconciliacao com o
+MP) registra a receita com payment_deltas() + record_increments().
+
+Assim o painel le apenas daily_metrics, sem varrer users, appointments e
+subscriptions a cada carregamento, e aceita graficos por intervalo de datas.
+"""
+
+import calendar
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, func, inspect, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import JobsSessionLocal
+from ..models import Appointment, DailyMetric, Subscription, User
+from .job_ledger import job_ledger
+from .job_metrics import job_metrics
+
+logger = logging.getLogger(__name__)
+
+# Metricas somadas por dia
+EVENT_METRICS = (
+    "appointments",
+    "new_professionals",
+    "new_clients",
+    "new_subscriptions",
+    "cancellations",
+    "revenue",
+)
+
+# Fotos do estado atual, uma por dia
+GAUGE_METRICS = (
+    "professionals",
+    "clients",
+    "professionals_by_state",
+    "active_professionals_by_state",
+    "mrr",
+)
+
+# Foto gravada sempre, mesmo sem nenhum profissional: marca o dia da foto
+SNAPSHOT_METRIC = "clients"
+
+# (metric, day, dimension)
+MetricKey = Tuple[str, date, str]
+
+
+# ==================== EVENTOS (INCREMENTAL) ====================
+
+def _changed_to(obj: Any, attribute: str) -> Tuple[bool, Any, Any]:
+    """(mudou?, valor anterior, valor novo) do atributo no flush atual"""
+    history = inspect(obj).attrs[attribute].history
+    if not history.added:
+        return False, None, None
+    previous = history.deleted[0] if history.deleted else None
+    return history.added[0] != previous, previous, history.added[0]
+
+
+def _add_revenue(deltas: Dict[MetricKey, float], paid_on: Optional[date], amount: Optional[float]):
+    if paid_on and (amount or 0) > 0:
+        deltas[("revenue", paid_on, "")] += amount
+
+
+def payment_deltas(payments: Iterable[Tuple[Optional[date], Optional[date], Optional[float]]]) -> Dict[MetricKey, float]:
+    """
+    Receita de pagamentos gravados fora do ORM (UPDATE em massa), que o
+    after_flush nao enxerga.
+
+    Args:
+        payments: (data do pagamento anterior, data gravada, valor do plano)
+    """
+    deltas: Dict[MetricKey, float] = defaultdict(float)
+    for previous, paid_on, amount in payments:
+        if paid_on != previous:
+            _add_revenue(deltas, paid_on, amount)
+    return deltas
+
+
+def collect_deltas(new: Iterable[Any], dirty: Iterable[Any], today: Optional[date] = None) -> Dict[MetricKey, float]:
+    """
+    Incrementos de metricas gerados pelos objetos de um flush.
+
+    Args:
+        new: Objetos inseridos
+        dirty: Objetos alterados
+    """
+    today = today or date.today()
+    deltas: Dict[MetricKey, float] = defaultdict(float)
+
+    for obj in new:
+        if isinstance(obj, User) and not obj.is_admin:
+            metric = "new_professionals" if obj.is_professional else "new_clients"
+            deltas[(metric, today, "")] += 1
+        elif isinstance(obj, Appointment) and not obj.is_manual_block and obj.date:
+            deltas[("appointments", obj.date, "")] += 1
+        elif isinstance(obj, Subscription):
+            deltas[("new_subscriptions", today, "")] += 1
+            _add_revenue(deltas, obj.last_payment_date, obj.plan_amount)
+
+    for obj in dirty:
+        if not isinstance(obj, Subscription):
+            continue
+
+        changed, previous, status = _changed_to(obj, "status")
+        if changed and status == "cancelled" and previous is not None:
+            deltas[("cancellations", today, obj.cancellation_reason_code or "")] += 1
+
+        changed, _, paid_on = _changed_to(obj, "last_payment_date")
+        if changed:
+            _add_revenue(deltas, paid_on, obj.plan_amount)
+
+    return deltas
+
+
+def _upsert_increments(deltas: Dict[MetricKey, float]):
+    table = DailyMetric.__table__
+    # Ordem fixa das chaves: transacoes concorrentes travam as linhas na
+    # mesma ordem e nao entram em deadlock
+    stmt = pg_insert(table).values([
+        {"metric": metric, "day": day, "dimension": dimension, "value": deltas[(metric, day, dimension)]}
+        for metric, day, dimension in sorted(deltas)
+    ])
+    return stmt.on_conflict_do_update(
+        constraint="uq_daily_metrics_metric_day_dimension",
+        set_={"value": table.c.value + stmt.excluded.value, "updated_at": func.now()}
+    )
+
+
+async def record_increments(db: AsyncSession, deltas: Dict[MetricKey, float]):
+    """Soma os incrementos em daily_metrics na transacao de quem chamou"""
+    if deltas:
+        await db.execute(_upsert_increments(deltas))
+
+
+def _after_flush(session: Session, flush_context):
+    deltas = collect_deltas(session.new, session.dirty)
+    if deltas:
+        session.connection().execute(_upsert_increments(deltas))
+
+
+# Vale para todas as sessoes (web e jobs): AsyncSession usa uma Session por baixo
+event.listen(Session, "after_flush", _after_flush)
+
+
+# ==================== COMPACTACAO E FOTOS ====================
+
+def month_bounds(day: date) -> Tuple[date, date]:
+    """Primeiro e ultimo dia do mes"""
+    return day.replace(day=1), day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def _day_bounds(start: date, end: date) -> Tuple[datetime, datetime]:
+    """Intervalo [start, end] em timestamps, para filtros que usam indice"""
+    return datetime.combine(start, time.min), datetime.combine(end + timedelta(days=1), time.min)
+
+
+class DailyMetricsService:
+    """Compactacao noturna e leitura das metricas do painel"""
+
+    async def run_compaction_job(self):
+        """Job noturno (recomendado: 02:30), uma execucao por dia no ledger"""
+        async with job_ledger.run("daily_metrics_compaction", date.today().isoformat()) as run_id:
+            if run_id is None:
+                return
+            await job_ledger.stage(run_id, "recompute_events", self.recompute_recent)
+            await job_ledger.stage(run_id, "take_snapshot", self.take_snapshot)
+
+    async def recompute_recent(self):
+        today = date.today()
+        if await self._latest_snapshot() is None:
+            # Primeira execucao depois do deploy: eventos do mes inteiro
+            await self.recompute(*month_bounds(today))
+            return
+        await self.recompute(today - timedelta(days=settings.METRICS_COMPACTION_DAYS), today)
+
+    async def initialize(self):
+        """
+        Primeira carga do painel antes do job noturno: recalcula os eventos
+        do mes a partir das tabelas e tira a foto do dia.
+        """
+        await self.recompute(*month_bounds(date.today()))
+        await self.take_snapshot()
+
+    async def _latest_snapshot(self) -> Optional[date]:
+        async with JobsSessionLocal() as db:
+            result = await db.execute(
+                select(func.max(DailyMetric.day)).where(DailyMetric.metric == SNAPSHOT_METRIC)
+            )
+            return result.scalar()
+
+    async def recompute(self, start: date, end: date):
+        """
+        Recalcula os eventos de [start, end] a partir das tabelas.
+        Tambem serve para o backfill inicial.
+        """
+        async with JobsSessionLocal() as db:
+            rows = await self._event_rows(db, start, end)
+            metrics = [metric for metric in EVENT_METRICS if metric != "revenue"]
+            await self._replace(db, metrics, start, end, rows)
+            await db.commit()
+
+        job_metrics.count(rows=len(rows))
+        logger.info(f"Metricas diarias recalculadas de {start} a {end}: {len(rows)} linhas")
+
+    async def take_snapshot(self, day: Optional[date] = None):
+        """Grava a foto do estado atual (profissionais, clientes, MRR) no dia"""
+        day = day or date.today()
+        async with JobsSessionLocal() as db:
+            rows = await self._gauge_rows(db, day)
+            await self._replace(db, GAUGE_METRICS, day, day, rows)
+            await db.commit()
+
+        job_metrics.count(rows=len(rows))
+
+    async def _replace(
+        self,
+        db: AsyncSession,
+        metrics: Iterable[str],
+        start: date,
+        end: date,
+        rows: List[Dict[str, Any]]
+    ):
+        """Substitui as metricas do intervalo (dias sem eventos ficam sem linha)"""
+        table = DailyMetric.__table__
+        await db.execute(
+            delete(table).where(
+                table.c.metric.in_(list(metrics)),
+                table.c.day.between(start, end)
+            )
+        )
+        if not rows:
+            return
+
+        stmt = pg_insert(table).values(rows)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_daily_metrics_metric_day_dimension",
+                set_={"value": stmt.excluded.value, "updated_at": func.now()}
+            )
+        )
+
+    async def _event_rows(self, db: AsyncSession, start: date, end: date) -> List[Dict[str, Any]]:
+        start_at, end_at = _day_bounds(start, end)
+        rows: List[Dict[str, Any]] = []
+
+        def add(metric: str, result, with_dimension: bool = False):
+            for row in result.all():
+                rows.append({
+                    "metric": metric,
+                    "day": row[0],
+                    "dimension": (row[1] or "") if with_dimension else "",
+                    "value": row[-1],
+                })
+
+        add("appointments", await db.execute(
+            select(Appointment.date, func.count(Appointment.id))
+            .where(
+                Appointment.date.between(start, end),
+                Appointment.is_manual_block.isnot(True)
+            )
+            .group_by(Appointment.date)
+        ))
+
+        signup_day = func.date(User.created_at)
+        for metric, is_professional in (("new_professionals", True), ("new_clients", False)):
+            add(metric, await db.execute(
+                select(signup_day, func.count(User.id))
+                .where(
+                    User.created_at >= start_at,
+                    User.created_at < end_at,
+                    User.is_professional.is_(is_professional),
+                    User.is_admin.isnot(True)
+                )
+                .group_by(signup_day)
+            ))
+
+        created_day = func.date(Subscription.created_at)
+        add("new_subscriptions", await db.execute(
+            select(created_day, func.count(Subscription.id))
+            .where(Subscription.created_at >= start_at, Subscription.created_at < end_at)
+            .group_by(created_day)
+        ))
+
+        cancelled_day = func.date(Subscription.cancelled_at)
+        add("cancellations", await db.execute(
+            select(cancelled_day, Subscription.cancellation_reason_code, func.count(Subscription.id))
+            .where(
+                Subscription.status == "cancelled",
+                Subscription.cancelled_at >= start_at,
+                Subscription.cancelled_at < end_at
+            )
+            .group_by(cancelled_day, Subscription.cancellation_reason_code)
+        ), with_dimension=True)
+
+        return rows
+
+    async def _gauge_rows(self, db: AsyncSession, day: date) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+
+        def add(metric: str, dimension: Optional[str], value):
+            rows.append({"metric": metric, "day": day, "dimension": dimension or "", "value": value or 0})
+
+        result = await db.execute(
+            select(User.subscription_status, func.count(User.id))
+            .where(User.is_professional.is_(True))
+            .group_by(User.subscription_status)
+        )
+        for status, count in result.all():
+            add("professionals", status, count)
+
+        result = await db.execute(
+            select(func.count(User.id)).where(User.is_professional.isnot(True), User.is_admin.isnot(True))
+        )
+        add("clients", "", result.scalar())
+
+        result = await db.execute(
+            select(
+                User.state,
+                func.count(User.id),
+                func.count(User.id).filter(User.subscription_status == "active")
+            )
+            .where(User.is_professional.is_(True), User.state.isnot(None))
+            .group_by(User.state)
+        )
+        for state, count, active in result.all():
+            add("professionals_by_state", state, count)
+            if active:
+                add("active_professionals_by_state", state, active)
+
+        # Receita recorrente: assinaturas pagas ativas, pelo valor contratado
+        result = await db.execute(
+            select(func.sum(Subscription.plan_amount)).where(
+                Subscription.status == "active",
+                Subscription.trial_ends_at.is_(None),
+                Subscription.plan_amount > 0
+            )
+        )
+        add("mrr", "", result.scalar())
+        return rows
+
+    # ==================== LEITURA ====================
+
+    async def dashboard_metrics(self, db: AsyncSession, start: date, end: date) -> Dict[str, Any]:
+        """
+        Eventos somados em [start, end] e a foto mais recente, em uma consulta.
+
+        Returns:
+            dict: {"events": {metric: {dimension: valor}}, "gauges": {...}, "snapshot_date": date}
+        """
+        latest_snapshot = (
+            select(func.max(DailyMetric.day))
+            .where(DailyMetric.metric == SNAPSHOT_METRIC)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(
+                DailyMetric.metric,
+                DailyMetric.dimension,
+                func.sum(DailyMetric.value),
+                func.max(DailyMetric.day)
+            )
+            .where(or_(
+                and_(DailyMetric.metric.in_(EVENT_METRICS), DailyMetric.day.between(start, end)),
+                and_(DailyMetric.metric.in_(GAUGE_METRICS), DailyMetric.day == latest_snapshot)
+            ))
+            .group_by(DailyMetric.metric, DailyMetric.dimension)
+        )
+
+        events: Dict[str, Dict[str, float]] = defaultdict(dict)
+        gauges: Dict[str, Dict[str, float]] = defaultdict(dict)
+        snapshot_date = None
+        for metric, dimension, value, last_day in result.all():
+            if metric in GAUGE_METRICS:
+                gauges[metric][dimension] = value
+                snapshot_date = last_day
+            else:
+                events[metric][dimension] = value
+
+        return {"events": events, "gauges": gauges, "snapshot_date": snapshot_date}
+
+
+# Instancia singleton
+daily_metrics = DailyMetricsService()
@@ -0,0 +1,203 @@
+"""
+Exportacoes administrativas em streaming (CSV e Parquet).
+
+Cada exportacao e uma projecao fixa de colunas (sem senha/CPF) lida com
+cursor do servidor: db.stream + yield_per entrega lotes de
+EXPORT_BATCH_SIZE linhas, e cada lote e serializado e enviado antes do
+proximo ser buscado. A memoria fica no tamanho de um lote, qualquer que seja
+o tamanho da tabela.
+
+A sessao e aberta dentro do gerador (pool dos jobs): o StreamingResponse
+continua consumindo o gerador depois que as dependencias da rota ja foram
+encerradas, e uma exportacao longa nao ocupa conexoes do trafego web.
+"""
+
+import csv
+import io
+from datetime import date, datetime, time
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Time
+from sqlalchemy.future import select
+
+from ..config import settings
+from ..database import JobsSessionLocal
+from ..models import Appointment, Review, Subscription, User
+
+
+class ExportSpec(NamedTuple):
+    columns: Tuple[Any, ...]
+    conditions: Tuple[Any, ...] = ()
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "professionals": ExportSpec(
+        (
+            User.id, User.name, User.email, User.whatsapp, User.category,
+            User.city, User.state, User.subscription_status, User.subscription_plan_id,
+            User.average_rating, User.total_reviews, User.is_active, User.is_suspended,
+            User.created_at,
+        ),
+        (User.is_professional.is_(True),),
+    ),
+    "clients": ExportSpec(
+        (
+            User.id, User.name, User.email, User.whatsapp, User.city, User.state,
+            User.is_active, User.created_at,
+        ),
+        (User.is_professional.isnot(True), User.is_admin.isnot(True)),
+    ),
+    "subscriptions": ExportSpec((
+        Subscription.id, Subscription.professional_id, Subscription.plan_id,
+        Subscription.status, Subscription.plan_amount, Subscription.next_billing_date,
+        Subscription.last_payment_date, Subscription.trial_ends_at, Subscription.cancelled_at,
+        Subscription.cancellation_reason_code, Subscription.created_at,
+    )),
+    "appointments": ExportSpec((
+        Appointment.id, Appointment.professional_id, Appointment.client_id,
+        Appointment.service_id, Appointment.date, Appointment.start_time,
+        Appointment.end_time, Appointment.status, Appointment.is_manual_block,
+        Appointment.created_at,
+    )),
+    "reviews": ExportSpec((
+        Review.id, Review.appointment_id, Review.professional_id, Review.rating,
+        Review.comment, Review.customer_name, Review.created_at,
+    )),
+}
+
+
+def column_names(spec: ExportSpec) -> List[str]:
+    return [column.key for column in spec.columns]
+
+
+async def iter_batches(name: str, batch_size: Optional[int] = None) -> AsyncIterator[Sequence[Any]]:
+    """Lotes de linhas da exportacao, lidos com cursor do servidor em ordem de id"""
+    spec = EXPORTS[name]
+    query = (
+        select(*spec.columns)
+        .where(*spec.conditions)
+        .order_by(spec.columns[0])
+        .execution_options(yield_per=batch_size or settings.EXPORT_BATCH_SIZE)
+    )
+    async with JobsSessionLocal() as db:
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+
+# ==================== CSV ====================
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+
+def csv_chunk(rows: Sequence[Sequence[Any]]) -> str:
+    """Serializa um lote de linhas em CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_csv(name: str) -> AsyncIterator[str]:
+    yield csv_chunk([column_names(EXPORTS[name])])
+    async for batch in iter_batches(name):
+        yield csv_chunk(batch)
+
+
+# ==================== PARQUET ====================
+
+class _ChunkSink:
+    """
+    Arquivo somente escrita que guarda os bytes ate o proximo drain().
+    A posicao continua contando o total escrito (o rodape do Parquet usa os
+    offsets absolutos de cada row group).
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def arrow_schema(spec: ExportSpec) -> pa.Schema:
+    """Schema explicito a partir dos tipos das colunas (lotes com nulos nao mudam o tipo)"""
+    fields = []
+    for column in spec.columns:
+        column_type = column.type
+        if isinstance(column_type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC") if column_type.timezone else pa.timestamp("us")
+        elif isinstance(column_type, Date):
+            arrow_type = pa.date32()
+        elif isinstance(column_type, Time):
+            arrow_type = pa.time64("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.key, arrow_type))
+    return pa.schema(fields)
+
+
+def _arrow_table(schema: pa.Schema, batch: Sequence[Sequence[Any]]) -> pa.Table:
+    columns = list(zip(*batch)) if batch else [()] * len(schema)
+    return pa.Table.from_arrays(
+        [pa.array(list(values), type=field.type) for values, field in zip(columns, schema)],
+        schema=schema
+    )
+
+
+class ParquetEncoder:
+    """Escreve um row group por lote e devolve os bytes produzidos"""
+
+    def __init__(self, spec: ExportSpec):
+        self.schema = arrow_schema(spec)
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self.schema)
+
+    def encode(self, batch: Sequence[Sequence[Any]]) -> bytes:
+        self._writer.write_table(_arrow_table(self.schema, batch))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        """Fecha o arquivo (rodape com os metadados dos row groups)"""
+        self._writer.close()
+        return self._sink.drain()
+
+
+async def stream_parquet(name: str) -> AsyncIterator[bytes]:
+    encoder = ParquetEncoder(EXPORTS[name])
+    async for batch in iter_batches(name):
+        yield encoder.encode(batch)
+    yield encoder.finish()
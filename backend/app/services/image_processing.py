@@ -0,0 +1,209 @@
+"""
+Processamento das imagens enviadas (armazenamento local).
+
+Cada upload vira um conjunto de variantes WebP nas larguras de
+IMAGE_VARIANT_WIDTHS menores que a original e uma miniatura quadrada. Sem
+ampliar: se a original for mais estreita que a maior largura, a maior
+variante fica na largura real (ex: 1000w). Os arquivos ficam lado a lado,
+nomeados pela largura real de cada um:
+
+    /uploads/services/<id>-320w.webp
+    /uploads/services/<id>-640w.webp
+    /uploads/services/<id>-1000w.webp
+    /uploads/services/<id>-thumb.webp
+
+A URL gravada no banco e a da maior variante; as demais sao derivadas dela
+(image_set: larguras configuradas menores que a dela), entao nenhuma coluna
+nova e necessaria. Para URLs do Cloudinary o mesmo conjunto sai das
+transformacoes na URL.
+
+Decodificar e redimensionar com Pillow usa CPU por dezenas de milissegundos;
+o trabalho roda em um ProcessPoolExecutor para nao bloquear o event loop. Os
+processos sao criados com spawn: um fork da aplicacao em execucao copiaria
+threads e conexoes abertas (asyncpg, Redis) para o filho.
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from PIL import Image, ImageOps
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL = "thumb"
+
+# <base>-<largura>w.webp
+VARIANT_URL = re.compile(r"^(?P<base>.+)-(?P<width>\d+)w\.webp$")
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+class ImageSet(NamedTuple):
+    url: str
+    srcset: Optional[str]
+    thumbnail: Optional[str]
+    variants: Dict[int, str]
+
+    def as_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "srcset": self.srcset,
+            "thumbnail": self.thumbnail,
+            "variants": {str(width): url for width, url in self.variants.items()},
+        }
+
+
+# ==================== PROCESSAMENTO (processo filho) ====================
+
+def render_variants(
+    contents: bytes,
+    widths: Sequence[int],
+    thumbnail_size: int,
+    quality: int
+) -> Dict[str, bytes]:
+    """
+    Gera as variantes WebP da imagem, nomeadas pela largura real.
+
+    Returns:
+        dict: {"320w": bytes, ..., "thumb": bytes}, em ordem crescente de largura
+
+    Raises:
+        PIL.UnidentifiedImageError: Conteudo nao e uma imagem valida
+    """
+    with Image.open(io.BytesIO(contents)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        rendered = {}
+        for width in variant_widths(image.width, widths):
+            variant = image
+            if width < image.width:
+                height = round(image.height * width / image.width)
+                variant = image.resize((width, height), Image.Resampling.LANCZOS)
+            rendered[f"{width}w"] = _webp(variant, quality)
+
+        thumbnail = ImageOps.fit(image, (thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+        rendered[THUMBNAIL] = _webp(thumbnail, quality)
+        return rendered
+
+
+def variant_widths(original_width: int, widths: Sequence[int]) -> List[int]:
+    """
+    Larguras geradas: as configuradas menores que a original e, no lugar
+    das maiores, a propria largura original (nunca amplia).
+    """
+    result = [width for width in sorted(set(widths)) if width < original_width]
+    if original_width <= max(widths):
+        result.append(original_width)
+    return result
+
+
+def _webp(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def write_variants(
+    contents: bytes,
+    directory: str,
+    name: str,
+    widths: Sequence[int],
+    thumbnail_size: int,
+    quality: int
+) -> str:
+    """
+    Gera e grava as variantes (<name>-<variante>.webp); roda no pool.
+
+    Returns:
+        str: Maior variante (ex: "1280w"), usada na URL gravada
+    """
+    rendered = render_variants(contents, widths, thumbnail_size, quality)
+    for variant, data in rendered.items():
+        (Path(directory) / f"{name}-{variant}.webp").write_bytes(data)
+    return [variant for variant in rendered if variant != THUMBNAIL][-1]
+
+
+# ==================== POOL ====================
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+async def process_upload(contents: bytes, directory: Path, name: str) -> str:
+    """
+    Gera as variantes no pool de processos.
+
+    Returns:
+        str: Maior variante (ex: "1280w")
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(),
+        write_variants,
+        contents,
+        str(directory),
+        name,
+        tuple(settings.IMAGE_VARIANT_WIDTHS),
+        settings.IMAGE_THUMBNAIL_SIZE,
+        settings.IMAGE_WEBP_QUALITY,
+    )
+
+
+def shutdown_pool():
+    """Encerra os processos do pool (shutdown da aplicacao)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# ==================== URLS ====================
+
+def variant_url(folder: str, name: str, variant: str) -> str:
+    return f"/uploads/{folder}/{name}-{variant}.webp"
+
+
+def image_set(url: str) -> ImageSet:
+    """
+    Conjunto de URLs (srcset e miniatura) a partir da URL gravada.
+    Imagens antigas (originais sem variantes) voltam so com a URL.
+    """
+    widths = sorted(set(settings.IMAGE_VARIANT_WIDTHS))
+
+    match = VARIANT_URL.match(url)
+    if match:
+        # A URL gravada e a da maior variante, com a largura real no nome
+        base, largest = match.group("base"), int(match.group("width"))
+        variants = {width: f"{base}-{width}w.webp" for width in widths if width < largest}
+        variants[largest] = url
+        return ImageSet(url, _srcset(variants), f"{base}-{THUMBNAIL}.webp", variants)
+
+    if "res.cloudinary.com" in url and "/upload/" in url:
+        prefix, path = url.split("/upload/", 1)
+        variants = {
+            width: f"{prefix}/upload/w_{width},c_limit,f_webp,q_auto/{path}" for width in widths
+        }
+        size = settings.IMAGE_THUMBNAIL_SIZE
+        thumbnail = f"{prefix}/upload/w_{size},h_{size},c_fill,f_webp,q_auto/{path}"
+        return ImageSet(url, _srcset(variants), thumbnail, variants)
+
+    return ImageSet(url, None, None, {})
+
+
+def _srcset(variants: Dict[int, str]) -> str:
+    return ", ".join(f"{url} {width}w" for width, url in variants.items())
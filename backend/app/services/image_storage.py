@@ -2,13 +2,17 @@
 """
 Service de armazenamento de imagens.
 Suporta armazenamento local (desenvolvimento) e Cloudinary (produção).
+No armazenamento local as imagens são convertidas em variantes WebP
+(ver image_processing.py).
 """
 import os
 import uuid
 from pathlib import Path
 from typing import Optional
 from fastapi import UploadFile, HTTPException
+from PIL import Image, UnidentifiedImageError
 from ..config import settings
+from .image_processing import VARIANT_URL, process_upload, variant_url
 
 
 class ImageStorageService:
@@ -51,25 +55,27 @@ class ImageStorageService:
         if self.storage_type == "cloudinary":
             return await self._upload_cloudinary(file, folder, contents)
         else:
-            return await self._upload_local(file, folder, file_ext)
+            return await self._upload_local(folder, contents)
 
-    async def _upload_local(self, file: UploadFile, folder: str, file_ext: str) -> str:
-        """Upload para armazenamento local"""
+    async def _upload_local(self, folder: str, contents: bytes) -> str:
+        """
+        Upload para armazenamento local: gera as variantes WebP e a
+        miniatura em um processo separado e retorna a URL da maior variante
+        """
         # Criar diretório se não existir
         upload_dir = Path("uploads") / folder
         upload_dir.mkdir(parents=True, exist_ok=True)
 
         # Gerar nome único
-        filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = upload_dir / filename
+        name = str(uuid.uuid4())
 
-        # Salvar arquivo
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        try:
+            largest = await process_upload(contents, upload_dir, name)
+        except (UnidentifiedImageError, Image.DecompressionBombError):
+            raise HTTPException(status_code=400, detail="Arquivo não é uma imagem válida")
 
-        # Retornar URL relativa
-        return f"/uploads/{folder}/{filename}"
+        # Retornar URL relativa (maior variante)
+        return variant_url(folder, name, largest)
 
     async def _upload_cloudinary(self, file: UploadFile, folder: str, contents: bytes) -> str:
         """Upload para Cloudinary"""
@@ -127,8 +133,16 @@ class ImageStorageService:
             return await self._delete_local(url)
 
     async def _delete_local(self, url: str) -> bool:
-        """Deleta arquivo local"""
+        """Deleta arquivo local (e as demais variantes da imagem)"""
         try:
+            match = VARIANT_URL.match(url)
+            if match:
+                base = Path(match.group("base").lstrip("/"))
+                variants = list(base.parent.glob(f"{base.name}-*.webp"))
+                for variant in variants:
+                    variant.unlink()
+                return bool(variants)
+
             # Extrair caminho do arquivo da URL
             file_path = Path(url.lstrip("/"))
             if file_path.exists():
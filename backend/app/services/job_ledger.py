@@ -0,0 +1,165 @@
+"""
+Ledger de execucoes dos jobs agendados (job_runs / job_items).
+
+Cada execucao e identificada por (job_name, run_key), por exemplo
+("daily_subscription_jobs", "2026-03-10"). Etapas e itens concluidos sao
+gravados como job_items na mesma transacao do trabalho que representam, entao
+uma reexecucao com a mesma chave pula o que ja foi feito e retoma do ponto
+onde a anterior parou. Execucoes ja concluidas nao rodam de novo.
+
+Cada etapa tambem e medida (ver job_metrics.py) e as medicoes sao gravadas
+em job_runs.stats junto com o checkpoint.
+"""
+
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Set
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..database import JobsSessionLocal
+from ..models import JobItem, JobRun
+from .job_metrics import job_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class JobLedger:
+    """Controle de execucoes e checkpoints dos jobs"""
+
+    async def begin(self, job_name: str, run_key: str) -> Optional[int]:
+        """
+        Abre a execucao ou retoma uma anterior que falhou/foi interrompida.
+
+        Returns:
+            int: ID da execucao, ou None se ja foi concluida
+        """
+        table = JobRun.__table__
+        async with JobsSessionLocal() as db:
+            result = await db.execute(
+                pg_insert(table)
+                .values(job_name=job_name, run_key=run_key, status="running", attempts=1)
+                .on_conflict_do_update(
+                    constraint="uq_job_runs_job_run_key",
+                    set_={
+                        "status": "running",
+                        "attempts": table.c.attempts + 1,
+                        # Duracao medida a partir da tentativa atual
+                        "started_at": func.now(),
+                        "error": None,
+                        "finished_at": None,
+                    },
+                    # Execucao concluida nao e reaberta (nenhuma linha retornada)
+                    where=table.c.status != "completed"
+                )
+                .returning(table.c.id, table.c.attempts)
+            )
+            row = result.first()
+            await db.commit()
+
+        if row is None:
+            return None
+
+        run_id, attempts = row
+        if attempts > 1:
+            logger.info(f"Retomando {job_name} ({run_key}), tentativa {attempts}")
+        return run_id
+
+    async def finish(self, run_id: int, error: Optional[str] = None):
+        """Registra o fim da execucao (completed, ou failed com o erro)"""
+        async with JobsSessionLocal() as db:
+            await db.execute(
+                update(JobRun)
+                .where(JobRun.id == run_id)
+                .values(
+                    status="failed" if error else "completed",
+                    error=error,
+                    finished_at=func.now()
+                )
+            )
+            await db.commit()
+
+    @asynccontextmanager
+    async def run(self, job_name: str, run_key: str) -> AsyncIterator[Optional[int]]:
+        """
+        Envolve uma execucao: marca completed ao sair normalmente e failed
+        se houver excecao. Entrega None quando a execucao ja foi concluida.
+        """
+        run_id = await self.begin(job_name, run_key)
+        if run_id is None:
+            logger.info(f"{job_name} ({run_key}) ja concluido, nada a fazer")
+            yield None
+            return
+
+        try:
+            yield run_id
+        except Exception as e:
+            await self.finish(run_id, error=str(e))
+            raise
+        await self.finish(run_id)
+
+    async def record(self, db: AsyncSession, run_id: Optional[int], item_keys: Iterable[str]):
+        """
+        Grava itens concluidos na sessao informada (mesma transacao do trabalho).
+        Sem run_id (chamada fora de um job) nao grava nada.
+        """
+        keys = list(item_keys)
+        if run_id is None or not keys:
+            return
+
+        await db.execute(
+            pg_insert(JobItem)
+            .values([{"job_run_id": run_id, "item_key": key} for key in keys])
+            .on_conflict_do_nothing(constraint="uq_job_items_run_item_key")
+        )
+
+    async def done_keys(self, db: AsyncSession, run_id: Optional[int], item_keys: Iterable[str]) -> Set[str]:
+        """Filtra as chaves que ja foram concluidas nesta execucao"""
+        keys = list(item_keys)
+        if run_id is None or not keys:
+            return set()
+
+        result = await db.execute(
+            select(JobItem.item_key).where(
+                JobItem.job_run_id == run_id,
+                JobItem.item_key.in_(keys)
+            )
+        )
+        return set(result.scalars().all())
+
+    async def stage(self, run_id: int, name: str, step: Callable[[], Awaitable]):
+        """
+        Executa uma etapa do job uma unica vez por execucao (checkpoint),
+        gravando duracao e contadores da etapa em job_runs.stats.
+        """
+        key = f"stage:{name}"
+        async with JobsSessionLocal() as db:
+            if key in await self.done_keys(db, run_id, [key]):
+                logger.info(f"Etapa {name} ja concluida nesta execucao, pulando")
+                return
+
+        try:
+            with job_metrics.track_stage() as metrics:
+                await step()
+        except Exception:
+            async with JobsSessionLocal() as db:
+                await job_metrics.save(db, run_id, name, metrics)
+                await db.commit()
+            raise
+
+        async with JobsSessionLocal() as db:
+            await self.record(db, run_id, [key])
+            await job_metrics.save(db, run_id, name, metrics)
+            await db.commit()
+
+        logger.info(
+            f"Etapa {name}: {metrics.rows} linhas, {metrics.emails} e-mails "
+            f"em {metrics.duration_seconds:.1f}s"
+        )
+
+
+# Instancia singleton
+job_ledger = JobLedger()
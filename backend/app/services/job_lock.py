@@ -0,0 +1,99 @@
+"""
+Lock de jobs agendados entre processos.
+
+Cada worker/replica da API inicia o proprio AsyncIOScheduler, entao o mesmo
+cron dispara em todos eles. Os jobs sao envolvidos por locked_job(): apenas o
+processo que obtiver o lock executa, os demais apenas registram e saem.
+
+Backends:
+- postgres: pg_try_advisory_lock em uma conexao do pool de jobs, liberado ao
+  final do job (ou automaticamente se a conexao cair)
+- memory: lock local ao processo, para testes e desenvolvimento
+"""
+
+import functools
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Set
+
+from sqlalchemy import text
+
+from ..config import settings
+from ..database import jobs_engine
+
+logger = logging.getLogger(__name__)
+
+
+def lock_key(name: str) -> int:
+    """Converte o nome do job na chave bigint usada pelo advisory lock"""
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class PostgresJobLock:
+    """Advisory lock de sessao do Postgres"""
+
+    @asynccontextmanager
+    async def acquire(self, name: str) -> AsyncIterator[bool]:
+        key = lock_key(name)
+        async with jobs_engine.connect() as conn:
+            result = await conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": key}
+            )
+            acquired = bool(result.scalar())
+            # Encerrar a transacao implicita para nao segurar snapshot durante o job
+            await conn.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    await conn.execute(
+                        text("SELECT pg_advisory_unlock(:key)"), {"key": key}
+                    )
+                    await conn.commit()
+
+
+class InMemoryJobLock:
+    """Lock local ao processo (testes e ambiente com um unico worker)"""
+
+    def __init__(self):
+        self._held: Set[str] = set()
+
+    @asynccontextmanager
+    async def acquire(self, name: str) -> AsyncIterator[bool]:
+        if name in self._held:
+            yield False
+            return
+
+        self._held.add(name)
+        try:
+            yield True
+        finally:
+            self._held.discard(name)
+
+
+def locked_job(name: str, job: Callable[[], Awaitable]) -> Callable[[], Awaitable]:
+    """
+    Envolve um job do scheduler para que rode em apenas um processo por vez.
+
+    Args:
+        name: Identificador do lock (normalmente o id do job no scheduler)
+        job: Corrotina sem argumentos a executar
+
+    Returns:
+        Corrotina pronta para scheduler.add_job
+    """
+    @functools.wraps(job)
+    async def run():
+        async with job_lock.acquire(name) as acquired:
+            if not acquired:
+                logger.info(f"Job {name} ja esta rodando em outro processo, ignorando")
+                return None
+            return await job()
+
+    return run
+
+
+# Instancia singleton
+job_lock = InMemoryJobLock() if settings.JOB_LOCK_BACKEND == "memory" else PostgresJobLock()
@@ -0,0 +1,128 @@
+"""
+Instrumentacao dos jobs agendados.
+
+Cada etapa executada via job_ledger.stage e medida: duracao, linhas
+processadas, e-mails enfileirados e falhas. Os contadores sao acumulados no
+contexto da etapa em execucao (contextvars), entao o codigo dos jobs so
+precisa chamar job_metrics.count(...) a cada lote, sem repassar objetos.
+
+As medicoes sao gravadas em job_runs.stats (JSONB, uma chave por etapa)
+junto com o checkpoint da etapa. Assim ficam visiveis para a API mesmo
+quando os jobs rodam no worker, em outro processo.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import func, literal, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models import JobRun
+
+_current_stage: ContextVar[Optional["StageMetrics"]] = ContextVar("job_stage_metrics", default=None)
+
+
+class StageMetrics:
+    """Medicoes de uma etapa de job"""
+
+    def __init__(self):
+        self.rows = 0
+        self.emails = 0
+        self.failures = 0
+        self.duration_seconds = 0.0
+        self.status = "running"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "duration_seconds": round(self.duration_seconds, 3),
+            "rows": self.rows,
+            "emails": self.emails,
+            "failures": self.failures,
+        }
+
+
+class JobMetrics:
+    """Coleta e persistencia das medicoes dos jobs"""
+
+    @contextmanager
+    def track_stage(self) -> Iterator[StageMetrics]:
+        """
+        Mede a etapa executada dentro do bloco. Uma excecao conta como
+        falha da etapa e e propagada normalmente.
+        """
+        metrics = StageMetrics()
+        token = _current_stage.set(metrics)
+        started = time.perf_counter()
+        try:
+            yield metrics
+            metrics.status = "completed"
+        except Exception:
+            metrics.status = "failed"
+            metrics.failures += 1
+            raise
+        finally:
+            metrics.duration_seconds = time.perf_counter() - started
+            _current_stage.reset(token)
+
+    def count(self, rows: int = 0, emails: int = 0, failures: int = 0):
+        """Soma contadores na etapa em execucao (sem etapa ativa nao faz nada)"""
+        metrics = _current_stage.get()
+        if metrics is None:
+            return
+        metrics.rows += rows
+        metrics.emails += emails
+        metrics.failures += failures
+
+    async def save(self, db: AsyncSession, run_id: int, stage: str, metrics: StageMetrics):
+        """
+        Grava as medicoes da etapa em job_runs.stats na sessao informada.
+        Etapas de tentativas anteriores sao preservadas (merge do JSONB).
+        """
+        table = JobRun.__table__
+        await db.execute(
+            update(table)
+            .where(table.c.id == run_id)
+            .values(
+                stats=func.coalesce(table.c.stats, literal({}, JSONB)).op("||")(
+                    literal({stage: metrics.as_dict()}, JSONB)
+                )
+            )
+        )
+
+
+def run_duration_seconds(run: JobRun) -> Optional[float]:
+    """Duracao da ultima tentativa (None enquanto a execucao nao termina)"""
+    if run.started_at is None or run.finished_at is None:
+        return None
+    return (run.finished_at - run.started_at).total_seconds()
+
+
+def run_summary(run: JobRun) -> Dict[str, Any]:
+    """
+    Resumo de uma execucao com as medicoes por etapa e o uso da janela
+    esperada do job (JOB_WINDOW_MINUTES; acima de 1.0 estourou).
+    """
+    duration = run_duration_seconds(run)
+    window_seconds = settings.JOB_WINDOW_MINUTES * 60
+    return {
+        "id": run.id,
+        "job_name": run.job_name,
+        "run_key": run.run_key,
+        "status": run.status,
+        "attempts": run.attempts,
+        "error": run.error,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "duration_seconds": duration,
+        "window_usage": round(duration / window_seconds, 3) if duration is not None and window_seconds else None,
+        "stages": run.stats or {},
+    }
+
+
+# Instancia singleton
+job_metrics = JobMetrics()
@@ -0,0 +1,236 @@
+"""
+Gateway assincrono para a API do Mercado Pago.
+
+Todas as chamadas ao Mercado Pago passam por aqui:
+- um unico httpx.AsyncClient de longa duracao (pool de conexoes reaproveitadas,
+  HTTP/2 quando o pacote h2 esta instalado), em vez de um cliente novo por
+  chamada ou do SDK sincrono, que bloqueia o event loop;
+- timeouts explicitos;
+- retries com backoff exponencial e jitter para falhas de rede, 429 e 5xx.
+  POSTs levam X-Idempotency-Key, entao a repeticao nao cria recursos duplicados;
+- circuit breaker: apos falhas seguidas, as chamadas falham na hora por um
+  periodo, sem acumular requisicoes presas num Mercado Pago fora do ar.
+"""
+
+import asyncio
+import logging
+import random
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Status que valem nova tentativa
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class MercadoPagoError(Exception):
+    """Falha ao consultar o Mercado Pago (rede ou status inesperado)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MercadoPagoUnavailable(MercadoPagoError):
+    """Circuit breaker aberto: o Mercado Pago nao e chamado"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simples por contagem de falhas consecutivas.
+
+    closed -> open apos `threshold` falhas; open -> half-open apos
+    `reset_seconds` (uma chamada de teste); sucesso fecha, falha reabre.
+    Ao liberar a chamada de teste o prazo de `reset_seconds` recomeca, entao
+    as chamadas concorrentes continuam bloqueadas ate o resultado dela.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half_open":
+            # Apenas uma chamada de teste passa; as demais encontram o circuito aberto
+            self.opened_at = time.monotonic()
+        return state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.error(f"Circuit breaker do Mercado Pago aberto apos {self.failures} falhas")
+            self.opened_at = time.monotonic()
+
+
+class MercadoPagoGateway:
+    """Cliente HTTP compartilhado para o Mercado Pago"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        access_token: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: float = 0.2,
+    ):
+        self.base_url = base_url or settings.MERCADOPAGO_API_URL
+        self.access_token = access_token or settings.MERCADOPAGO_ACCESS_TOKEN
+        self.max_retries = settings.MERCADOPAGO_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_seconds = backoff_seconds
+        self.breaker = CircuitBreaker(
+            settings.MERCADOPAGO_BREAKER_THRESHOLD,
+            settings.MERCADOPAGO_BREAKER_RESET_SECONDS
+        )
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente criado sob demanda e reaproveitado"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.access_token}"},
+                timeout=httpx.Timeout(settings.MERCADOPAGO_TIMEOUT_SECONDS, connect=5.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                http2=HTTP2_AVAILABLE and self._transport is None,
+                transport=self._transport,
+            )
+        return self._client
+
+    async def close(self):
+        """Fecha as conexoes do pool (shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Backoff exponencial com jitter completo"""
+        return random.uniform(0, self.backoff_seconds * (2 ** attempt))
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json: Optional[Dict[str, Any]] = None,
+    ) -> httpx.Response:
+        """
+        Executa a chamada com retries e circuit breaker.
+
+        Retorna a resposta final (inclusive 4xx, que nao sao repetidos) para
+        quem chamou tratar o status. Falhas de rede e 5xx esgotados levantam
+        MercadoPagoError; breaker aberto levanta MercadoPagoUnavailable.
+        """
+        if not self.breaker.allow():
+            raise MercadoPagoUnavailable("Mercado Pago indisponivel (circuit breaker aberto)")
+
+        headers = {}
+        if method == "POST":
+            # Mesma chave em todas as tentativas: o MP nao duplica o recurso
+            headers["X-Idempotency-Key"] = str(uuid.uuid4())
+
+        attempt = 0
+        while True:
+            error: Optional[str] = None
+            response: Optional[httpx.Response] = None
+            try:
+                response = await self.client.request(method, path, json=json, headers=headers)
+            except httpx.HTTPError as e:
+                error = f"Erro de conexao com Mercado Pago: {e}"
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    return response
+                error = f"Mercado Pago retornou {response.status_code} em {method} {path}"
+
+            if attempt >= self.max_retries:
+                self.breaker.record_failure()
+                raise MercadoPagoError(error, status_code=response.status_code if response else None)
+
+            delay = self._retry_delay(attempt)
+            attempt += 1
+            logger.warning(f"{error}; nova tentativa {attempt}/{self.max_retries} em {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def get(self, path: str) -> httpx.Response:
+        return await self.request("GET", path)
+
+    async def post(self, path: str, json: Dict[str, Any]) -> httpx.Response:
+        return await self.request("POST", path, json=json)
+
+    async def put(self, path: str, json: Dict[str, Any]) -> httpx.Response:
+        return await self.request("PUT", path, json=json)
+
+    async def _get_json(self, path: str) -> Dict[str, Any]:
+        response = await self.get(path)
+        if response.status_code != 200:
+            raise MercadoPagoError(
+                f"Mercado Pago retornou {response.status_code} em {path}: {response.text[:200]}",
+                status_code=response.status_code
+            )
+        return response.json()
+
+    async def get_preapproval(self, preapproval_id: str) -> Dict[str, Any]:
+        """Detalhes de uma assinatura (preapproval)"""
+        return await self._get_json(f"/preapproval/{preapproval_id}")
+
+    async def search_preapprovals(self, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """
+        Pagina de assinaturas (preapprovals) da conta.
+
+        Returns:
+            dict: {"paging": {"total", "offset", "limit"}, "results": [...]}
+        """
+        return await self._get_json(f"/preapproval/search?offset={offset}&limit={limit}")
+
+    async def get_payment(self, payment_id: str) -> Dict[str, Any]:
+        """Detalhes de um pagamento"""
+        return await self._get_json(f"/v1/payments/{payment_id}")
+
+    async def cancel_preapproval(self, preapproval_id: str) -> bool:
+        """
+        Cancela a assinatura no Mercado Pago (para a recorrencia).
+
+        Returns:
+            bool: True se o Mercado Pago confirmou o cancelamento
+        """
+        response = await self.put(f"/preapproval/{preapproval_id}", json={"status": "cancelled"})
+        if response.status_code not in (200, 201):
+            logger.error(
+                f"Erro ao cancelar preapproval {preapproval_id} no MP: "
+                f"{response.status_code} - {response.text[:200]}"
+            )
+            return False
+        return True
+
+
+# Instancia singleton
+mercadopago_gateway = MercadoPagoGateway()
@@ -0,0 +1,184 @@
+"""
+Cache dos planos de assinatura (preapproval_plan) do Mercado Pago.
+
+A definicao do plano (motivo, valor, frequencia, back_url) e a mesma para
+todos os clientes de um SubscriptionPlan, entao o plano e criado no Mercado
+Pago uma unica vez, gravado em mercadopago_plans e reaproveitado nos
+checkouts seguintes (sem a ida ao Mercado Pago no caminho do checkout).
+
+A chave do cache e um hash da definicao: mudar o preco (ou a frequencia)
+gera uma chave nova, entao o plano antigo deixa de ser usado sem precisar de
+invalidacao manual; o registro antigo e desativado na criacao do novo.
+
+Como o plano e compartilhado, o usuario vai no link de checkout
+(checkout_url: external_reference=<user_id>), que o Mercado Pago devolve no
+preapproval; o webhook vincula a assinatura por ele, mesmo que o e-mail do
+pagador seja diferente do e-mail da conta.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models import MercadoPagoPlan
+from .mercadopago_gateway import MercadoPagoError, mercadopago_gateway
+
+logger = logging.getLogger(__name__)
+
+# Validade do cache em memoria (planos invalidados em outro processo)
+MEMORY_TTL_SECONDS = 300
+
+
+class CachedPlan(NamedTuple):
+    mp_plan_id: str
+    init_point: str
+
+
+def plan_definition(reason: str, amount: float) -> Dict[str, Any]:
+    """Dados do preapproval_plan (sem dados do pagador: o plano e compartilhado)"""
+    return {
+        "reason": reason,
+        "auto_recurring": {
+            "frequency": settings.SUBSCRIPTION_FREQUENCY,
+            "frequency_type": settings.SUBSCRIPTION_FREQUENCY_TYPE,
+            "transaction_amount": amount,
+            "currency_id": "BRL",
+        },
+        "back_url": f"{settings.FRONTEND_URL}/subscription/callback",
+    }
+
+
+def checkout_url(init_point: str, user_id: int) -> str:
+    """Link de checkout do plano compartilhado identificando o usuario"""
+    parts = urlsplit(init_point)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != "external_reference"]
+    query.append(("external_reference", str(user_id)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def definition_key(definition: Dict[str, Any]) -> str:
+    """Hash estavel da definicao do plano"""
+    canonical = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class MercadoPagoPlanCache:
+    """Planos do Mercado Pago criados uma vez e reaproveitados"""
+
+    def __init__(self):
+        self._memory: Dict[str, Tuple[CachedPlan, float]] = {}
+
+    async def get_or_create(
+        self,
+        reason: str,
+        amount: float,
+        subscription_plan_id: Optional[int] = None
+    ) -> CachedPlan:
+        """
+        Plano do Mercado Pago para a definicao informada: memoria, banco ou,
+        na primeira vez, criado no Mercado Pago. Usa transacao propria, entao
+        o plano fica cacheado mesmo se o checkout falhar depois.
+
+        Raises:
+            MercadoPagoError: Falha ao criar o plano no Mercado Pago
+        """
+        definition = plan_definition(reason, amount)
+        key = definition_key(definition)
+
+        cached = self._memory.get(key)
+        if cached and time.monotonic() - cached[1] < MEMORY_TTL_SECONDS:
+            return cached[0]
+
+        async with AsyncSessionLocal() as db:
+            plan = await self._load(db, key)
+            if plan is None:
+                plan = await self._create(db, key, definition, subscription_plan_id)
+                await db.commit()
+
+        self._memory[key] = (plan, time.monotonic())
+        return plan
+
+    async def _load(self, db: AsyncSession, key: str) -> Optional[CachedPlan]:
+        result = await db.execute(
+            select(MercadoPagoPlan.mp_plan_id, MercadoPagoPlan.init_point).where(
+                MercadoPagoPlan.definition_key == key,
+                MercadoPagoPlan.is_active.is_(True)
+            )
+        )
+        row = result.first()
+        return CachedPlan(*row) if row else None
+
+    async def _create(
+        self,
+        db: AsyncSession,
+        key: str,
+        definition: Dict[str, Any],
+        subscription_plan_id: Optional[int]
+    ) -> CachedPlan:
+        logger.info(f"Criando plano no MP: {definition}")
+        response = await mercadopago_gateway.post("/preapproval_plan", json=definition)
+        if response.status_code not in (200, 201):
+            raise MercadoPagoError(
+                f"Erro ao criar plano MP: {response.status_code} - {response.text}",
+                status_code=response.status_code
+            )
+
+        mp_plan = response.json()
+        if not mp_plan.get("init_point"):
+            raise MercadoPagoError("Mercado Pago não retornou URL de checkout")
+
+        # Definicao anterior do mesmo plano (ex: preco antigo) deixa de valer
+        if subscription_plan_id is not None:
+            await db.execute(
+                update(MercadoPagoPlan)
+                .where(
+                    MercadoPagoPlan.subscription_plan_id == subscription_plan_id,
+                    MercadoPagoPlan.definition_key != key,
+                    MercadoPagoPlan.is_active.is_(True)
+                )
+                .values(is_active=False)
+            )
+
+        auto_recurring = definition["auto_recurring"]
+        table = MercadoPagoPlan.__table__
+        result = await db.execute(
+            pg_insert(table)
+            .values(
+                subscription_plan_id=subscription_plan_id,
+                definition_key=key,
+                reason=definition["reason"],
+                transaction_amount=auto_recurring["transaction_amount"],
+                frequency=auto_recurring["frequency"],
+                frequency_type=auto_recurring["frequency_type"],
+                mp_plan_id=mp_plan["id"],
+                init_point=mp_plan["init_point"],
+                is_active=True
+            )
+            .on_conflict_do_nothing(
+                index_elements=["definition_key"],
+                index_where=table.c.is_active
+            )
+            .returning(table.c.id)
+        )
+        if result.first() is None:
+            # Outro checkout criou o plano ao mesmo tempo: usar o que ficou gravado
+            logger.info(f"Plano MP {mp_plan['id']} descartado, definição já cacheada")
+            existing = await self._load(db, key)
+            if existing:
+                return existing
+
+        return CachedPlan(mp_plan["id"], mp_plan["init_point"])
+
+
+# Instancia singleton
+mercadopago_plans = MercadoPagoPlanCache()
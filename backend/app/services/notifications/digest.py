@@ -0,0 +1,95 @@
+"""
+Coalescing de notificacoes em e-mails digest.
+
+Quando um destinatario recebe varios eventos em sequencia (ex: profissional
+com muitos agendamentos), apenas o primeiro e-mail sai imediatamente. Os
+eventos seguintes dentro da janela ficam com status "queued" e sao enviados
+juntos em um unico e-mail pelo job de digest.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ...config import settings
+from ...models import Appointment, Notification
+
+# Cancelamentos com menos de 24h de antecedencia nunca esperam o digest
+URGENT_CANCELLATION_WINDOW = timedelta(hours=24)
+
+
+def digest_window() -> timedelta:
+    """Janela de agrupamento configurada"""
+    return timedelta(minutes=settings.NOTIFICATION_DIGEST_WINDOW_MINUTES)
+
+
+def is_urgent(
+    notification_type: str,
+    appointment: Optional[Appointment],
+    now: Optional[datetime] = None
+) -> bool:
+    """
+    Verifica se a notificacao deve ignorar o digest.
+
+    Returns:
+        bool: True para cancelamentos de agendamentos nas proximas 24h
+    """
+    if notification_type != "appointment_cancelled" or appointment is None:
+        return False
+
+    now = now or datetime.now()
+    starts_at = datetime.combine(appointment.date, appointment.start_time)
+    return starts_at - now <= URGENT_CANCELLATION_WINDOW
+
+
+async def has_recent_notification(db: AsyncSession, user_id: int) -> bool:
+    """
+    Verifica se o destinatario ja recebeu e-mail dentro da janela
+    ou se ja possui notificacoes aguardando o proximo digest.
+    """
+    cutoff = datetime.now(timezone.utc) - digest_window()
+    result = await db.execute(
+        select(Notification.id)
+        .where(
+            Notification.user_id == user_id,
+            or_(
+                Notification.status == "queued",
+                and_(
+                    # "pending" = já na fila de e-mails, aguardando o worker
+                    Notification.status.in_(["pending", "sent"]),
+                    Notification.created_at >= cutoff
+                )
+            )
+        )
+        .limit(1)
+    )
+    return result.first() is not None
+
+
+def group_ready_digests(
+    notifications: List[Notification],
+    window: timedelta,
+    now: datetime
+) -> List[Tuple[int, List[Notification]]]:
+    """
+    Agrupa notificacoes na fila por destinatario.
+
+    Um grupo so fica pronto quando a notificacao mais antiga ja esperou
+    a janela inteira, assim eventos que chegam em rajada entram no mesmo e-mail.
+
+    Returns:
+        list: [(user_id, [notificacoes em ordem de criacao])]
+    """
+    groups = {}
+    for notification in notifications:
+        groups.setdefault(notification.user_id, []).append(notification)
+
+    ready = []
+    for user_id, items in groups.items():
+        items.sort(key=lambda n: n.created_at)
+        if items[0].created_at <= now - window:
+            ready.append((user_id, items))
+    return ready
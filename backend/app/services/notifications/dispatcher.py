@@ -0,0 +1,211 @@
+"""
+Dispatcher da fila de e-mails.
+
+Roda no worker: reserva lotes de email_outbox com FOR UPDATE SKIP LOCKED
+(varios workers podem rodar em paralelo sem enviar o mesmo e-mail), envia
+com concorrencia limitada e registra o resultado. Falhas voltam para a fila
+com backoff exponencial ate OUTBOX_MAX_ATTEMPTS.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.future import select
+
+from ...config import settings
+from ...database import JobsSessionLocal
+from ...models import EmailOutbox, Notification
+from .notification_service import notification_service
+
+logger = logging.getLogger(__name__)
+
+
+def notifications_of(notification_ids: List[int]):
+    """
+    Filtro das notificacoes cobertas pelos e-mails: a propria notificacao
+    e, no caso de um digest, todas as que compartilham o digest_key dela.
+    """
+    digest_keys = (
+        select(Notification.digest_key)
+        .where(
+            Notification.id.in_(notification_ids),
+            Notification.digest_key.isnot(None)
+        )
+        .scalar_subquery()
+    )
+    return or_(
+        Notification.id.in_(notification_ids),
+        Notification.digest_key.in_(digest_keys)
+    )
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff exponencial entre tentativas: 1, 2, 4, 8... minutos (max 1h)"""
+    return timedelta(minutes=min(2 ** (attempts - 1), 60))
+
+
+class OutboxDispatcher:
+    """Envia os e-mails pendentes da fila"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Inicia o loop de envio em background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Dispatcher da fila de e-mails iniciado")
+
+    async def stop(self):
+        """Interrompe o loop de envio"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                sent = await self.dispatch_pending()
+            except Exception as e:
+                logger.error(f"Erro no dispatcher de e-mails: {str(e)}")
+                sent = 0
+
+            # Lote cheio: provavelmente ha mais pendentes, continuar sem esperar
+            if sent < settings.OUTBOX_BATCH_SIZE:
+                await asyncio.sleep(settings.OUTBOX_POLL_SECONDS)
+
+    async def dispatch_pending(self) -> int:
+        """
+        Processa um lote da fila.
+
+        Returns:
+            int: Quantidade de e-mails reservados no lote
+        """
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(minutes=settings.OUTBOX_SENDING_TIMEOUT_MINUTES)
+
+        # 1. Reservar o lote (transacao curta)
+        async with JobsSessionLocal() as db:
+            due = (
+                select(EmailOutbox.id)
+                .where(
+                    or_(
+                        and_(
+                            EmailOutbox.status == "pending",
+                            EmailOutbox.available_at <= now
+                        ),
+                        # Envio interrompido (worker caiu no meio do lote)
+                        and_(
+                            EmailOutbox.status == "sending",
+                            EmailOutbox.locked_at < stale_before
+                        )
+                    )
+                )
+                .order_by(EmailOutbox.id)
+                .limit(settings.OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            table = EmailOutbox.__table__
+            result = await db.execute(
+                update(table)
+                .where(table.c.id.in_(due))
+                .values(status="sending", attempts=table.c.attempts + 1, locked_at=now)
+                .returning(
+                    table.c.id,
+                    table.c.notification_id,
+                    table.c.to_email,
+                    table.c.subject,
+                    table.c.plain_text,
+                    table.c.html,
+                    table.c.attempts
+                )
+            )
+            batch = result.all()
+            await db.commit()
+
+        if not batch:
+            return 0
+
+        # 2. Enviar fora da transacao
+        semaphore = asyncio.Semaphore(settings.OUTBOX_CONCURRENCY)
+
+        async def send(row) -> Tuple[bool, Optional[str]]:
+            async with semaphore:
+                try:
+                    return await notification_service.email_adapter.send(
+                        to=row.to_email,
+                        subject=row.subject,
+                        body=row.plain_text,
+                        html_body=row.html
+                    )
+                except Exception as e:
+                    return False, str(e)
+
+        results = await asyncio.gather(*(send(row) for row in batch))
+
+        # 3. Registrar resultados
+        await self._record_results(batch, results)
+        return len(batch)
+
+    async def _record_results(self, batch, results: List[Tuple[bool, Optional[str]]]):
+        now = datetime.now(timezone.utc)
+        sent_ids = []
+        sent_notification_ids = []
+
+        async with JobsSessionLocal() as db:
+            for row, (success, error) in zip(batch, results):
+                if success:
+                    sent_ids.append(row.id)
+                    if row.notification_id:
+                        sent_notification_ids.append(row.notification_id)
+                    continue
+
+                exhausted = row.attempts >= settings.OUTBOX_MAX_ATTEMPTS
+                logger.error(
+                    f"Falha ao enviar e-mail {row.id} para {row.to_email} "
+                    f"(tentativa {row.attempts}): {error}"
+                )
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == row.id)
+                    .values(
+                        status="error" if exhausted else "pending",
+                        last_error=error,
+                        available_at=now + retry_delay(row.attempts),
+                        locked_at=None
+                    )
+                )
+                if exhausted and row.notification_id:
+                    await db.execute(
+                        update(Notification)
+                        .where(notifications_of([row.notification_id]))
+                        .values(status="error", error_message=error)
+                    )
+
+            if sent_ids:
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent_ids))
+                    .values(status="sent", sent_at=now, locked_at=None)
+                )
+            if sent_notification_ids:
+                await db.execute(
+                    update(Notification)
+                    .where(notifications_of(sent_notification_ids))
+                    .values(status="sent", sent_at=now)
+                )
+
+            await db.commit()
+
+        logger.info(f"Fila de e-mails: {len(sent_ids)}/{len(batch)} enviados")
+
+
+# Instância singleton
+outbox_dispatcher = OutboxDispatcher()
@@ -1,13 +1,23 @@
 import logging
-from datetime import datetime
+import uuid
+from datetime import datetime, timezone
 from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from ...database import JobsSessionLocal
 from ...models import Notification, User, Appointment, Service
 from ...config import settings
+from ..realtime import realtime_broker
+from .digest import (
+    digest_window,
+    group_ready_digests,
+    has_recent_notification,
+    is_urgent,
+)
 from .email_adapter import email_adapter
+from .outbox import enqueue_email, enqueue_email_now
 from .resend_adapter import resend_adapter
 from .templates import email_templates
 
@@ -42,7 +52,7 @@ class NotificationService:
         channel: str = "email"
     ) -> Optional[Notification]:
         """
-        Cria um registro de notificação e envia de forma assíncrona.
+        Cria um registro de notificação e enfileira o e-mail para o worker.
 
         Args:
             db: Sessão do banco de dados
@@ -132,41 +142,55 @@ class NotificationService:
                 logger.error(f"Tipo de notificação desconhecido: {notification_type}")
                 return None
 
+            # Coalescing: se o destinatário já recebeu e-mail dentro da janela,
+            # a notificação aguarda o próximo digest em vez de gerar outro e-mail
+            coalesce = (
+                settings.NOTIFICATION_DIGEST_ENABLED
+                and not is_urgent(notification_type, appointment)
+                and await has_recent_notification(db, user_id)
+            )
+
             # Criar registro de notificação
             notification = Notification(
                 user_id=user_id,
                 appointment_id=appointment_id,
                 type=notification_type,
                 channel=channel,
-                status="pending",
+                status="queued" if coalesce else "pending",
                 title=subject,
                 message=plain_text
             )
 
             db.add(notification)
+            await db.flush()
+
+            # O envio fica com o worker; a API apenas enfileira na mesma transação
+            if not coalesce:
+                enqueue_email(
+                    db,
+                    to_email=user.email,
+                    subject=subject,
+                    plain_text=plain_text,
+                    html=html,
+                    notification_id=notification.id
+                )
+
             await db.commit()
             await db.refresh(notification)
 
-            # Enviar a notificação
-            success, error = await self.email_adapter.send(
-                to=user.email,
-                subject=subject,
-                body=plain_text,
-                html_body=html
-            )
-
-            # Atualizar status da notificação
-            if success:
-                notification.status = "sent"
-                notification.sent_at = datetime.now()
-                logger.info(f"Notificação {notification.id} enviada com sucesso para {user.email}")
+            # Avisar o frontend conectado sem esperar o envio do e-mail
+            await realtime_broker.publish(user_id, "notification", {
+                "id": notification.id,
+                "appointment_id": appointment_id,
+                "type": notification_type,
+                "title": subject,
+                "created_at": notification.created_at,
+            })
+
+            if coalesce:
+                logger.info(f"Notificação {notification.id} aguardando digest para {user.email}")
             else:
-                notification.status = "error"
-                notification.error_message = error
-                logger.error(f"Falha ao enviar notificação {notification.id}: {error}")
-
-            await db.commit()
-            await db.refresh(notification)
+                logger.info(f"Notificação {notification.id} enfileirada para {user.email}")
 
             return notification
 
@@ -256,6 +280,65 @@ class NotificationService:
             notification_type=notification_type
         )
 
+    async def send_pending_digests(self) -> int:
+        """
+        Job periódico: enfileira um único e-mail por destinatário com todas as
+        notificações que ficaram na fila durante a janela de digest.
+
+        As notificações passam para "pending" e só viram "sent" quando o
+        dispatcher confirma o envio do digest (com retentativas e backoff).
+
+        Returns:
+            int: Quantidade de e-mails digest enfileirados
+        """
+        now = datetime.now(timezone.utc)
+        queued_count = 0
+
+        async with JobsSessionLocal() as db:
+            result = await db.execute(
+                select(Notification).where(Notification.status == "queued")
+            )
+            ready = group_ready_digests(result.scalars().all(), digest_window(), now)
+
+            if not ready:
+                return 0
+
+            users_result = await db.execute(
+                select(User).where(User.id.in_([user_id for user_id, _ in ready]))
+            )
+            users = {user.id: user for user in users_result.scalars().all()}
+
+            for user_id, items in ready:
+                user = users.get(user_id)
+                if not user:
+                    continue
+
+                subject, plain_text, html = email_templates.notification_digest(
+                    recipient_name=user.name,
+                    items=[(n.title, n.message) for n in items]
+                )
+
+                digest_key = str(uuid.uuid4())
+                for notification in items:
+                    notification.digest_key = digest_key
+                    notification.status = "pending"
+
+                # O dispatcher estende o resultado do envio a todo o digest_key
+                enqueue_email(
+                    db,
+                    to_email=user.email,
+                    subject=subject,
+                    plain_text=plain_text,
+                    html=html,
+                    notification_id=items[0].id
+                )
+
+                queued_count += 1
+                logger.info(f"Digest com {len(items)} notificações enfileirado para {user.email}")
+
+            await db.commit()
+
+        return queued_count
 
     # ==================== NOTIFICAÇÕES DE ASSINATURA ====================
 
@@ -267,7 +350,8 @@ class NotificationService:
         html: str
     ) -> bool:
         """
-        Envia um e-mail de notificação de assinatura.
+        Enfileira um e-mail de notificação de assinatura.
+        O envio é feito pelo worker (ver dispatcher.py).
 
         Args:
             to_email: E-mail do destinatário
@@ -276,24 +360,14 @@ class NotificationService:
             html: Corpo em HTML
 
         Returns:
-            bool: True se enviou com sucesso
+            bool: True se o e-mail entrou na fila
         """
         try:
-            success, error = await self.email_adapter.send(
-                to=to_email,
-                subject=subject,
-                body=plain_text,
-                html_body=html
-            )
-
-            if success:
-                logger.info(f"E-mail de assinatura enviado para {to_email}: {subject}")
-            else:
-                logger.error(f"Falha ao enviar e-mail de assinatura para {to_email}: {error}")
-
-            return success
+            await enqueue_email_now(to_email, subject, plain_text, html)
+            logger.info(f"E-mail de assinatura enfileirado para {to_email}: {subject}")
+            return True
         except Exception as e:
-            logger.error(f"Erro ao enviar e-mail de assinatura: {str(e)}")
+            logger.error(f"Erro ao enfileirar e-mail de assinatura: {str(e)}")
             return False
 
     async def notify_subscription_activated(
@@ -0,0 +1,60 @@
+"""
+Fila de e-mails (transactional outbox).
+
+Quem precisa enviar e-mail apenas insere uma linha em email_outbox na mesma
+transacao da mudanca que o originou. O envio acontece no worker
+(ver dispatcher.py), fora do processo que atende as requisicoes HTTP.
+"""
+
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...database import AsyncSessionLocal
+from ...models import EmailOutbox
+
+# (destinatario, assunto, texto, html)
+QueuedEmail = Tuple[str, str, str, Optional[str]]
+
+
+def enqueue_email(
+    db: AsyncSession,
+    to_email: str,
+    subject: str,
+    plain_text: str,
+    html: Optional[str] = None,
+    notification_id: Optional[int] = None
+) -> EmailOutbox:
+    """
+    Adiciona um e-mail a fila na sessao informada.
+    O commit fica a cargo de quem chamou, junto com o restante da transacao.
+    """
+    email = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        plain_text=plain_text,
+        html=html,
+        notification_id=notification_id,
+        status="pending",
+        attempts=0
+    )
+    db.add(email)
+    return email
+
+
+def enqueue_emails(db: AsyncSession, emails: Iterable[QueuedEmail]):
+    """Adiciona varios e-mails a fila na sessao informada"""
+    for to_email, subject, plain_text, html in emails:
+        enqueue_email(db, to_email, subject, plain_text, html)
+
+
+async def enqueue_email_now(
+    to_email: str,
+    subject: str,
+    plain_text: str,
+    html: Optional[str] = None
+):
+    """Enfileira um e-mail em transacao propria (quando nao ha sessao em uso)"""
+    async with AsyncSessionLocal() as db:
+        enqueue_email(db, to_email, subject, plain_text, html)
+        await db.commit()
@@ -0,0 +1,103 @@
+"""
+Retencao de notificacoes.
+
+A tabela notifications guarda apenas a janela recente (NOTIFICATION_RETENTION_DAYS).
+O job diario move as linhas mais antigas, em lotes, para notifications_archive
+com a mensagem comprimida, mantendo a tabela quente pequena e a listagem
+/notifications/me rapida independente do historico.
+"""
+
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.future import select
+
+from ...config import settings
+from ...database import JobsSessionLocal
+from ...models import Notification, NotificationArchive
+
+logger = logging.getLogger(__name__)
+
+
+def compress_message(message: str) -> bytes:
+    """Comprime o corpo da notificacao para o arquivo"""
+    return zlib.compress(message.encode("utf-8"), level=9)
+
+
+def decompress_message(data: bytes) -> str:
+    """Restaura o corpo de uma notificacao arquivada"""
+    return zlib.decompress(data).decode("utf-8")
+
+
+async def archive_old_notifications(now: Optional[datetime] = None) -> int:
+    """
+    Move notificacoes fora da janela de retencao para o arquivo.
+
+    Cada lote e uma transacao propria (SELECT ... FOR UPDATE SKIP LOCKED,
+    INSERT no arquivo e DELETE na tabela quente), entao o job pode ser
+    interrompido a qualquer momento sem perder ou duplicar linhas.
+    Notificacoes "queued" ficam na tabela ate o digest ser enviado.
+
+    Returns:
+        int: Total de notificacoes arquivadas
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+    batch_size = settings.NOTIFICATION_ARCHIVE_BATCH_SIZE
+    table = Notification.__table__
+
+    logger.info(f"Arquivando notificacoes anteriores a {cutoff.isoformat()}")
+
+    total = 0
+    while True:
+        async with JobsSessionLocal() as db:
+            result = await db.execute(
+                select(table)
+                .where(
+                    table.c.created_at < cutoff,
+                    table.c.status != "queued"
+                )
+                .order_by(table.c.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.mappings().all()
+            if not rows:
+                break
+
+            await db.execute(
+                pg_insert(NotificationArchive)
+                .values([
+                    {
+                        "id": row["id"],
+                        "user_id": row["user_id"],
+                        "appointment_id": row["appointment_id"],
+                        "type": row["type"],
+                        "channel": row["channel"],
+                        "status": row["status"],
+                        "title": row["title"],
+                        "message_compressed": compress_message(row["message"]),
+                        "created_at": row["created_at"],
+                        "sent_at": row["sent_at"],
+                        "error_message": row["error_message"],
+                        "digest_key": row["digest_key"],
+                    }
+                    for row in rows
+                ])
+                .on_conflict_do_nothing(index_elements=["id"])
+            )
+            await db.execute(
+                delete(table).where(table.c.id.in_([row["id"] for row in rows]))
+            )
+            await db.commit()
+
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    logger.info(f"{total} notificacoes arquivadas")
+    return total
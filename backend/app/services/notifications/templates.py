@@ -1,5 +1,5 @@
 from datetime import date, time
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 
 class EmailTemplates:
@@ -331,6 +331,65 @@ Acesse o ContrataPro para mais detalhes.
 
         return subject, plain_text, EmailTemplates._base_template(html_content)
 
+    @staticmethod
+    def notification_digest(
+        recipient_name: str,
+        items: List[Tuple[str, str]]
+    ) -> Tuple[str, str, str]:
+        """
+        Template para resumo de varias notificacoes em um unico e-mail.
+
+        Args:
+            items: Lista de (titulo, mensagem) em ordem de criacao
+
+        Returns:
+            tuple: (subject, plain_text, html)
+        """
+        if len(items) == 1:
+            subject = items[0][0]
+            intro = "Você tem uma nova atualização."
+        else:
+            subject = f"Você tem {len(items)} novas atualizações no ContrataPro"
+            intro = f"Você tem {len(items)} novas atualizações desde o último e-mail."
+
+        plain_sections = "\n".join(
+            f"--- {title} ---\n{message.strip()}\n" for title, message in items
+        )
+
+        plain_text = f"""
+Olá {recipient_name},
+
+{intro}
+
+{plain_sections}
+Acesse o ContrataPro para mais detalhes.
+"""
+
+        html_sections = "".join(
+            f"""
+            <div class="info-box">
+                <div class="info-item">
+                    <span class="info-value"><strong>{title}</strong></span>
+                </div>
+                <div class="info-item">
+                    <span class="info-value">{message.strip().replace(chr(10), "<br>")}</span>
+                </div>
+            </div>
+"""
+            for title, message in items
+        )
+
+        html_content = f"""
+        <div class="content">
+            <h2>Olá {recipient_name},</h2>
+            <p>{intro}</p>
+            {html_sections}
+            <a href="https://contratapro.com.br" class="button" style="color: #FFFFFF;">Ver Detalhes</a>
+        </div>
+"""
+
+        return subject, plain_text, EmailTemplates._base_template(html_content)
+
     @staticmethod
     def password_reset(
         recipient_name: str,
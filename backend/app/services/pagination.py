@@ -0,0 +1,102 @@
+"""
+Paginacao keyset (cursor) das listagens (admin, avaliacoes e notificacoes).
+
+A pagina seguinte comeca depois da ultima linha da anterior,
+WHERE (coluna_ordenacao, id) > (valor, id), em vez de OFFSET: o custo e o
+mesmo na primeira e na milesima pagina e usa o indice (coluna, id). O cursor
+e opaco para o cliente (base64 de JSON com o valor e o id da ultima linha).
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.sql import Select
+
+
+class SortField(NamedTuple):
+    """Coluna ordenavel e como reconstruir o valor a partir do cursor"""
+    column: Any
+    parse: Callable[[Any], Any]
+
+
+def parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def parse_date(value: str) -> date:
+    return date.fromisoformat(value)
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(sort: str, value: Any, row_id: int) -> str:
+    """Cursor da posicao (valor, id) da ultima linha da pagina"""
+    raw = json.dumps([sort, _serialize(value), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: str, field: SortField) -> Tuple[Any, int]:
+    """
+    Decodifica um cursor gerado por encode_cursor.
+
+    Raises:
+        ValueError: Cursor invalido ou gerado para outra ordenacao
+    """
+    try:
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if cursor_sort != sort:
+            raise ValueError("Cursor de outra ordenacao")
+        return field.parse(value), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Cursor inválido: {e}")
+
+
+def keyset_page(
+    query: Select,
+    field: SortField,
+    id_column: Any,
+    descending: bool,
+    size: int,
+    after: Optional[Tuple[Any, int]] = None
+) -> Select:
+    """
+    Aplica ordenacao, posicao do cursor e limite na query.
+    Busca size + 1 linhas para saber se existe proxima pagina.
+    """
+    key = tuple_(field.column, id_column)
+    if after is not None:
+        query = query.where(key < after if descending else key > after)
+
+    if descending:
+        query = query.order_by(field.column.desc(), id_column.desc())
+    else:
+        query = query.order_by(field.column.asc(), id_column.asc())
+    return query.limit(size + 1)
+
+
+def page_result(
+    rows: Sequence[Dict[str, Any]],
+    sort: str,
+    sort_key: str,
+    size: int
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Separa a pagina e gera next_cursor a partir das linhas (size + 1) lidas.
+
+    Args:
+        sort: Nome da ordenacao (vai no cursor)
+        sort_key: Chave da coluna de ordenacao nas linhas
+    """
+    items = list(rows[:size])
+    next_cursor = None
+    if len(rows) > size and items:
+        last = items[-1]
+        next_cursor = encode_cursor(sort, last[sort_key], last["id"])
+    return items, next_cursor
@@ -0,0 +1,251 @@
+"""
+Pontuacao de ranking dos profissionais na busca (users.ranking_score).
+
+A pontuacao combina:
+- media bayesiana das notas: (peso_prior * media_prior + soma) /
+  (peso_prior + quantidade). Poucas avaliacoes ficam perto da media prior,
+  entao uma unica nota 5 nao supera 200 avaliacoes com media 4.8;
+- decaimento por recencia: cada avaliacao perde metade do peso a cada
+  RANKING_HALF_LIFE_DAYS. Soma e peso decaidos ficam em
+  rating_decayed_sum/rating_decayed_weight, validos em rating_decayed_at, e
+  uma avaliacao nova so decai os acumulados e soma a nota (O(1));
+- taxa de conclusao: concluidos / (concluidos + cancelados), com suavizacao
+  de Laplace, a partir dos contadores appointments_completed/cancelled.
+
+A pontuacao e recalculada na hora para o profissional afetado (avaliacao
+nova, agendamento concluido ou cancelado). O job noturno recalcula os
+acumulados a partir das tabelas (corrige divergencias) e aplica o
+decaimento do dia em todas as pontuacoes. A busca apenas ordena pela coluna.
+Usuarios novos ja sao gravados com a pontuacao da media prior (sem
+avaliacoes nem agendamentos), em vez de 0 ate o job noturno.
+"""
+
+import logging
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Optional, Sequence
+
+from sqlalchemy import and_, bindparam, event, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..config import settings
+from ..database import JobsSessionLocal
+from ..models import Appointment, Review, User
+from .job_ledger import job_ledger
+from .job_metrics import job_metrics
+
+logger = logging.getLogger(__name__)
+
+# Status que contam contra a taxa de conclusao
+NOT_COMPLETED = ("cancelled", "suspended")
+
+# Profissionais recalculados por transacao no job noturno
+REFRESH_BATCH_SIZE = 500
+
+
+def decay_factor(elapsed_seconds: float) -> float:
+    """Fracao do peso que resta depois do intervalo (meia-vida em dias)"""
+    half_life = settings.RANKING_HALF_LIFE_DAYS * 86400
+    return 0.5 ** (max(elapsed_seconds, 0) / half_life)
+
+
+def ranking_score(
+    decayed_sum: float,
+    decayed_weight: float,
+    decayed_at: Optional[datetime],
+    completed: int,
+    cancelled: int,
+    now: Optional[datetime] = None
+) -> float:
+    """Pontuacao de ranking (escala das notas, 0 a 5)"""
+    now = now or datetime.now(timezone.utc)
+    factor = decay_factor((now - decayed_at).total_seconds()) if decayed_at else 1.0
+    prior_weight = settings.RANKING_PRIOR_WEIGHT
+
+    bayesian = (
+        (prior_weight * settings.RANKING_PRIOR_MEAN + (decayed_sum or 0) * factor)
+        / (prior_weight + (decayed_weight or 0) * factor)
+    )
+    completion = ((completed or 0) + 1) / ((completed or 0) + (cancelled or 0) + 2)
+    weight = settings.RANKING_COMPLETION_WEIGHT
+    return round(bayesian * ((1 - weight) + weight * completion), 4)
+
+
+def initial_score() -> float:
+    """Pontuacao de quem ainda nao tem avaliacoes nem agendamentos"""
+    return ranking_score(0, 0, None, 0, 0)
+
+
+def _set_initial_score(mapper, connection, target: User):
+    if not target.ranking_score:
+        target.ranking_score = initial_score()
+
+
+# Profissionais novos entram na busca pela media prior, nao abaixo de todos
+event.listen(User, "before_insert", _set_initial_score)
+
+
+def decayed_review_values(rating: int) -> Dict[Any, Any]:
+    """
+    SET do UPDATE que soma uma avaliacao nos acumulados decaidos:
+    acumulado * decaimento desde rating_decayed_at + nota.
+    """
+    users = User.__table__
+    elapsed = func.extract("epoch", func.now() - func.coalesce(users.c.rating_decayed_at, func.now()))
+    factor = func.power(0.5, elapsed / (settings.RANKING_HALF_LIFE_DAYS * 86400))
+    return {
+        users.c.rating_decayed_sum: users.c.rating_decayed_sum * factor + rating,
+        users.c.rating_decayed_weight: users.c.rating_decayed_weight * factor + 1,
+        users.c.rating_decayed_at: func.now(),
+    }
+
+
+def status_deltas(previous: Optional[str], new: str) -> Dict[str, int]:
+    """Variacao dos contadores de conclusao quando um agendamento muda de status"""
+    deltas: Counter = Counter()
+    for status, sign in ((previous, -1), (new, 1)):
+        if status == "completed":
+            deltas["appointments_completed"] += sign
+        elif status in NOT_COMPLETED:
+            deltas["appointments_cancelled"] += sign
+    return {column: delta for column, delta in deltas.items() if delta}
+
+
+class RankingService:
+    """Atualizacao da pontuacao de ranking dos profissionais"""
+
+    async def refresh(self, db: AsyncSession, professional_ids: Sequence[int]):
+        """Recalcula a pontuacao dos profissionais informados (sem commit)"""
+        ids = sorted(set(professional_ids))
+        if not ids:
+            return
+
+        result = await db.execute(
+            select(
+                User.id,
+                User.rating_decayed_sum,
+                User.rating_decayed_weight,
+                User.rating_decayed_at,
+                User.appointments_completed,
+                User.appointments_cancelled
+            ).where(User.id.in_(ids))
+        )
+        now = datetime.now(timezone.utc)
+        scores = [
+            {"id": user_id, "ranking_score": ranking_score(*inputs, now=now)}
+            for user_id, *inputs in result.all()
+        ]
+        if scores:
+            # UPDATE em lote pela chave primaria
+            await db.execute(update(User), scores)
+
+    async def record_appointment_status(
+        self,
+        db: AsyncSession,
+        professional_id: int,
+        previous: Optional[str],
+        new: str
+    ):
+        """Atualiza os contadores de conclusao e a pontuacao (sem commit)"""
+        deltas = status_deltas(previous, new)
+        if not deltas:
+            return
+
+        users = User.__table__
+        await db.execute(
+            update(users)
+            .where(users.c.id == professional_id)
+            .values({users.c[column]: users.c[column] + delta for column, delta in deltas.items()})
+        )
+        await self.refresh(db, [professional_id])
+
+    async def record_completions(self, db: AsyncSession, professional_ids: Sequence[int]):
+        """
+        Soma agendamentos concluidos em massa (um id por agendamento) e
+        recalcula a pontuacao dos profissionais afetados (sem commit).
+        """
+        counts = Counter(professional_ids)
+        if not counts:
+            return
+
+        users = User.__table__
+        await db.execute(
+            update(users)
+            .where(users.c.id == bindparam("professional_id"))
+            .values(appointments_completed=users.c.appointments_completed + bindparam("completed")),
+            [{"professional_id": pid, "completed": count} for pid, count in counts.items()]
+        )
+        await self.refresh(db, list(counts))
+
+    # ==================== JOB NOTURNO ====================
+
+    async def run_refresh_job(self):
+        """Job diario (recomendado: 04:00), uma execucao por dia no ledger"""
+        async with job_ledger.run("ranking_refresh", date.today().isoformat()) as run_id:
+            if run_id is None:
+                return
+            await job_ledger.stage(run_id, "recompute_inputs", self.recompute_inputs)
+            await job_ledger.stage(run_id, "refresh_scores", self.refresh_all)
+
+    async def recompute_inputs(self):
+        """Recalcula acumulados decaidos e contadores a partir de reviews e appointments"""
+        users = User.__table__
+        half_life = settings.RANKING_HALF_LIFE_DAYS * 86400
+
+        # Subconsultas correlacionadas por profissional (indices em professional_id)
+        weight = func.power(0.5, func.extract("epoch", func.now() - Review.created_at) / half_life)
+        professional_reviews = Review.professional_id == users.c.id
+        professional_appointments = and_(
+            Appointment.professional_id == users.c.id,
+            Appointment.is_manual_block.isnot(True)
+        )
+
+        def aggregate(expression, condition):
+            return select(func.coalesce(expression, 0)).where(condition).scalar_subquery()
+
+        async with JobsSessionLocal() as db:
+            result = await db.execute(
+                update(users)
+                .where(users.c.is_professional.is_(True))
+                .values(
+                    rating_decayed_sum=aggregate(func.sum(Review.rating * weight), professional_reviews),
+                    rating_decayed_weight=aggregate(func.sum(weight), professional_reviews),
+                    rating_decayed_at=func.now(),
+                    appointments_completed=aggregate(
+                        func.count(Appointment.id).filter(Appointment.status == "completed"),
+                        professional_appointments
+                    ),
+                    appointments_cancelled=aggregate(
+                        func.count(Appointment.id).filter(Appointment.status.in_(NOT_COMPLETED)),
+                        professional_appointments
+                    ),
+                )
+            )
+            await db.commit()
+
+        job_metrics.count(rows=result.rowcount)
+
+    async def refresh_all(self):
+        """Recalcula a pontuacao de todos os profissionais, em lotes por id"""
+        last_id = 0
+        while True:
+            async with JobsSessionLocal() as db:
+                result = await db.execute(
+                    select(User.id)
+                    .where(User.is_professional.is_(True), User.id > last_id)
+                    .order_by(User.id)
+                    .limit(REFRESH_BATCH_SIZE)
+                )
+                ids = result.scalars().all()
+                await self.refresh(db, ids)
+                await db.commit()
+
+            job_metrics.count(rows=len(ids))
+            if len(ids) < REFRESH_BATCH_SIZE:
+                return
+            last_id = ids[-1]
+
+
+# Instancia singleton
+ranking = RankingService()
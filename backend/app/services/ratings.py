@@ -0,0 +1,207 @@
+"""
+Agregados de avaliacao dos profissionais, mantidos incrementalmente.
+
+users guarda total_reviews, rating_sum e rating_histogram (quantidade por
+estrela, posicoes 1 a 5). Cada avaliacao nova soma nesses campos com um
+UPDATE atomico na mesma transacao da avaliacao, e a media sai de
+rating_sum / total_reviews; o custo nao cresce com o numero de avaliacoes.
+
+O job de verificacao (diario) recalcula os agregados a partir de reviews,
+em lotes de usuarios travados, corrige as divergencias (avaliacoes apagadas
+ou inseridas fora da API) e registra quantas encontrou.
+"""
+
+import logging
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import Numeric, and_, cast, func, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..database import JobsSessionLocal
+from ..models import Review, User
+from .job_ledger import job_ledger
+from .job_metrics import job_metrics
+from .ranking import decayed_review_values, ranking
+
+logger = logging.getLogger(__name__)
+
+STARS = (1, 2, 3, 4, 5)
+
+# Usuarios travados e verificados por transacao
+VERIFY_BATCH_SIZE = 500
+
+
+class RatingAggregate(NamedTuple):
+    total: int
+    rating_sum: int
+    histogram: List[int]
+
+
+def average(rating_sum: int, total: int) -> Optional[float]:
+    return round(rating_sum / total, 2) if total else None
+
+
+def distribution(histogram: Optional[Sequence[int]]) -> Dict[str, int]:
+    """Quantidade por estrela ({"1": n, ..., "5": n}) a partir do histograma"""
+    counts = list(histogram or [])
+    counts += [0] * (len(STARS) - len(counts))
+    return {str(star): counts[star - 1] for star in STARS}
+
+
+def find_drift(rows: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """
+    Compara os agregados gravados com os recalculados.
+
+    Args:
+        rows: (user_id, total, rating_sum, histogram, total real, soma real,
+            real 1, ..., real 5)
+
+    Returns:
+        list: Valores corretos dos profissionais com divergencia
+    """
+    corrections = []
+    for user_id, total, rating_sum, histogram, *actual in rows:
+        actual_total, actual_sum, *actual_histogram = [value or 0 for value in actual]
+        stored = RatingAggregate(total or 0, rating_sum or 0, list(histogram or [0] * len(STARS)))
+        expected = RatingAggregate(actual_total, actual_sum, actual_histogram)
+        if stored != expected:
+            corrections.append({
+                "id": user_id,
+                "total_reviews": expected.total,
+                "rating_sum": expected.rating_sum,
+                "rating_histogram": expected.histogram,
+                "average_rating": average(expected.rating_sum, expected.total),
+            })
+    return corrections
+
+
+class RatingService:
+    """Atualizacao incremental e verificacao dos agregados de avaliacao"""
+
+    async def add_review(self, db: AsyncSession, professional_id: int, rating: int):
+        """
+        Soma uma avaliacao nos agregados do profissional e atualiza a
+        pontuacao de ranking (sem commit).
+
+        No SET as colunas valem o conteudo anterior ao UPDATE, entao a media
+        e calculada com a nova avaliacao somada explicitamente.
+        """
+        if rating not in STARS:
+            raise ValueError(f"Nota invalida: {rating}")
+
+        users = User.__table__
+        total = func.coalesce(users.c.total_reviews, 0) + 1
+        new_sum = users.c.rating_sum + rating
+        await db.execute(
+            update(users)
+            .where(users.c.id == professional_id)
+            .values({
+                users.c.total_reviews: total,
+                users.c.rating_sum: new_sum,
+                users.c.rating_histogram[rating]: users.c.rating_histogram[rating] + 1,
+                users.c.average_rating: func.round(cast(new_sum, Numeric) / total, 2),
+                **decayed_review_values(rating),
+            })
+        )
+        await ranking.refresh(db, [professional_id])
+
+    # ==================== VERIFICACAO ====================
+
+    async def run_verification_job(self):
+        """Job diario (recomendado: 03:30), uma execucao por dia no ledger"""
+        async with job_ledger.run("rating_verification", date.today().isoformat()) as run_id:
+            if run_id is None:
+                return
+            await job_ledger.stage(run_id, "verify_ratings", self.verify)
+
+    async def verify(self) -> int:
+        """
+        Recalcula os agregados a partir de reviews e corrige as divergencias.
+
+        Cada lote de usuarios e travado (FOR UPDATE, em ordem de id) antes da
+        leitura: uma avaliacao concorrente espera o commit da correcao e soma
+        em cima do valor corrigido, ou ja esta commitada e entra na leitura.
+        Sem a trava, o valor absoluto gravado apagaria o incremento dela.
+
+        Returns:
+            int: Profissionais corrigidos
+        """
+        candidates = or_(
+            User.is_professional.is_(True),
+            and_(User.total_reviews.isnot(None), User.total_reviews != 0),
+            User.rating_sum != 0
+        )
+        checked = 0
+        corrected: List[int] = []
+        last_id = 0
+
+        while True:
+            async with JobsSessionLocal() as db:
+                result = await db.execute(
+                    select(User.id)
+                    .where(candidates, User.id > last_id)
+                    .order_by(User.id)
+                    .limit(VERIFY_BATCH_SIZE)
+                    .with_for_update()
+                )
+                ids = result.scalars().all()
+                if not ids:
+                    break
+
+                rows = await self._aggregates(db, ids)
+                corrections = find_drift(rows)
+                if corrections:
+                    # UPDATE em lote pela chave primaria (linhas ja travadas)
+                    await db.execute(update(User), corrections)
+                await db.commit()
+
+            checked += len(rows)
+            corrected += [c["id"] for c in corrections]
+            if len(ids) < VERIFY_BATCH_SIZE:
+                break
+            last_id = ids[-1]
+
+        job_metrics.count(rows=checked, failures=len(corrected))
+        if corrected:
+            logger.warning(
+                f"Agregados de avaliacao divergentes corrigidos: {len(corrected)} profissionais "
+                f"(ex: {corrected[:10]})"
+            )
+            # Import local: review_summary usa distribution() deste modulo
+            from .review_summary import review_summaries
+            await review_summaries.broadcast_invalidation(corrected)
+        return len(corrected)
+
+    async def _aggregates(self, db: AsyncSession, ids: Sequence[int]) -> List[Any]:
+        """Agregados gravados e recalculados de reviews dos usuarios informados"""
+        actual = (
+            select(
+                Review.professional_id,
+                func.count(Review.id).label("total"),
+                func.sum(Review.rating).label("rating_sum"),
+                *(func.count(Review.id).filter(Review.rating == star).label(f"stars_{star}") for star in STARS)
+            )
+            .where(Review.professional_id.in_(ids))
+            .group_by(Review.professional_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(
+                User.id,
+                User.total_reviews,
+                User.rating_sum,
+                User.rating_histogram,
+                actual.c.total,
+                actual.c.rating_sum,
+                *(actual.c[f"stars_{star}"] for star in STARS)
+            )
+            .outerjoin(actual, actual.c.professional_id == User.id)
+            .where(User.id.in_(ids))
+        )
+        return result.all()
+
+
+# Instancia singleton
+ratings = RatingService()
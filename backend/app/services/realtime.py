@@ -0,0 +1,192 @@
+"""
+Canal de eventos em tempo real (notificacoes e alteracoes de agenda).
+
+Os eventos sao publicados por usuario e entregues aos clientes conectados via
+SSE ou WebSocket (ver routers/realtime.py). O backend padrao e em memoria,
+suficiente para um unico worker. Com REALTIME_BACKEND=redis os eventos passam
+pelo pub/sub do Redis, permitindo varios workers/replicas da API.
+
+O mesmo canal leva avisos internos entre processos (broadcast/add_handler),
+como a invalidacao dos caches em memoria de cada worker.
+"""
+
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "realtime:"
+# Avisos internos entre processos (ex: invalidacao de cache)
+BROADCAST_PREFIX = "broadcast:"
+
+
+class RealtimeBroker:
+    """Pub/sub de eventos por usuario com fan-out para as conexoes locais"""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._handlers: Dict[str, List[Callable[[Any], None]]] = {}
+        self._redis = None
+        self._listener_task: Optional[asyncio.Task] = None
+
+    @property
+    def uses_redis(self) -> bool:
+        return self._redis is not None
+
+    async def start(self):
+        """Conecta ao Redis quando configurado e inicia o listener"""
+        if settings.REALTIME_BACKEND != "redis":
+            logger.info("Realtime: backend em memoria")
+            return
+
+        if not settings.REDIS_URL:
+            logger.warning("Realtime: REDIS_URL nao definida, usando backend em memoria")
+            return
+
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self._listener_task = asyncio.create_task(self._listen())
+        logger.info("Realtime: backend Redis iniciado")
+
+    async def stop(self):
+        """Encerra o listener e a conexao com o Redis"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[asyncio.Queue]:
+        """Registra uma conexao do usuario e remove ao sair do contexto"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.REALTIME_QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    async def publish(self, user_id: int, event: str, data: Any):
+        """
+        Publica um evento para todas as conexoes do usuario.
+
+        Falhas sao apenas registradas: o canal em tempo real nunca deve
+        interromper o fluxo que gerou o evento.
+        """
+        message = {"event": event, "data": jsonable_encoder(data)}
+
+        if self._redis is None:
+            self._dispatch(user_id, message)
+            return
+
+        try:
+            await self._redis.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(message))
+        except Exception as e:
+            logger.error(f"Realtime: erro ao publicar no Redis: {str(e)}")
+
+    def add_handler(self, topic: str, handler: Callable[[Any], None]):
+        """Registra uma funcao chamada a cada broadcast do topico (em todos os processos)"""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    async def broadcast(self, topic: str, data: Any):
+        """
+        Entrega um aviso aos handlers do topico em todos os processos
+        conectados ao Redis (so no processo atual com o backend em memoria).
+        """
+        data = jsonable_encoder(data)
+
+        if self._redis is None:
+            self._handle(topic, data)
+            return
+
+        try:
+            await self._redis.publish(f"{BROADCAST_PREFIX}{topic}", json.dumps(data))
+        except Exception as e:
+            logger.error(f"Realtime: erro ao publicar aviso no Redis: {str(e)}")
+            self._handle(topic, data)
+
+    def _handle(self, topic: str, data: Any):
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(data)
+            except Exception as e:
+                logger.error(f"Realtime: erro no handler de {topic}: {str(e)}")
+
+    def _dispatch(self, user_id: int, message: Dict[str, Any]):
+        """Entrega a mensagem as filas locais do usuario"""
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Cliente lento: descarta o evento em vez de acumular memoria
+                logger.warning(f"Realtime: fila cheia para usuario {user_id}, evento descartado")
+
+    async def _listen(self):
+        """Recebe eventos do Redis e repassa para as conexoes deste worker"""
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*", f"{BROADCAST_PREFIX}*")
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    channel = message["channel"]
+                    if channel.startswith(BROADCAST_PREFIX):
+                        self._handle(channel[len(BROADCAST_PREFIX):], json.loads(message["data"]))
+                        continue
+                    user_id = int(channel[len(CHANNEL_PREFIX):])
+                    self._dispatch(user_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                logger.error(f"Realtime: conexao com Redis perdida: {str(e)}")
+                await pubsub.close()
+                await asyncio.sleep(5)
+
+
+def appointment_payload(appointment, action: str) -> Dict[str, Any]:
+    """Delta de agenda enviado a profissional e cliente"""
+    return {
+        "action": action,  # created, updated, deleted
+        "appointment": {
+            "id": appointment.id,
+            "professional_id": appointment.professional_id,
+            "client_id": appointment.client_id,
+            "service_id": appointment.service_id,
+            "date": appointment.date,
+            "start_time": appointment.start_time,
+            "end_time": appointment.end_time,
+            "status": appointment.status,
+            "is_manual_block": appointment.is_manual_block,
+        },
+    }
+
+
+async def publish_appointment_change(appointment, action: str):
+    """Publica o delta de agenda para as partes envolvidas no agendamento"""
+    payload = appointment_payload(appointment, action)
+    for user_id in {appointment.professional_id, appointment.client_id}:
+        await realtime_broker.publish(user_id, "appointment", payload)
+
+
+# Instância singleton
+realtime_broker = RealtimeBroker()
@@ -8,17 +8,22 @@ Jobs diarios que rodam para:
 """
 
 import logging
-import uuid
 from datetime import date
+from typing import Dict, Optional, Sequence
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, selectinload
+from sqlalchemy import String, cast, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from ..models import Appointment, ReviewToken
+from ..database import JobsSessionLocal
+from ..models import Appointment, ReviewToken, Service, User
 from ..config import settings
-from .notifications.notification_service import notification_service
+from .job_ledger import job_ledger
+from .job_metrics import job_metrics
+from .notifications.outbox import QueuedEmail, enqueue_emails
 from .notifications.templates import email_templates
+from .ranking import ranking
 
 logger = logging.getLogger(__name__)
 
@@ -26,29 +31,9 @@ logger = logging.getLogger(__name__)
 class ReviewJobsService:
     """Servico para executar jobs schedulados de avaliacoes"""
 
-    def __init__(self):
-        self.engine = None
-        self.async_session = None
-
-    async def init_db(self):
-        """Inicializa conexao com banco de dados"""
-        if not self.engine:
-            db_url = settings.DATABASE_URL
-            if db_url.startswith("postgresql://"):
-                db_url = db_url.replace(
-                    "postgresql://", "postgresql+asyncpg://"
-                )
-            self.engine = create_async_engine(db_url, echo=False)
-            self.async_session = sessionmaker(
-                self.engine,
-                class_=AsyncSession,
-                expire_on_commit=False,
-            )
-
     async def get_session(self) -> AsyncSession:
-        """Retorna uma sessao do banco"""
-        await self.init_db()
-        return self.async_session()
+        """Retorna uma sessao do pool de jobs"""
+        return JobsSessionLocal()
 
     # ==================== JOB PRINCIPAL ====================
 
@@ -64,8 +49,19 @@ class ReviewJobsService:
         logger.info("=" * 50)
 
         try:
-            await self.auto_complete_past_appointments()
-            await self.send_pending_review_emails()
+            # Uma execucao por dia; reexecucoes retomam da etapa que falhou
+            async with job_ledger.run("daily_review_jobs", date.today().isoformat()) as run_id:
+                if run_id is None:
+                    return
+
+                await job_ledger.stage(
+                    run_id, "auto_complete_past_appointments",
+                    lambda: self.auto_complete_past_appointments(run_id)
+                )
+                await job_ledger.stage(
+                    run_id, "send_pending_review_emails",
+                    lambda: self.send_pending_review_emails(run_id)
+                )
             logger.info(
                 "Jobs diarios de avaliacao finalizados com sucesso"
             )
@@ -77,46 +73,33 @@ class ReviewJobsService:
 
     # ==================== AUTO-COMPLETAR ====================
 
-    async def auto_complete_past_appointments(self):
+    async def auto_complete_past_appointments(self, run_id: Optional[int] = None):
         """
         Auto-completa agendamentos com status 'scheduled'
         cuja data ja passou. Gera token de avaliacao para cada.
+
+        Processa em lotes com commit por lote, com operacoes em massa
+        (UPDATE ... RETURNING e INSERT ... SELECT): status, tokens, e-mails
+        na fila e itens no ledger (review_email:<id>) entram na mesma
+        transacao, entao uma falha no meio so refaz o lote interrompido.
         """
         logger.info("Auto-completando agendamentos passados...")
 
-        async with await self.get_session() as db:
-            today = date.today()
-
-            # Buscar agendamentos scheduled com data passada
-            result = await db.execute(
-                select(Appointment)
-                .options(
-                    selectinload(Appointment.client),
-                    selectinload(Appointment.professional),
-                    selectinload(Appointment.service),
-                )
-                .filter(
-                    Appointment.status == "scheduled",
-                    Appointment.is_manual_block.is_(False),
-                    Appointment.date < today,
-                )
-            )
-            appointments = result.scalars().all()
-
-            count = 0
-            for appt in appointments:
-                appt.status = "completed"
-                await self._generate_token_and_send_email(db, appt)
-                count += 1
-
-            await db.commit()
-            logger.info(
-                f"Agendamentos auto-completados: {count}"
-            )
+        today = date.today()
+        count = await self._process_in_chunks(
+            run_id,
+            Appointment.status == "scheduled",
+            Appointment.is_manual_block.is_(False),
+            Appointment.date < today,
+            complete=True
+        )
+        logger.info(
+            f"Agendamentos auto-completados: {count}"
+        )
 
     # ==================== EMAILS PENDENTES ====================
 
-    async def send_pending_review_emails(self):
+    async def send_pending_review_emails(self, run_id: Optional[int] = None):
         """
         Busca agendamentos completed sem token de avaliacao
         e envia email. Safety net para falhas no fluxo principal.
@@ -125,101 +108,153 @@ class ReviewJobsService:
             "Verificando emails de avaliacao pendentes..."
         )
 
-        async with await self.get_session() as db:
-            # IDs que ja tem token
-            subquery = select(ReviewToken.appointment_id)
+        # IDs que ja tem token
+        subquery = select(ReviewToken.appointment_id)
 
-            result = await db.execute(
-                select(Appointment)
-                .options(
-                    selectinload(Appointment.client),
-                    selectinload(Appointment.professional),
-                    selectinload(Appointment.service),
-                )
-                .filter(
-                    Appointment.status == "completed",
-                    Appointment.is_manual_block.is_(False),
-                    ~Appointment.id.in_(subquery),
-                )
-            )
-            appointments = result.scalars().all()
-
-            count = 0
-            for appt in appointments:
-                await self._generate_token_and_send_email(db, appt)
-                count += 1
-
-            await db.commit()
-            logger.info(
-                f"Emails de avaliacao enviados (safety net): {count}"
-            )
+        count = await self._process_in_chunks(
+            run_id,
+            Appointment.status == "completed",
+            Appointment.is_manual_block.is_(False),
+            ~Appointment.id.in_(subquery)
+        )
+        logger.info(
+            f"Emails de avaliacao enviados (safety net): {count}"
+        )
 
     # ==================== HELPER ====================
 
-    async def _generate_token_and_send_email(
+    async def _process_in_chunks(
         self,
-        db: AsyncSession,
-        appointment: Appointment,
-    ):
-        """Gera token UUID e envia email de avaliacao ao cliente"""
-        try:
-            token_value = str(uuid.uuid4())
+        run_id: Optional[int],
+        *conditions,
+        complete: bool = False
+    ) -> int:
+        """
+        Gera tokens e enfileira e-mails de avaliacao para os agendamentos
+        que atendem as condicoes, um lote por transacao.
 
-            review_token = ReviewToken(
-                token=token_value,
-                appointment_id=appointment.id,
-            )
-            db.add(review_token)
-
-            # Enviar email ao cliente
-            if (
-                appointment.client
-                and appointment.client.email
-            ):
-                frontend_url = settings.FRONTEND_URL.rstrip("/")
-                review_link = (
-                    f"{frontend_url}/avaliar/{token_value}"
-                )
+        Cada lote trava apenas os ids do lote (FOR UPDATE SKIP LOCKED), sem
+        carregar objetos ORM: com complete=True o status muda em um UPDATE
+        em massa. Memoria e duracao dos locks nao crescem com o backlog.
 
-                professional_name = (
-                    appointment.professional.name
-                    if appointment.professional
-                    else "Profissional"
-                )
-                service_title = (
-                    appointment.service.title
-                    if appointment.service
-                    else "Servico"
+        Returns:
+            int: Total de agendamentos processados
+        """
+        chunk_size = settings.REVIEW_JOBS_CHUNK_SIZE
+        total = 0
+
+        while True:
+            async with await self.get_session() as db:
+                due = (
+                    select(Appointment.id)
+                    .where(*conditions)
+                    .order_by(Appointment.id)
+                    .limit(chunk_size)
+                    .with_for_update(skip_locked=True)
                 )
-
-                subject, plain_text, html = (
-                    email_templates.review_request(
-                        recipient_name=appointment.client.name,
-                        professional_name=professional_name,
-                        service_title=service_title,
-                        appointment_date=appointment.date,
-                        review_link=review_link,
+                if complete:
+                    table = Appointment.__table__
+                    result = await db.execute(
+                        update(table)
+                        .where(table.c.id.in_(due))
+                        .values(status="completed")
+                        .returning(table.c.id, table.c.professional_id)
                     )
+                    completed = result.all()
+                    appointment_ids = [appt_id for appt_id, _ in completed]
+                    await ranking.record_completions(db, [pid for _, pid in completed])
+                else:
+                    result = await db.execute(due)
+                    appointment_ids = result.scalars().all()
+
+                emails = await self._create_tokens_and_enqueue_emails(db, appointment_ids)
+                await job_ledger.record(
+                    db, run_id, (f"review_email:{appt_id}" for appt_id in appointment_ids)
                 )
+                await db.commit()
 
-                await notification_service.send_subscription_email(
-                    to_email=appointment.client.email,
-                    subject=subject,
-                    plain_text=plain_text,
-                    html=html,
-                )
+            job_metrics.count(rows=len(appointment_ids), emails=emails)
+            total += len(appointment_ids)
+            if len(appointment_ids) < chunk_size:
+                return total
 
-                logger.info(
-                    f"Email de avaliacao enviado para "
-                    f"{appointment.client.email} "
-                    f"(appointment {appointment.id})"
-                )
+    async def _create_tokens_and_enqueue_emails(
+        self,
+        db: AsyncSession,
+        appointment_ids: Sequence[int],
+    ) -> int:
+        """
+        Cria os tokens de avaliacao do lote com um INSERT ... SELECT
+        (UUID gerado pelo Postgres) e enfileira os e-mails aos clientes
+        na mesma transacao.
 
-        except Exception as e:
-            logger.error(
-                f"Erro ao gerar token/enviar email para "
-                f"appointment {appointment.id}: {str(e)}"
+        Returns:
+            int: Quantidade de e-mails enfileirados
+        """
+        if not appointment_ids:
+            return 0
+
+        tokens = ReviewToken.__table__
+        result = await db.execute(
+            pg_insert(tokens)
+            .from_select(
+                ["token", "appointment_id"],
+                select(
+                    cast(func.gen_random_uuid(), String),
+                    Appointment.id
+                ).where(Appointment.id.in_(appointment_ids))
+            )
+            # Token ja criado pelo fluxo principal: nao duplica nem reenvia
+            .on_conflict_do_nothing(index_elements=["appointment_id"])
+            .returning(tokens.c.appointment_id, tokens.c.token)
+        )
+        created: Dict[int, str] = dict(result.all())
+        if not created:
+            return 0
+
+        # Apenas as colunas usadas no template
+        client = aliased(User)
+        professional = aliased(User)
+        result = await db.execute(
+            select(
+                Appointment.id,
+                Appointment.date,
+                client.name.label("client_name"),
+                client.email.label("client_email"),
+                professional.name.label("professional_name"),
+                Service.title.label("service_title"),
             )
+            .join(client, Appointment.client_id == client.id)
+            .outerjoin(professional, Appointment.professional_id == professional.id)
+            .outerjoin(Service, Appointment.service_id == Service.id)
+            .where(
+                Appointment.id.in_(list(created)),
+                client.email.isnot(None),
+                client.email != ""
+            )
+        )
+        emails = [self._review_email(row, created[row.id]) for row in result.all()]
+        enqueue_emails(db, emails)
+
+        logger.info(
+            f"Tokens de avaliacao criados: {len(created)}, "
+            f"e-mails enfileirados: {len(emails)}"
+        )
+        return len(emails)
+
+    def _review_email(self, row, token_value: str) -> QueuedEmail:
+        """Monta o e-mail de avaliacao de um agendamento"""
+        frontend_url = settings.FRONTEND_URL.rstrip("/")
+        review_link = f"{frontend_url}/avaliar/{token_value}"
+
+        subject, plain_text, html = email_templates.review_request(
+            recipient_name=row.client_name,
+            professional_name=row.professional_name or "Profissional",
+            service_title=row.service_title or "Servico",
+            appointment_date=row.date,
+            review_link=review_link,
+        )
+        return row.client_email, subject, plain_text, html
 
 
 # Instancia singleton
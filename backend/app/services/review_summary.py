@@ -0,0 +1,114 @@
+"""
+Cache do resumo de avaliacoes exibido no perfil publico do profissional.
+
+O resumo (media, total, distribuicao por estrela e ultimos comentarios) fica
+em memoria por profissional, com validade de REVIEW_SUMMARY_TTL_SECONDS e no
+maximo REVIEW_SUMMARY_CACHE_SIZE entradas (as menos usadas saem primeiro).
+Uma avaliacao nova (e as correcoes da verificacao de agregados) invalidam a
+entrada em todos os processos pelo canal do realtime_broker (pub/sub do
+Redis); com o backend em memoria, so no processo atual, e os demais renovam
+o resumo quando a validade expira.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..config import settings
+from ..models import Review, User
+from ..schemas import ReviewCommentResponse, ReviewsSummaryResponse
+from .ratings import distribution
+from .realtime import realtime_broker
+
+# Comentarios exibidos no resumo
+LATEST_REVIEWS = 10
+
+# Topico do broadcast de invalidacao (ids dos profissionais)
+INVALIDATION_TOPIC = "review_summary_invalidated"
+
+
+class ReviewSummaryCache:
+    """Resumos de avaliacao por profissional (LRU com validade)"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[int, Tuple[ReviewsSummaryResponse, float]]" = OrderedDict()
+
+    async def get(self, db: AsyncSession, professional_id: int) -> Optional[ReviewsSummaryResponse]:
+        """Resumo do profissional, ou None se ele nao existir"""
+        cached = self._entries.get(professional_id)
+        if cached and time.monotonic() - cached[1] < settings.REVIEW_SUMMARY_TTL_SECONDS:
+            self._entries.move_to_end(professional_id)
+            return cached[0]
+
+        summary = await self._load(db, professional_id)
+        if summary is not None:
+            self._store(professional_id, summary)
+        return summary
+
+    def invalidate(self, professional_id: int):
+        """Descarta o resumo apenas neste processo"""
+        self._entries.pop(professional_id, None)
+
+    def invalidate_many(self, professional_ids: Iterable[int]):
+        for professional_id in professional_ids:
+            self.invalidate(professional_id)
+
+    async def broadcast_invalidation(self, professional_ids: Iterable[int]):
+        """Descarta os resumos aqui na hora e avisa os demais processos"""
+        ids = list(professional_ids)
+        if not ids:
+            return
+        self.invalidate_many(ids)
+        await realtime_broker.broadcast(INVALIDATION_TOPIC, ids)
+
+    def _store(self, professional_id: int, summary: ReviewsSummaryResponse):
+        self._entries[professional_id] = (summary, time.monotonic())
+        self._entries.move_to_end(professional_id)
+        while len(self._entries) > settings.REVIEW_SUMMARY_CACHE_SIZE:
+            self._entries.popitem(last=False)
+
+    async def _load(self, db: AsyncSession, professional_id: int) -> Optional[ReviewsSummaryResponse]:
+        result = await db.execute(
+            select(User.average_rating, User.total_reviews, User.rating_histogram).where(
+                User.id == professional_id,
+                User.is_professional.is_(True),
+            )
+        )
+        professional = result.first()
+        if not professional:
+            return None
+
+        latest_comments = []
+        if professional.total_reviews:
+            # Indice (professional_id, created_at, id)
+            reviews_result = await db.execute(
+                select(Review.rating, Review.comment, Review.customer_name, Review.created_at)
+                .where(Review.professional_id == professional_id)
+                .order_by(Review.created_at.desc(), Review.id.desc())
+                .limit(LATEST_REVIEWS)
+            )
+            latest_comments = [
+                ReviewCommentResponse(
+                    rating=r.rating,
+                    comment=r.comment,
+                    customer_name=r.customer_name,
+                    created_at=r.created_at,
+                )
+                for r in reviews_result.all()
+                if r.comment
+            ]
+
+        return ReviewsSummaryResponse(
+            average_rating=professional.average_rating,
+            total_reviews=professional.total_reviews or 0,
+            rating_distribution=distribution(professional.rating_histogram),
+            latest_comments=latest_comments,
+        )
+
+
+# Instancia singleton
+review_summaries = ReviewSummaryCache()
+realtime_broker.add_handler(INVALIDATION_TOPIC, review_summaries.invalidate_many)
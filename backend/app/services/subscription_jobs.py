@@ -10,45 +10,33 @@ Jobs diarios que rodam para:
 """
 
 import logging
-from datetime import date, timedelta, datetime
-from typing import List, Optional
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
-from sqlalchemy import select, and_, or_
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select, update, and_, or_, exists, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models import Subscription, SubscriptionPlan, User
+from ..database import JobsSessionLocal
+from ..models import JobItem, Subscription, SubscriptionPlan, User
 from ..config import settings
 from .notifications.notification_service import notification_service
+from .job_ledger import job_ledger
+from .job_metrics import job_metrics
+from .notifications.outbox import QueuedEmail, enqueue_emails
 from .notifications.templates import email_templates
 
 logger = logging.getLogger(__name__)
 
+# (subscription_id, e-mail a enfileirar) de cada assinatura processada no lote
+ProcessedItem = Tuple[int, QueuedEmail]
+
 
 class SubscriptionJobsService:
     """Servico para executar jobs schedulados de assinaturas"""
 
-    def __init__(self):
-        self.engine = None
-        self.async_session = None
-
-    async def init_db(self):
-        """Inicializa conexao com banco de dados"""
-        if not self.engine:
-            self.engine = create_async_engine(
-                settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
-                echo=False
-            )
-            self.async_session = sessionmaker(
-                self.engine,
-                class_=AsyncSession,
-                expire_on_commit=False
-            )
-
     async def get_session(self) -> AsyncSession:
-        """Retorna uma sessao do banco"""
-        await self.init_db()
-        return self.async_session()
+        """Retorna uma sessao do pool de jobs"""
+        return JobsSessionLocal()
 
     # ==================== JOB PRINCIPAL ====================
 
@@ -63,20 +51,40 @@ class SubscriptionJobsService:
         logger.info("=" * 50)
 
         try:
-            # 1. Enviar lembretes de renovacao (7 dias antes)
-            await self.send_renewal_reminders()
+            # Uma execucao por dia; reexecucoes retomam da etapa que falhou
+            async with job_ledger.run("daily_subscription_jobs", date.today().isoformat()) as run_id:
+                if run_id is None:
+                    return
+
+                # 1. Enviar lembretes de renovacao (7 dias antes)
+                await job_ledger.stage(
+                    run_id, "send_renewal_reminders",
+                    lambda: self.send_renewal_reminders(run_id)
+                )
 
-            # 2. Processar cancelamentos agendados
-            await self.process_scheduled_cancellations()
+                # 2. Processar cancelamentos agendados
+                await job_ledger.stage(
+                    run_id, "process_scheduled_cancellations",
+                    lambda: self.process_scheduled_cancellations(run_id)
+                )
 
-            # 3. Processar mudancas de plano agendadas (downgrades)
-            await self.process_scheduled_plan_changes()
+                # 3. Processar mudancas de plano agendadas (downgrades)
+                await job_ledger.stage(
+                    run_id, "process_scheduled_plan_changes",
+                    lambda: self.process_scheduled_plan_changes(run_id)
+                )
 
-            # 4. Verificar trials expirando
-            await self.check_expiring_trials()
+                # 4. Verificar trials expirando
+                await job_ledger.stage(
+                    run_id, "check_expiring_trials",
+                    lambda: self.check_expiring_trials(run_id)
+                )
 
-            # 5. Verificar periodo de tolerancia vencido
-            await self.check_grace_period_expired()
+                # 5. Verificar periodo de tolerancia vencido
+                await job_ledger.stage(
+                    run_id, "check_grace_period_expired",
+                    lambda: self.check_grace_period_expired(run_id)
+                )
 
             logger.info("Jobs diarios de assinatura finalizados com sucesso")
 
@@ -84,400 +92,409 @@ class SubscriptionJobsService:
             logger.error(f"Erro nos jobs diarios de assinatura: {str(e)}")
             raise
 
+    # ==================== PROCESSAMENTO EM LOTES ====================
+
+    async def _process_in_chunks(
+        self,
+        process_chunk: Callable[[AsyncSession], Awaitable[List[ProcessedItem]]],
+        run_id: Optional[int] = None,
+        item_prefix: str = ""
+    ) -> int:
+        """
+        Executa uma transicao em lotes de tamanho fixo.
+
+        Cada lote roda em transacao propria: process_chunk aplica o UPDATE em
+        massa (linhas travadas com FOR UPDATE SKIP LOCKED) e devolve
+        (subscription_id, e-mail) de cada assinatura processada. Os e-mails
+        entram na fila e os itens no ledger do job no mesmo commit. Assim
+        memoria e tamanho da transacao nao crescem com o numero de assinantes,
+        e nenhum e-mail e perdido ou duplicado se o job for interrompido.
+
+        Returns:
+            int: Total de assinaturas processadas
+        """
+        chunk_size = settings.SUBSCRIPTION_JOBS_CHUNK_SIZE
+        total = 0
+
+        while True:
+            async with await self.get_session() as db:
+                processed = await process_chunk(db)
+                enqueue_emails(db, (email for _, email in processed))
+                await job_ledger.record(
+                    db, run_id, (f"{item_prefix}:{sub_id}" for sub_id, _ in processed)
+                )
+                await db.commit()
+
+            # Cada assinatura processada gera um e-mail na fila
+            job_metrics.count(rows=len(processed), emails=len(processed))
+            total += len(processed)
+
+            if len(processed) < chunk_size:
+                return total
+
+    def _due_subscriptions(self, *conditions):
+        """Subquery com os ids do proximo lote, travados para este worker"""
+        return (
+            select(Subscription.id)
+            .where(and_(*conditions))
+            .order_by(Subscription.id)
+            .limit(settings.SUBSCRIPTION_JOBS_CHUNK_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+
+    async def _sync_users(self, db: AsyncSession, subscription_ids: List[int], **values):
+        """
+        Replica a transicao no usuario dono de cada assinatura (um unico UPDATE).
+
+        Returns:
+            dict: {user_id: (nome, email)}
+        """
+        if not subscription_ids:
+            return {}
+
+        result = await db.execute(
+            update(User.__table__)
+            .where(
+                User.id == Subscription.professional_id,
+                Subscription.id.in_(subscription_ids)
+            )
+            .values(**values)
+            .returning(User.id, User.name, User.email)
+        )
+        return {user_id: (name, email) for user_id, name, email in result.all()}
+
+    async def _plan_names(self, db: AsyncSession, plan_ids) -> Dict[int, Tuple[str, float]]:
+        """Carrega nome e preco dos planos envolvidos no lote"""
+        plan_ids = {plan_id for plan_id in plan_ids if plan_id is not None}
+        if not plan_ids:
+            return {}
+
+        result = await db.execute(
+            select(SubscriptionPlan.id, SubscriptionPlan.name, SubscriptionPlan.price)
+            .where(SubscriptionPlan.id.in_(plan_ids))
+        )
+        return {plan_id: (name, price) for plan_id, name, price in result.all()}
+
     # ==================== LEMBRETES DE RENOVACAO ====================
 
-    async def send_renewal_reminders(self):
+    async def send_renewal_reminders(self, run_id: Optional[int] = None):
         """
         Envia lembretes para assinaturas que vencem em 7 dias.
         - Planos pagos: avisa sobre renovacao automatica
         - Trials: avisa sobre expiracao e sugere upgrade
+
+        O lembrete e marcado como enviado no proprio UPDATE que seleciona o lote
+        e registrado no ledger da execucao (renewal_reminder:<id>), o que garante
+        que cada assinatura receba no maximo um lembrete por dia, mesmo em reexecucoes.
         """
         logger.info("Verificando assinaturas para lembrete de renovacao...")
 
-        async with await self.get_session() as db:
-            today = date.today()
-            reminder_date = today + timedelta(days=7)
-
-            # Buscar assinaturas pagas que vencem em 7 dias
+        today = date.today()
+        reminder_date = today + timedelta(days=7)
+        not_reminded_today = and_(
+            or_(
+                Subscription.renewal_reminder_sent_at.is_(None),
+                Subscription.renewal_reminder_sent_at < today
+            ),
+            ~exists().where(
+                JobItem.job_run_id == run_id,
+                JobItem.item_key == func.concat("renewal_reminder:", Subscription.id)
+            )
+        )
+
+        async def claim_reminders(db: AsyncSession, *conditions) -> List[ProcessedItem]:
+            # O lote so contem assinaturas que o UPDATE consegue juntar com
+            # usuario e plano; ids travados e nao marcados encerrariam o loop
+            # antes da hora e voltariam primeiro em toda execucao
+            due = self._due_subscriptions(
+                *conditions,
+                Subscription.plan_id.isnot(None),
+                exists().where(User.id == Subscription.professional_id)
+            )
             result = await db.execute(
-                select(Subscription, User, SubscriptionPlan)
-                .join(User, User.id == Subscription.professional_id)
-                .join(SubscriptionPlan, SubscriptionPlan.id == Subscription.plan_id)
+                update(Subscription.__table__)
                 .where(
-                    and_(
-                        Subscription.status == "active",
-                        Subscription.next_billing_date == reminder_date,
-                        or_(
-                            Subscription.renewal_reminder_sent_at.is_(None),
-                            Subscription.renewal_reminder_sent_at < today
-                        ),
-                        # Nao enviar se ja tem cancelamento agendado
-                        Subscription.scheduled_cancellation_date.is_(None)
-                    )
+                    Subscription.id.in_(due),
+                    User.id == Subscription.professional_id,
+                    SubscriptionPlan.id == Subscription.plan_id
+                )
+                .values(renewal_reminder_sent_at=today)
+                .returning(
+                    Subscription.id,
+                    Subscription.next_billing_date,
+                    Subscription.trial_ends_at,
+                    User.name,
+                    User.email,
+                    SubscriptionPlan.name,
+                    SubscriptionPlan.price
                 )
             )
-            paid_subscriptions = result.all()
 
-            for sub, user, plan in paid_subscriptions:
-                if plan.price > 0:
+            processed = []
+            for sub_id, next_billing_date, trial_ends_at, user_name, user_email, plan_name, plan_price in result.all():
+                if trial_ends_at != reminder_date and plan_price > 0:
                     # Plano pago - avisar sobre renovacao automatica
-                    await self._send_paid_renewal_reminder(db, sub, user, plan)
+                    subject, plain_text, html = email_templates.renewal_reminder_paid(
+                        recipient_name=user_name,
+                        plan_name=plan_name,
+                        plan_price=plan_price,
+                        renewal_date=next_billing_date.strftime("%d/%m/%Y")
+                    )
                 else:
                     # Trial - avisar sobre expiracao
-                    await self._send_trial_expiring_reminder(db, sub, user, plan)
-
-            # Buscar trials que expiram em 7 dias
-            result = await db.execute(
-                select(Subscription, User, SubscriptionPlan)
-                .join(User, User.id == Subscription.professional_id)
-                .join(SubscriptionPlan, SubscriptionPlan.id == Subscription.plan_id)
-                .where(
-                    and_(
-                        Subscription.status == "active",
-                        Subscription.trial_ends_at == reminder_date,
-                        or_(
-                            Subscription.renewal_reminder_sent_at.is_(None),
-                            Subscription.renewal_reminder_sent_at < today
-                        )
+                    expiration_date = trial_ends_at or next_billing_date
+                    subject, plain_text, html = email_templates.trial_expiring_soon(
+                        recipient_name=user_name,
+                        days_remaining=(expiration_date - today).days,
+                        expiration_date=expiration_date.strftime("%d/%m/%Y")
                     )
-                )
-            )
-            trials = result.all()
-
-            for sub, user, plan in trials:
-                await self._send_trial_expiring_reminder(db, sub, user, plan)
-
-            await db.commit()
-            logger.info(f"Lembretes enviados: {len(paid_subscriptions)} pagos, {len(trials)} trials")
-
-    async def _send_paid_renewal_reminder(
-        self,
-        db: AsyncSession,
-        subscription: Subscription,
-        user: User,
-        plan: SubscriptionPlan
-    ):
-        """Envia lembrete de renovacao para plano pago"""
-        try:
-            subject, plain_text, html = email_templates.renewal_reminder_paid(
-                recipient_name=user.name,
-                plan_name=plan.name,
-                plan_price=plan.price,
-                renewal_date=subscription.next_billing_date.strftime("%d/%m/%Y")
-            )
-
-            success = await notification_service.send_subscription_email(
-                to_email=user.email,
-                subject=subject,
-                plain_text=plain_text,
-                html=html
-            )
-
-            if success:
-                subscription.renewal_reminder_sent_at = date.today()
-                logger.info(f"Lembrete de renovacao enviado para {user.email}")
-
-        except Exception as e:
-            logger.error(f"Erro ao enviar lembrete para {user.email}: {str(e)}")
-
-    async def _send_trial_expiring_reminder(
-        self,
-        db: AsyncSession,
-        subscription: Subscription,
-        user: User,
-        plan: SubscriptionPlan
-    ):
-        """Envia lembrete de expiracao de trial"""
-        try:
-            expiration_date = subscription.trial_ends_at or subscription.next_billing_date
-            days_remaining = (expiration_date - date.today()).days
-
-            success = await notification_service.notify_trial_expiring_soon(
-                user_email=user.email,
-                user_name=user.name,
-                days_remaining=days_remaining,
-                expiration_date=expiration_date.strftime("%d/%m/%Y")
-            )
-
-            if success:
-                subscription.renewal_reminder_sent_at = date.today()
-                logger.info(f"Lembrete de trial expirando enviado para {user.email}")
-
-        except Exception as e:
-            logger.error(f"Erro ao enviar lembrete de trial para {user.email}: {str(e)}")
+                processed.append((sub_id, (user_email, subject, plain_text, html)))
+            return processed
+
+        # Assinaturas que vencem em 7 dias
+        paid_count = await self._process_in_chunks(
+            lambda db: claim_reminders(
+                db,
+                Subscription.status == "active",
+                Subscription.next_billing_date == reminder_date,
+                not_reminded_today,
+                # Nao enviar se ja tem cancelamento agendado
+                Subscription.scheduled_cancellation_date.is_(None)
+            ),
+            run_id,
+            "renewal_reminder"
+        )
+
+        # Trials que expiram em 7 dias
+        trial_count = await self._process_in_chunks(
+            lambda db: claim_reminders(
+                db,
+                Subscription.status == "active",
+                Subscription.trial_ends_at == reminder_date,
+                not_reminded_today
+            ),
+            run_id,
+            "renewal_reminder"
+        )
+
+        logger.info(f"Lembretes enviados: {paid_count} pagos, {trial_count} trials")
 
     # ==================== CANCELAMENTOS AGENDADOS ====================
 
-    async def process_scheduled_cancellations(self):
+    async def process_scheduled_cancellations(self, run_id: Optional[int] = None):
         """
         Processa cancelamentos agendados para hoje.
         O usuario ja solicitou cancelamento mas continuou usando ate o vencimento.
         """
         logger.info("Processando cancelamentos agendados...")
 
-        async with await self.get_session() as db:
-            today = date.today()
+        today = date.today()
 
+        async def cancel_chunk(db: AsyncSession) -> List[ProcessedItem]:
             result = await db.execute(
-                select(Subscription, User, SubscriptionPlan)
-                .join(User, User.id == Subscription.professional_id)
-                .outerjoin(SubscriptionPlan, SubscriptionPlan.id == Subscription.plan_id)
-                .where(
-                    and_(
-                        Subscription.scheduled_cancellation_date <= today,
-                        Subscription.status.in_(["active", "pending"])
-                    )
+                update(Subscription.__table__)
+                .where(Subscription.id.in_(self._due_subscriptions(
+                    Subscription.scheduled_cancellation_date <= today,
+                    Subscription.status.in_(["active", "pending"])
+                )))
+                .values(
+                    status="cancelled",
+                    cancelled_at=func.now(),
+                    scheduled_cancellation_date=None
                 )
+                .returning(Subscription.id, Subscription.professional_id, Subscription.plan_id)
             )
-            subscriptions = result.all()
-
-            for sub, user, plan in subscriptions:
-                await self._execute_scheduled_cancellation(db, sub, user, plan)
-
-            await db.commit()
-            logger.info(f"Cancelamentos processados: {len(subscriptions)}")
-
-    async def _execute_scheduled_cancellation(
-        self,
-        db: AsyncSession,
-        subscription: Subscription,
-        user: User,
-        plan: Optional[SubscriptionPlan]
-    ):
-        """Executa o cancelamento efetivo de uma assinatura"""
-        try:
-            logger.info(f"Executando cancelamento agendado para usuario {user.id}")
-
-            # Atualizar status
-            subscription.status = "cancelled"
-            subscription.cancelled_at = datetime.now()
-            subscription.scheduled_cancellation_date = None
-
-            # Atualizar usuario
-            user.subscription_status = "cancelled"
+            cancelled = result.all()
 
-            # Enviar email de confirmacao de cancelamento efetivado
-            plan_name = plan.name if plan else "Plano Profissional"
-            await notification_service.notify_subscription_cancelled(
-                user_email=user.email,
-                user_name=user.name,
-                plan_name=plan_name,
-                cancellation_reason="Cancelamento agendado efetivado na data de vencimento"
+            users = await self._sync_users(
+                db, [sub_id for sub_id, _, _ in cancelled], subscription_status="cancelled"
             )
+            plans = await self._plan_names(db, (plan_id for _, _, plan_id in cancelled))
+
+            processed = []
+            for sub_id, user_id, plan_id in cancelled:
+                user_name, user_email = users[user_id]
+                plan_name = plans[plan_id][0] if plan_id in plans else "Plano Profissional"
+                subject, plain_text, html = email_templates.subscription_cancelled(
+                    recipient_name=user_name,
+                    plan_name=plan_name,
+                    cancellation_reason="Cancelamento agendado efetivado na data de vencimento"
+                )
+                processed.append((sub_id, (user_email, subject, plain_text, html)))
+            return processed
 
-            logger.info(f"Cancelamento efetivado para usuario {user.id}")
-
-        except Exception as e:
-            logger.error(f"Erro ao processar cancelamento para usuario {user.id}: {str(e)}")
+        count = await self._process_in_chunks(cancel_chunk, run_id, "scheduled_cancellation")
+        logger.info(f"Cancelamentos processados: {count}")
 
     # ==================== MUDANCAS DE PLANO AGENDADAS ====================
 
-    async def process_scheduled_plan_changes(self):
+    async def process_scheduled_plan_changes(self, run_id: Optional[int] = None):
         """
         Processa mudancas de plano agendadas para hoje.
         Usado para downgrades - usuario continua no plano atual ate vencimento.
         """
         logger.info("Processando mudancas de plano agendadas...")
 
-        async with await self.get_session() as db:
-            today = date.today()
+        today = date.today()
 
-            result = await db.execute(
-                select(Subscription, User, SubscriptionPlan)
-                .join(User, User.id == Subscription.professional_id)
-                .join(SubscriptionPlan, SubscriptionPlan.id == Subscription.scheduled_plan_id)
+        async def change_chunk(db: AsyncSession) -> List[ProcessedItem]:
+            # CTE preserva o plano anterior, que o RETURNING do UPDATE nao enxerga
+            due = (
+                select(
+                    Subscription.id,
+                    Subscription.plan_id.label("old_plan_id"),
+                    Subscription.scheduled_plan_id.label("new_plan_id")
+                )
                 .where(
-                    and_(
-                        Subscription.scheduled_plan_change_date <= today,
-                        Subscription.scheduled_plan_id.isnot(None),
-                        Subscription.status == "active"
-                    )
+                    Subscription.scheduled_plan_change_date <= today,
+                    Subscription.scheduled_plan_id.isnot(None),
+                    Subscription.status == "active"
                 )
+                .order_by(Subscription.id)
+                .limit(settings.SUBSCRIPTION_JOBS_CHUNK_SIZE)
+                .with_for_update(skip_locked=True)
+                .cte("due")
             )
-            subscriptions = result.all()
-
-            for sub, user, new_plan in subscriptions:
-                await self._execute_scheduled_plan_change(db, sub, user, new_plan)
 
-            await db.commit()
-            logger.info(f"Mudancas de plano processadas: {len(subscriptions)}")
+            result = await db.execute(
+                update(Subscription.__table__)
+                .where(
+                    Subscription.id == due.c.id,
+                    SubscriptionPlan.id == due.c.new_plan_id
+                )
+                .values(
+                    plan_id=due.c.new_plan_id,
+                    plan_amount=SubscriptionPlan.price,
+                    scheduled_plan_id=None,
+                    scheduled_plan_change_date=None,
+                    next_billing_date=today + timedelta(days=30)
+                )
+                .returning(
+                    Subscription.id,
+                    Subscription.professional_id,
+                    due.c.old_plan_id,
+                    due.c.new_plan_id
+                )
+            )
+            changed = result.all()
 
-    async def _execute_scheduled_plan_change(
-        self,
-        db: AsyncSession,
-        subscription: Subscription,
-        user: User,
-        new_plan: SubscriptionPlan
-    ):
-        """Executa a mudanca de plano agendada"""
-        try:
-            # Buscar plano atual para notificacao
-            old_plan_result = await db.execute(
-                select(SubscriptionPlan).where(SubscriptionPlan.id == subscription.plan_id)
+            # Atualizar usuario com o plano efetivado na assinatura
+            users = await self._sync_users(
+                db, [sub_id for sub_id, _, _, _ in changed], subscription_plan_id=Subscription.plan_id
             )
-            old_plan = old_plan_result.scalar_one_or_none()
-            old_plan_name = old_plan.name if old_plan else "Plano anterior"
-
-            logger.info(f"Executando mudanca de plano agendada para usuario {user.id}: {old_plan_name} -> {new_plan.name}")
-
-            # Atualizar assinatura
-            subscription.plan_id = new_plan.id
-            subscription.plan_amount = new_plan.price
-            subscription.scheduled_plan_id = None
-            subscription.scheduled_plan_change_date = None
-            subscription.next_billing_date = date.today() + timedelta(days=30)
-
-            # Atualizar usuario
-            user.subscription_plan_id = new_plan.id
-
-            # Enviar notificacao
-            is_upgrade = new_plan.price > (old_plan.price if old_plan else 0)
-            await notification_service.notify_subscription_plan_changed(
-                user_email=user.email,
-                user_name=user.name,
-                old_plan_name=old_plan_name,
-                new_plan_name=new_plan.name,
-                new_plan_price=new_plan.price,
-                is_upgrade=is_upgrade,
-                requires_payment=False
+            plans = await self._plan_names(
+                db, [plan_id for _, _, old_id, new_id in changed for plan_id in (old_id, new_id)]
             )
 
-            logger.info(f"Mudanca de plano efetivada para usuario {user.id}")
+            processed = []
+            for sub_id, user_id, old_plan_id, new_plan_id in changed:
+                user_name, user_email = users[user_id]
+                old_plan_name, old_plan_price = plans.get(old_plan_id, ("Plano anterior", 0))
+                new_plan_name, new_plan_price = plans[new_plan_id]
+                logger.info(f"Mudanca de plano efetivada para assinatura {sub_id}: {old_plan_name} -> {new_plan_name}")
+
+                subject, plain_text, html = email_templates.subscription_plan_changed(
+                    recipient_name=user_name,
+                    old_plan_name=old_plan_name,
+                    new_plan_name=new_plan_name,
+                    new_plan_price=new_plan_price,
+                    is_upgrade=new_plan_price > old_plan_price,
+                    requires_payment=False
+                )
+                processed.append((sub_id, (user_email, subject, plain_text, html)))
+            return processed
 
-        except Exception as e:
-            logger.error(f"Erro ao processar mudanca de plano para usuario {user.id}: {str(e)}")
+        count = await self._process_in_chunks(change_chunk, run_id, "scheduled_plan_change")
+        logger.info(f"Mudancas de plano processadas: {count}")
 
     # ==================== TRIALS EXPIRANDO ====================
 
-    async def check_expiring_trials(self):
+    async def check_expiring_trials(self, run_id: Optional[int] = None):
         """
         Verifica trials que expiram hoje e atualiza status.
         """
         logger.info("Verificando trials expirando...")
 
-        async with await self.get_session() as db:
-            today = date.today()
-
-            result = await db.execute(
-                select(Subscription, User, SubscriptionPlan)
-                .join(User, User.id == Subscription.professional_id)
-                .outerjoin(SubscriptionPlan, SubscriptionPlan.id == Subscription.plan_id)
-                .where(
-                    and_(
-                        Subscription.trial_ends_at <= today,
-                        Subscription.status == "active",
-                        # Apenas trials (sem mercadopago_preapproval_id)
-                        or_(
-                            Subscription.mercadopago_preapproval_id.is_(None),
-                            Subscription.plan_amount == 0
-                        )
+        today = date.today()
+
+        async def expire_chunk(db: AsyncSession) -> List[ProcessedItem]:
+            return await self._transition_with_email(
+                db,
+                self._due_subscriptions(
+                    Subscription.trial_ends_at <= today,
+                    Subscription.status == "active",
+                    # Apenas trials (sem mercadopago_preapproval_id)
+                    or_(
+                        Subscription.mercadopago_preapproval_id.is_(None),
+                        Subscription.plan_amount == 0
                     )
-                )
+                ),
+                "expired",
+                email_templates.trial_expired,
+                default_plan_name="Trial"
             )
-            expired_trials = result.all()
-
-            for sub, user, plan in expired_trials:
-                await self._expire_trial(db, sub, user, plan)
-
-            await db.commit()
-            logger.info(f"Trials expirados: {len(expired_trials)}")
 
-    async def _expire_trial(
-        self,
-        db: AsyncSession,
-        subscription: Subscription,
-        user: User,
-        plan: Optional[SubscriptionPlan]
-    ):
-        """Expira um trial"""
-        try:
-            logger.info(f"Expirando trial para usuario {user.id}")
-
-            subscription.status = "expired"
-            user.subscription_status = "expired"
-
-            # Enviar email
-            plan_name = plan.name if plan else "Trial"
-            subject, plain_text, html = email_templates.trial_expired(
-                recipient_name=user.name,
-                plan_name=plan_name
-            )
-
-            await notification_service.send_subscription_email(
-                to_email=user.email,
-                subject=subject,
-                plain_text=plain_text,
-                html=html
-            )
-
-            logger.info(f"Trial expirado para usuario {user.id}")
-
-        except Exception as e:
-            logger.error(f"Erro ao expirar trial para usuario {user.id}: {str(e)}")
+        count = await self._process_in_chunks(expire_chunk, run_id, "trial_expired")
+        logger.info(f"Trials expirados: {count}")
 
     # ==================== PERIODO DE TOLERANCIA ====================
 
-    async def check_grace_period_expired(self):
+    async def check_grace_period_expired(self, run_id: Optional[int] = None):
         """
         Verifica assinaturas com periodo de tolerancia vencido (7 dias apos falha de pagamento).
         """
         logger.info("Verificando periodos de tolerancia vencidos...")
 
-        async with await self.get_session() as db:
-            today = date.today()
-
-            result = await db.execute(
-                select(Subscription, User, SubscriptionPlan)
-                .join(User, User.id == Subscription.professional_id)
-                .outerjoin(SubscriptionPlan, SubscriptionPlan.id == Subscription.plan_id)
-                .where(
-                    and_(
-                        Subscription.grace_period_ends_at <= today,
-                        Subscription.status == "active",
-                        Subscription.payment_failure_count > 0
-                    )
-                )
+        today = date.today()
+
+        async def suspend_chunk(db: AsyncSession) -> List[ProcessedItem]:
+            return await self._transition_with_email(
+                db,
+                self._due_subscriptions(
+                    Subscription.grace_period_ends_at <= today,
+                    Subscription.status == "active",
+                    Subscription.payment_failure_count > 0
+                ),
+                "suspended",
+                email_templates.subscription_suspended_non_payment,
+                default_plan_name="Plano Profissional"
             )
-            expired_grace = result.all()
 
-            for sub, user, plan in expired_grace:
-                await self._suspend_for_non_payment(db, sub, user, plan)
+        count = await self._process_in_chunks(suspend_chunk, run_id, "suspended_non_payment")
+        logger.info(f"Assinaturas suspensas por nao pagamento: {count}")
 
-            await db.commit()
-            logger.info(f"Assinaturas suspensas por nao pagamento: {len(expired_grace)}")
-
-    async def _suspend_for_non_payment(
+    async def _transition_with_email(
         self,
         db: AsyncSession,
-        subscription: Subscription,
-        user: User,
-        plan: Optional[SubscriptionPlan]
-    ):
-        """Suspende assinatura por nao pagamento apos periodo de tolerancia"""
-        try:
-            logger.info(f"Suspendendo assinatura por nao pagamento - usuario {user.id}")
-
-            subscription.status = "suspended"
-            user.subscription_status = "suspended"
-
-            # Enviar email
-            plan_name = plan.name if plan else "Plano Profissional"
-            subject, plain_text, html = email_templates.subscription_suspended_non_payment(
-                recipient_name=user.name,
+        due_ids,
+        new_status: str,
+        template: Callable[..., Tuple[str, str, str]],
+        default_plan_name: str
+    ) -> List[ProcessedItem]:
+        """Muda o status de assinatura e usuario do lote e monta o e-mail do template"""
+        result = await db.execute(
+            update(Subscription.__table__)
+            .where(Subscription.id.in_(due_ids))
+            .values(status=new_status)
+            .returning(Subscription.id, Subscription.professional_id, Subscription.plan_id)
+        )
+        rows = result.all()
+
+        users = await self._sync_users(
+            db, [sub_id for sub_id, _, _ in rows], subscription_status=new_status
+        )
+        plans = await self._plan_names(db, (plan_id for _, _, plan_id in rows))
+
+        processed = []
+        for sub_id, user_id, plan_id in rows:
+            user_name, user_email = users[user_id]
+            plan_name = plans[plan_id][0] if plan_id in plans else default_plan_name
+            subject, plain_text, html = template(
+                recipient_name=user_name,
                 plan_name=plan_name
             )
-
-            await notification_service.send_subscription_email(
-                to_email=user.email,
-                subject=subject,
-                plain_text=plain_text,
-                html=html
-            )
-
-            logger.info(f"Assinatura suspensa para usuario {user.id}")
-
-        except Exception as e:
-            logger.error(f"Erro ao suspender assinatura para usuario {user.id}: {str(e)}")
+            processed.append((sub_id, (user_email, subject, plain_text, html)))
+        return processed
 
     # ==================== UTILITARIOS ====================
 
@@ -0,0 +1,391 @@
+"""
+Inbox de webhooks do Mercado Pago.
+
+O endpoint do webhook apenas valida o evento, grava em webhook_inbox com uma
+chave de deduplicacao e responde 200 na hora: reentregas do Mercado Pago caem
+na mesma linha. O processamento roda no worker (WebhookProcessor): busca os
+detalhes no Mercado Pago pelo cliente assincrono, aplica a mudanca de estado
+e marca o evento como processado na mesma transacao, entao cada evento tem
+efeito uma unica vez. Falhas voltam para a fila com backoff.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..config import settings
+from ..database import JobsSessionLocal
+from ..models import Subscription, SubscriptionPlan, User, WebhookEvent
+from .billing import BillingAggregate, InvalidTransition, activation_changes, billing
+from .mercadopago_gateway import MercadoPagoError, mercadopago_gateway
+from .notifications.dispatcher import retry_delay
+from .notifications.outbox import enqueue_email
+from .notifications.templates import email_templates
+
+logger = logging.getLogger(__name__)
+
+# Tipos de notificacao tratados
+SUPPORTED_TYPES = ("preapproval", "payment")
+
+
+class InboundEvent(NamedTuple):
+    """Evento recebido, ja validado"""
+    event_type: str
+    resource_id: str
+    action: Optional[str]
+    dedupe_key: str
+
+
+def parse_event(body: Dict[str, Any]) -> Optional[InboundEvent]:
+    """
+    Extrai tipo, recurso e chave de deduplicacao do corpo do webhook.
+
+    A chave usa o id da notificacao (igual em todas as reentregas); sem ele,
+    usa tipo + recurso + acao.
+
+    Returns:
+        InboundEvent, ou None se o evento nao e tratado
+    """
+    data = body.get("data")
+    event_type = body.get("type")
+    resource_id = data.get("id") if isinstance(data, dict) else None
+    if event_type not in SUPPORTED_TYPES or not resource_id:
+        return None
+
+    resource_id = str(resource_id)
+    action = body.get("action")
+    if body.get("id"):
+        dedupe_key = f"{event_type}:{body['id']}"
+    else:
+        dedupe_key = f"{event_type}:{resource_id}:{action or ''}"
+
+    return InboundEvent(event_type, resource_id, action, dedupe_key[:200])
+
+
+def reference_user_id(external_reference: Any) -> Optional[int]:
+    """Id do usuario no external_reference ("123" ou "123_upgrade")"""
+    prefix = str(external_reference or "").split("_", 1)[0]
+    return int(prefix) if prefix.isdigit() else None
+
+
+def verify_signature(
+    secret: str,
+    signature_header: Optional[str],
+    request_id: Optional[str],
+    resource_id: str
+) -> bool:
+    """
+    Valida o header x-signature do Mercado Pago ("ts=...,v1=...").
+    O HMAC-SHA256 e calculado sobre "id:<data.id>;request-id:<x-request-id>;ts:<ts>;".
+    """
+    if not signature_header:
+        return False
+
+    parts = {}
+    for part in signature_header.split(","):
+        key, _, value = part.strip().partition("=")
+        parts[key] = value
+
+    ts, received = parts.get("ts"), parts.get("v1")
+    if not ts or not received:
+        return False
+
+    manifest = f"id:{resource_id.lower()};request-id:{request_id or ''};ts:{ts};"
+    expected = hmac.new(secret.encode(), manifest.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, received)
+
+
+async def store_event(db: AsyncSession, event: InboundEvent, payload: Dict[str, Any]) -> bool:
+    """
+    Grava o evento na inbox (o commit fica a cargo de quem chamou).
+
+    Returns:
+        bool: False se o evento ja estava na inbox (reentrega)
+    """
+    table = WebhookEvent.__table__
+    result = await db.execute(
+        pg_insert(table)
+        .values(
+            provider="mercadopago",
+            dedupe_key=event.dedupe_key,
+            event_type=event.event_type,
+            action=event.action,
+            resource_id=event.resource_id,
+            payload=payload,
+            status="pending",
+            attempts=0
+        )
+        .on_conflict_do_nothing(constraint="uq_webhook_inbox_provider_dedupe_key")
+        .returning(table.c.id)
+    )
+    return result.first() is not None
+
+
+class WebhookProcessor:
+    """Processa os eventos pendentes da inbox"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Inicia o loop de processamento em background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Processador de webhooks iniciado")
+
+    async def stop(self):
+        """Interrompe o loop de processamento"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.process_pending()
+            except Exception as e:
+                logger.error(f"Erro no processador de webhooks: {str(e)}")
+                processed = 0
+
+            if processed < settings.WEBHOOK_BATCH_SIZE:
+                await asyncio.sleep(settings.WEBHOOK_POLL_SECONDS)
+
+    async def process_pending(self) -> int:
+        """
+        Reserva e processa um lote da inbox, em ordem de chegada.
+
+        Returns:
+            int: Quantidade de eventos reservados no lote
+        """
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(minutes=settings.WEBHOOK_PROCESSING_TIMEOUT_MINUTES)
+
+        async with JobsSessionLocal() as db:
+            due = (
+                select(WebhookEvent.id)
+                .where(
+                    or_(
+                        and_(
+                            WebhookEvent.status == "pending",
+                            WebhookEvent.available_at <= now
+                        ),
+                        # Processamento interrompido (worker caiu no meio)
+                        and_(
+                            WebhookEvent.status == "processing",
+                            WebhookEvent.locked_at < stale_before
+                        )
+                    )
+                )
+                .order_by(WebhookEvent.id)
+                .limit(settings.WEBHOOK_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            table = WebhookEvent.__table__
+            result = await db.execute(
+                update(table)
+                .where(table.c.id.in_(due))
+                .values(status="processing", attempts=table.c.attempts + 1, locked_at=now)
+                .returning(table.c.id, table.c.event_type, table.c.resource_id, table.c.attempts)
+            )
+            batch = sorted(result.all(), key=lambda row: row.id)
+            await db.commit()
+
+        # Em sequencia: eventos da mesma assinatura sao aplicados na ordem recebida
+        for event in batch:
+            await self._process_event(event)
+
+        return len(batch)
+
+    async def _process_event(self, event):
+        # Consulta ao Mercado Pago fora da transacao (nao segura locks durante o HTTP)
+        try:
+            if event.event_type == "preapproval":
+                details = await mercadopago_gateway.get_preapproval(event.resource_id)
+            else:
+                details = await mercadopago_gateway.get_payment(event.resource_id)
+        except MercadoPagoError as e:
+            # Recurso inexistente nao adianta tentar de novo
+            await self._mark_failed(event, str(e), permanent=e.status_code == 404)
+            return
+
+        async with JobsSessionLocal() as db:
+            try:
+                if event.event_type == "preapproval":
+                    note = await self._apply_preapproval(db, event.resource_id, details)
+                else:
+                    note = await self._apply_payment(db, details)
+
+                # Estado do evento no mesmo commit da mudanca: efeito unico
+                await db.execute(
+                    update(WebhookEvent)
+                    .where(WebhookEvent.id == event.id)
+                    .values(
+                        status="ignored" if note else "processed",
+                        last_error=note,
+                        processed_at=datetime.now(timezone.utc),
+                        locked_at=None
+                    )
+                )
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                await self._mark_failed(event, str(e))
+                return
+
+        if note:
+            logger.warning(f"Webhook {event.id} ignorado: {note}")
+        else:
+            logger.info(f"Webhook {event.id} processado ({event.event_type} {event.resource_id})")
+
+    async def _mark_failed(self, event, error: str, permanent: bool = False):
+        exhausted = permanent or event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS
+        logger.error(
+            f"Falha ao processar webhook {event.id} "
+            f"(tentativa {event.attempts}): {error}"
+        )
+        async with JobsSessionLocal() as db:
+            await db.execute(
+                update(WebhookEvent)
+                .where(WebhookEvent.id == event.id)
+                .values(
+                    status="error" if exhausted else "pending",
+                    last_error=error,
+                    available_at=datetime.now(timezone.utc) + retry_delay(event.attempts),
+                    locked_at=None
+                )
+            )
+            await db.commit()
+
+    async def _apply_preapproval(
+        self,
+        db: AsyncSession,
+        preapproval_id: str,
+        preapproval_data: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        Aplica o status do preapproval na assinatura e no usuario.
+
+        Returns:
+            str: Motivo quando o evento nao se aplica, ou None
+        """
+        aggregate = await self._find_subscription(db, preapproval_id, preapproval_data)
+        if not aggregate:
+            return f"Assinatura não encontrada: {preapproval_id}"
+
+        subscription, user, plan = aggregate
+        mp_status = preapproval_data.get("status")
+
+        try:
+            if mp_status == "authorized":
+                previous = billing.transition(aggregate, "active", **activation_changes(preapproval_data))
+
+                # E-mail apenas na transicao, junto com o commit do evento
+                if previous != "active" and plan:
+                    subject, plain_text, html = email_templates.subscription_activated(
+                        recipient_name=user.name,
+                        plan_name=plan.name,
+                        plan_price=subscription.plan_amount or plan.price,
+                        is_trial=False
+                    )
+                    enqueue_email(db, user.email, subject, plain_text, html)
+
+            elif mp_status == "paused":
+                billing.transition(aggregate, "paused")
+
+            elif mp_status == "cancelled":
+                billing.transition(aggregate, "cancelled")
+        except InvalidTransition as e:
+            return str(e)
+
+        logger.info(f"Assinatura atualizada: {subscription.id} -> {mp_status}")
+        return None
+
+    async def _find_subscription(
+        self,
+        db: AsyncSession,
+        preapproval_id: str,
+        preapproval_data: Dict[str, Any]
+    ) -> Optional[BillingAggregate]:
+        """
+        Assinatura local do preapproval (com usuario e plano), travada para
+        atualizacao.
+
+        Checkouts pelo plano compartilhado (ver mercadopago_plans.py) guardam o
+        id do plano ate o primeiro webhook: nesse caso a assinatura pendente
+        e encontrada pelo plano + usuario do external_reference (link de
+        checkout) e passa a guardar o id do preapproval. Sem external_reference,
+        o pagador e procurado pelo e-mail.
+        """
+        aggregate = await billing.load(db, preapproval_id=preapproval_id)
+        if aggregate:
+            return aggregate
+
+        plan_id = preapproval_data.get("preapproval_plan_id")
+        if not plan_id:
+            return None
+
+        user_id = reference_user_id(preapproval_data.get("external_reference"))
+        payer_email = preapproval_data.get("payer_email")
+        if user_id is not None:
+            payer_condition = User.id == user_id
+        elif payer_email:
+            payer_condition = func.lower(User.email) == payer_email.lower()
+        else:
+            return None
+
+        result = await db.execute(
+            select(Subscription, User, SubscriptionPlan)
+            .join(User, User.id == Subscription.professional_id)
+            .outerjoin(SubscriptionPlan, SubscriptionPlan.id == Subscription.plan_id)
+            .where(
+                Subscription.mercadopago_preapproval_id == plan_id,
+                Subscription.status == "pending",
+                payer_condition
+            )
+            .limit(1)
+            .with_for_update(of=Subscription)
+        )
+        row = result.first()
+        if not row:
+            return None
+
+        aggregate = BillingAggregate(*row)
+        aggregate.subscription.mercadopago_preapproval_id = preapproval_id
+        logger.info(f"Assinatura {aggregate.subscription.id} vinculada ao preapproval {preapproval_id}")
+        return aggregate
+
+    async def _apply_payment(self, db: AsyncSession, payment_data: Dict[str, Any]) -> Optional[str]:
+        """Registra o pagamento recorrente na assinatura correspondente"""
+        preapproval_id = payment_data.get("preapproval_id")
+        if not preapproval_id:
+            return "Pagamento sem preapproval_id"
+
+        result = await db.execute(
+            select(Subscription)
+            .where(Subscription.mercadopago_preapproval_id == preapproval_id)
+            .with_for_update()
+        )
+        subscription = result.scalar_one_or_none()
+        if not subscription:
+            return f"Assinatura não encontrada: {preapproval_id}"
+
+        subscription.last_payment_date = date.today()
+        subscription.next_billing_date = date.today() + timedelta(days=30)
+        logger.info(f"Pagamento processado: {payment_data.get('id')}")
+        return None
+
+
+# Instancia singleton
+webhook_processor = WebhookProcessor()
@@ -34,8 +34,9 @@ logger = logging.getLogger(__name__)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from sqlalchemy import select, and_
-from app.database import AsyncSessionLocal
+from app.database import JobsSessionLocal
 from app.models import Subscription, SubscriptionPlan, User
+from app.services.billing import billing
 
 
 async def expire_trials():
@@ -50,50 +51,24 @@ async def expire_trials():
     expired_count = 0
     error_count = 0
 
-    async with AsyncSessionLocal() as db:
+    async with JobsSessionLocal() as db:
         try:
-            # Buscar assinaturas trial ativas que expiraram
-            result = await db.execute(
-                select(Subscription).where(
-                    and_(
-                        Subscription.status == "active",
-                        Subscription.trial_ends_at != None,
-                        Subscription.trial_ends_at < date.today()
-                    )
-                )
+            # Assinaturas trial ativas que expiraram: assinatura e usuario
+            # atualizados em um unico statement
+            expired_ids = await billing.bulk_transition(
+                db,
+                "expired",
+                Subscription.status == "active",
+                Subscription.trial_ends_at != None,
+                Subscription.trial_ends_at < date.today()
             )
-            expired_subscriptions = result.scalars().all()
-
-            logger.info(f"Encontradas {len(expired_subscriptions)} assinaturas trial expiradas")
-
-            for subscription in expired_subscriptions:
-                try:
-                    # Buscar usuário
-                    result = await db.execute(
-                        select(User).where(User.id == subscription.professional_id)
-                    )
-                    user = result.scalar_one_or_none()
-
-                    # Marcar assinatura como expirada
-                    subscription.status = "expired"
-
-                    # Atualizar status do usuário
-                    if user:
-                        user.subscription_status = "expired"
-
-                    expired_count += 1
-                    logger.info(
-                        f"  ✓ Assinatura {subscription.id} expirada "
-                        f"(usuário: {user.email if user else 'N/A'}, "
-                        f"trial_ends_at: {subscription.trial_ends_at})"
-                    )
-
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f"  ✗ Erro ao expirar assinatura {subscription.id}: {e}")
-
             await db.commit()
 
+            expired_count = len(expired_ids)
+            logger.info(f"Encontradas {expired_count} assinaturas trial expiradas")
+            for subscription_id in expired_ids:
+                logger.info(f"  ✓ Assinatura {subscription_id} expirada")
+
         except Exception as e:
             logger.error(f"Erro geral ao processar trials: {e}")
             raise
@@ -120,7 +95,7 @@ async def notify_expiring_soon():
     from datetime import timedelta
     warning_date = date.today() + timedelta(days=3)
 
-    async with AsyncSessionLocal() as db:
+    async with JobsSessionLocal() as db:
         result = await db.execute(
             select(Subscription, User).join(
                 User, User.id == Subscription.professional_id
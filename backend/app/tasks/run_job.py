@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Executa (ou retoma) um job diário manualmente.
+
+A execução usa o ledger de jobs (job_runs / job_items): se o job do dia
+falhou no meio, rodar de novo pula as etapas e itens já concluídos e
+continua do ponto onde parou. Um job já concluído no dia não roda de novo.
+
+Uso:
+    python -m app.tasks.run_job daily_subscription_jobs
+    python -m app.tasks.run_job daily_review_jobs
+    python -m app.tasks.run_job daily_metrics_compaction
+    python -m app.tasks.run_job rating_verification
+    python -m app.tasks.run_job ranking_refresh
+"""
+
+import sys
+import os
+import asyncio
+import logging
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.database import dispose_engines
+from app.services.daily_metrics import daily_metrics
+from app.services.job_lock import locked_job
+from app.services.ranking import ranking
+from app.services.ratings import ratings
+from app.services.review_jobs import review_jobs
+from app.services.subscription_jobs import subscription_jobs
+
+JOBS = {
+    "daily_subscription_jobs": subscription_jobs.run_daily_subscription_jobs,
+    "daily_review_jobs": review_jobs.run_daily_review_jobs,
+    "daily_metrics_compaction": daily_metrics.run_compaction_job,
+    "rating_verification": ratings.run_verification_job,
+    "ranking_refresh": ranking.run_refresh_job,
+}
+
+
+async def main(job_name: str) -> int:
+    if job_name not in JOBS:
+        logger.error(f"Job desconhecido: {job_name}. Opções: {', '.join(JOBS)}")
+        return 1
+
+    try:
+        # Mesmo lock do scheduler: não roda em paralelo com o worker
+        await locked_job(job_name, JOBS[job_name])()
+        return 0
+    except Exception as e:
+        logger.error(f"❌ Erro ao executar {job_name}: {e}")
+        return 1
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    sys.exit(asyncio.run(main(sys.argv[1])))
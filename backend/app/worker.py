@@ -0,0 +1,158 @@
+# worker.py - Processo de background (scheduler + fila de e-mails + webhooks)
+"""
+Worker de background.
+
+Roda os jobs agendados, o dispatcher da fila de e-mails e o processador
+da inbox de webhooks fora do processo que atende HTTP, assim um SMTP lento,
+um Mercado Pago lento ou um job noturno pesado não afeta a latência da API.
+
+Uso:
+    python -m app.worker
+
+Com RUN_WORKER_IN_API=true (padrão) a própria API inicia estes componentes
+no lifespan, mantendo o deploy de um único processo.
+"""
+
+import asyncio
+import logging
+import signal
+import sys
+
+import pytz
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from .config import settings
+from .database import dispose_engines
+from .services.billing_reconciliation import billing_reconciliation
+from .services.daily_metrics import daily_metrics
+from .services.job_lock import locked_job
+from .services.mercadopago_gateway import mercadopago_gateway
+from .services.notifications import notification_service
+from .services.notifications.dispatcher import outbox_dispatcher
+from .services.notifications.retention import archive_old_notifications
+from .services.ranking import ranking
+from .services.ratings import ratings
+from .services.realtime import realtime_broker
+from .services.review_jobs import review_jobs
+from .services.subscription_jobs import subscription_jobs
+from .services.webhook_inbox import webhook_processor
+
+logger = logging.getLogger(__name__)
+
+# Scheduler global
+scheduler = AsyncIOScheduler()
+
+
+def configure_scheduler():
+    """Registra os jobs agendados (horários de Brasília)"""
+    brasilia_tz = pytz.timezone('America/Sao_Paulo')
+    scheduler.add_job(
+        locked_job("daily_subscription_jobs", subscription_jobs.run_daily_subscription_jobs),
+        CronTrigger(hour=0, minute=30, timezone=brasilia_tz),
+        id="daily_subscription_jobs",
+        name="Jobs diarios de assinatura",
+        replace_existing=True
+    )
+    scheduler.add_job(
+        locked_job("daily_review_jobs", review_jobs.run_daily_review_jobs),
+        CronTrigger(hour=1, minute=0, timezone=brasilia_tz),
+        id="daily_review_jobs",
+        name="Jobs diarios de avaliacao",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        locked_job("notification_retention", archive_old_notifications),
+        CronTrigger(hour=2, minute=0, timezone=brasilia_tz),
+        id="notification_retention",
+        name="Arquivamento de notificacoes antigas",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        locked_job("daily_metrics_compaction", daily_metrics.run_compaction_job),
+        CronTrigger(hour=2, minute=30, timezone=brasilia_tz),
+        id="daily_metrics_compaction",
+        name="Compactacao das metricas diarias",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        locked_job("billing_reconciliation", billing_reconciliation.run_reconciliation_job),
+        CronTrigger(hour=3, minute=0, timezone=brasilia_tz),
+        id="billing_reconciliation",
+        name="Reconciliacao de assinaturas com o Mercado Pago",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        locked_job("rating_verification", ratings.run_verification_job),
+        CronTrigger(hour=3, minute=30, timezone=brasilia_tz),
+        id="rating_verification",
+        name="Verificacao dos agregados de avaliacao",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        locked_job("ranking_refresh", ranking.run_refresh_job),
+        CronTrigger(hour=4, minute=0, timezone=brasilia_tz),
+        id="ranking_refresh",
+        name="Recalculo da pontuacao de ranking da busca",
+        replace_existing=True,
+    )
+    if settings.NOTIFICATION_DIGEST_ENABLED:
+        scheduler.add_job(
+            locked_job("notification_digests", notification_service.send_pending_digests),
+            IntervalTrigger(minutes=1),
+            id="notification_digests",
+            name="Envio de digests de notificacao",
+            replace_existing=True,
+        )
+
+
+async def start():
+    """Inicia scheduler, dispatcher da fila de e-mails e processador de webhooks"""
+    # Todos os processos agendam os jobs; locked_job garante uma execucao por vez no cluster
+    print("Configurando scheduler de jobs...")
+    configure_scheduler()
+    scheduler.start()
+    print("Scheduler iniciado! Jobs agendados: 00:30 assinaturas, 01:00 avaliacoes, 02:00 retencao de notificacoes, 02:30 metricas, 03:00 reconciliacao MP, 03:30 verificacao de avaliacoes, 04:00 ranking da busca (Brasilia)")
+
+    await outbox_dispatcher.start()
+    await webhook_processor.start()
+
+
+async def stop():
+    """Para scheduler, dispatcher e processador de webhooks"""
+    print("Encerrando scheduler...")
+    if scheduler.running:
+        scheduler.shutdown()
+    await outbox_dispatcher.stop()
+    await webhook_processor.stop()
+    await mercadopago_gateway.close()
+
+
+async def main():
+    """Entry point do processo dedicado"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    print("Iniciando worker...")
+    # Avisos para a API (ex: invalidacao do resumo de avaliacoes) via Redis
+    await realtime_broker.start()
+    await start()
+    await stop_event.wait()
+
+    await stop()
+    await realtime_broker.stop()
+    await dispose_engines()
+    print("Worker encerrado")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
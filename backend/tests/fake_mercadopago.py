@@ -0,0 +1,117 @@
+"""
+Servidor fake do Mercado Pago para testes.
+
+App ASGI com os endpoints usados pelo gateway, guardando os recursos em
+memoria. Use FakeMercadoPago().gateway() para um MercadoPagoGateway apontado
+para ele (sem rede). fail_next() injeta falhas para testar retries e o
+circuit breaker.
+"""
+
+import itertools
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.services.mercadopago_gateway import MercadoPagoGateway
+
+
+class FakeMercadoPago:
+    def __init__(self):
+        self.preapproval_plans: Dict[str, Dict[str, Any]] = {}
+        self.preapprovals: Dict[str, Dict[str, Any]] = {}
+        self.payments: Dict[str, Dict[str, Any]] = {}
+        self.requests: List[Dict[str, Any]] = []
+        self._failures: List[int] = []
+        self._ids = itertools.count(1)
+        self.app = self._build_app()
+
+    def fail_next(self, times: int = 1, status_code: int = 500):
+        """As proximas `times` requisicoes respondem com status_code"""
+        self._failures.extend([status_code] * times)
+
+    def gateway(self, **kwargs) -> MercadoPagoGateway:
+        kwargs.setdefault("backoff_seconds", 0)
+        return MercadoPagoGateway(
+            base_url="http://mercadopago.test",
+            access_token="TEST-token",
+            transport=httpx.ASGITransport(app=self.app),
+            **kwargs
+        )
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.middleware("http")
+        async def record_and_fail(request: Request, call_next):
+            self.requests.append({
+                "method": request.method,
+                "path": request.url.path,
+                "idempotency_key": request.headers.get("x-idempotency-key"),
+                "authorization": request.headers.get("authorization"),
+            })
+            if self._failures:
+                return JSONResponse({"message": "fake failure"}, status_code=self._failures.pop(0))
+            return await call_next(request)
+
+        @app.post("/preapproval_plan", status_code=201)
+        async def create_plan(request: Request):
+            data = await request.json()
+            plan_id = f"plan-{next(self._ids)}"
+            plan = {
+                **data,
+                "id": plan_id,
+                "status": "active",
+                "init_point": f"https://mercadopago.test/checkout?preapproval_plan_id={plan_id}",
+            }
+            self.preapproval_plans[plan_id] = plan
+            return plan
+
+        @app.get("/preapproval_plan/{plan_id}")
+        async def get_plan(plan_id: str):
+            if plan_id not in self.preapproval_plans:
+                return JSONResponse({"message": "not found"}, status_code=404)
+            return self.preapproval_plans[plan_id]
+
+        @app.post("/preapproval", status_code=201)
+        async def create_preapproval(request: Request):
+            data = await request.json()
+            preapproval_id = f"pre-{next(self._ids)}"
+            preapproval = {
+                "status": "pending",
+                **data,
+                "id": preapproval_id,
+                "init_point": f"https://mercadopago.test/checkout?preapproval_id={preapproval_id}",
+            }
+            self.preapprovals[preapproval_id] = preapproval
+            return preapproval
+
+        @app.get("/preapproval/search")
+        async def search_preapprovals(offset: int = 0, limit: int = 100):
+            results = list(self.preapprovals.values())
+            return {
+                "paging": {"total": len(results), "offset": offset, "limit": limit},
+                "results": results[offset:offset + limit],
+            }
+
+        @app.get("/preapproval/{preapproval_id}")
+        async def get_preapproval(preapproval_id: str):
+            if preapproval_id not in self.preapprovals:
+                return JSONResponse({"message": "not found"}, status_code=404)
+            return self.preapprovals[preapproval_id]
+
+        @app.put("/preapproval/{preapproval_id}")
+        async def update_preapproval(preapproval_id: str, request: Request):
+            if preapproval_id not in self.preapprovals:
+                return JSONResponse({"message": "not found"}, status_code=404)
+            self.preapprovals[preapproval_id].update(await request.json())
+            return self.preapprovals[preapproval_id]
+
+        @app.get("/v1/payments/{payment_id}")
+        async def get_payment(payment_id: str):
+            if payment_id not in self.payments:
+                return JSONResponse({"message": "not found"}, status_code=404)
+            return self.payments[payment_id]
+
+        return app
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.models import User
+from app.services.pagination import (
+    SortField,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+    page_result,
+    parse_datetime,
+)
+
+CREATED = SortField(User.created_at, parse_datetime)
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor("created_at", datetime(2026, 3, 1, 10, 30), 42)
+
+    assert decode_cursor(cursor, "created_at", CREATED) == (datetime(2026, 3, 1, 10, 30), 42)
+
+
+def test_cursor_rejects_other_sort_or_garbage():
+    cursor = encode_cursor("name", "Ana", 7)
+
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "created_at", CREATED)
+    with pytest.raises(ValueError):
+        decode_cursor("não-é-cursor", "created_at", CREATED)
+
+
+def test_page_result_emits_cursor_only_when_more_rows():
+    rows = [{"id": i, "name": f"user-{i}"} for i in range(1, 4)]
+
+    items, next_cursor = page_result(rows, "name", "name", size=2)
+    assert [item["id"] for item in items] == [1, 2]
+    assert decode_cursor(next_cursor, "name", SortField(User.name, str)) == ("user-2", 2)
+
+    items, next_cursor = page_result(rows, "name", "name", size=3)
+    assert len(items) == 3 and next_cursor is None
+
+
+def test_keyset_page_filters_after_cursor_position():
+    query = keyset_page(select(User.id), CREATED, User.id, True, 10, (datetime(2026, 3, 1), 5))
+    sql = str(query.compile())
+
+    assert "(users.created_at, users.id) <" in sql
+    assert "ORDER BY users.created_at DESC, users.id DESC" in sql
+    assert "LIMIT" in sql
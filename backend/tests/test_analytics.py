@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+from datetime import date
+
+from app.services.analytics import TimeSeries, bucket_starts, build_columns, iter_csv, iter_json
+
+
+def test_bucket_starts_cover_the_range():
+    assert bucket_starts(date(2026, 3, 4), date(2026, 3, 17), "week") == [
+        date(2026, 3, 2), date(2026, 3, 9), date(2026, 3, 16)
+    ]
+    assert bucket_starts(date(2025, 12, 15), date(2026, 2, 1), "month") == [
+        date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1)
+    ]
+    assert len(bucket_starts(date(2024, 1, 1), date(2024, 12, 31), "day")) == 366
+
+
+def test_build_columns_fills_missing_buckets_with_zero():
+    buckets = [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)]
+
+    columns = build_columns(buckets, {"revenue": {date(2026, 2, 1): 59.8}, "appointments": {}})
+
+    assert columns == {"revenue": [0, 59.8, 0], "appointments": [0, 0, 0]}
+
+
+def _timeseries():
+    return TimeSeries(
+        [date(2026, 3, 1), date(2026, 3, 2)],
+        {"appointments": [3, 5], "cancellations:too_expensive": [0, 1]}
+    )
+
+
+def test_json_stream_is_columnar():
+    body = json.loads("".join(iter_json(_timeseries(), {"bucket": "day"})))
+
+    assert body == {
+        "bucket": "day",
+        "buckets": ["2026-03-01", "2026-03-02"],
+        "series": {"appointments": [3, 5], "cancellations:too_expensive": [0, 1]},
+    }
+
+
+def test_csv_stream_has_one_row_per_bucket():
+    chunks = list(iter_csv(_timeseries(), chunk_rows=1))
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+
+    assert len(chunks) == 3
+    assert rows == [
+        ["bucket", "appointments", "cancellations:too_expensive"],
+        ["2026-03-01", "3", "0"],
+        ["2026-03-02", "5", "1"],
+    ]
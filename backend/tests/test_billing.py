@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+
+from app.models import Subscription, User
+from app.services.billing import (
+    BillingAggregate,
+    InvalidTransition,
+    billing,
+    can_transition,
+)
+
+
+def _aggregate(status):
+    subscription = Subscription(id=1, professional_id=10, status=status)
+    user = User(id=10, subscription_status="pending")
+    return BillingAggregate(subscription, user, None)
+
+
+def test_transition_updates_subscription_and_user():
+    aggregate = _aggregate("pending")
+
+    previous = billing.transition(aggregate, "active", next_billing_date=date(2026, 4, 10))
+
+    assert previous == "pending"
+    assert aggregate.subscription.status == "active"
+    assert aggregate.subscription.next_billing_date == date(2026, 4, 10)
+    assert aggregate.user.subscription_status == "active"
+
+
+def test_cancel_sets_cancelled_at_and_user_status_override():
+    aggregate = _aggregate("pending")
+
+    billing.transition(aggregate, "cancelled", user_status="inactive")
+
+    assert aggregate.subscription.cancelled_at is not None
+    assert aggregate.user.subscription_status == "inactive"
+
+
+def test_invalid_transition_changes_nothing():
+    aggregate = _aggregate("cancelled")
+
+    with pytest.raises(InvalidTransition):
+        billing.transition(aggregate, "paused", init_point=None)
+
+    assert aggregate.subscription.status == "cancelled"
+    assert aggregate.user.subscription_status == "pending"
+
+
+def test_state_machine_table():
+    assert can_transition(None, "active")
+    assert can_transition("expired", "pending")
+    assert not can_transition("pending", "paused")
+    assert not can_transition("cancelled", "expired")
+
+
+async def test_bulk_transition_is_a_single_statement():
+    from sqlalchemy.dialects import postgresql
+
+    statements = []
+
+    class RecordingSession:
+        async def execute(self, statement):
+            statements.append(str(statement.compile(dialect=postgresql.dialect())))
+
+            class Result:
+                def all(self):
+                    return [(1,), (2,)]
+            return Result()
+
+    ids = await billing.bulk_transition(RecordingSession(), "expired", Subscription.status == "active")
+
+    assert ids == [1, 2]
+    assert len(statements) == 1
+    assert statements[0].startswith("WITH changed AS")
+    assert "UPDATE users SET subscription_status" in statements[0]
@@ -0,0 +1,135 @@
+from datetime import date, timedelta
+
+from app.config import settings
+from app.services.billing import activation_changes
+from app.services.billing_reconciliation import (
+    BillingReconciliationService,
+    Correction,
+    DriftReport,
+    LocalSubscription,
+    diff_page,
+)
+from tests.fake_mercadopago import FakeMercadoPago
+
+
+def _local(sub_id, preapproval_id, status, user_status, scheduled=None):
+    return LocalSubscription(sub_id, preapproval_id, status, sub_id + 100, user_status, scheduled)
+
+
+def test_diff_corrects_status_drift():
+    local = {
+        "pre-1": _local(1, "pre-1", "pending", "pending"),
+        "pre-2": _local(2, "pre-2", "active", "active"),
+        "pre-3": _local(3, "pre-3", "active", "active"),
+    }
+    remote = [
+        {"id": "pre-1", "status": "authorized"},
+        {"id": "pre-2", "status": "authorized"},
+        {"id": "pre-3", "status": "paused"},
+    ]
+
+    diff = diff_page(remote, local)
+
+    assert [(c.subscription_id, c.status, c.user_status) for c in diff.corrections] == [
+        (1, "active", "active"),
+        (3, "paused", "inactive"),
+    ]
+    assert diff.report_only == [] and diff.missing_locally == []
+    assert diff.corrections[0].changes["next_billing_date"] == date.today() + timedelta(days=30)
+    assert diff.corrections[1].changes is None
+
+
+def test_activation_uses_gateway_billing_dates():
+    changes = activation_changes({
+        "payer_id": 777,
+        "next_payment_date": "2026-11-19T10:00:00.000-04:00",
+        "summarized": {"last_charged_date": "2026-10-19T10:00:00.000-04:00"},
+    })
+
+    assert changes == {
+        "mercadopago_payer_id": 777,
+        "last_payment_date": date(2026, 10, 19),
+        "next_billing_date": date(2026, 11, 19),
+    }
+    assert activation_changes({"next_payment_date": "invalida"})["last_payment_date"] == date.today()
+
+
+async def test_activations_record_revenue_before_bulk_update():
+    statements = []
+
+    class _Result:
+        def all(self):
+            return [(1, date(2026, 9, 19), 29.9), (2, date(2026, 10, 19), 29.9)]
+
+    class _Session:
+        async def execute(self, statement, params=None):
+            statements.append(statement)
+            return _Result()
+
+    changes = {"last_payment_date": date(2026, 10, 19)}
+    corrections = [
+        Correction(1, 101, "pending", "active", "active", changes),
+        Correction(2, 102, "pending", "active", "active", changes),
+    ]
+
+    await BillingReconciliationService(gateway=None)._apply(_Session(), corrections)
+
+    upsert = statements[1].compile()
+    assert "daily_metrics" in str(upsert)
+    assert upsert.params["metric_m0"] == "revenue" and upsert.params["value_m0"] == 29.9
+    assert "UPDATE subscriptions" in str(statements[2])
+
+
+def test_diff_reports_without_correcting_risky_cases():
+    local = {
+        "pre-1": _local(1, "pre-1", "cancelled", "cancelled"),
+        "pre-2": _local(2, "pre-2", "active", "active", scheduled=date(2026, 4, 1)),
+        "pre-3": _local(3, "pre-3", "active", "active"),
+    }
+    remote = [
+        {"id": "pre-1", "status": "authorized"},
+        {"id": "pre-2", "status": "cancelled"},
+        {"id": "pre-3", "status": "pending"},
+        {"id": "pre-9", "status": "authorized"},
+    ]
+
+    diff = diff_page(remote, local)
+
+    assert diff.corrections == []
+    assert [item["subscription_id"] for item in diff.report_only] == [1, 3]
+    assert diff.missing_locally == ["pre-9"]
+
+
+def test_drift_report_counts_transitions():
+    report = DriftReport(dry_run=True)
+    local = {"pre-1": _local(1, "pre-1", "active", "active")}
+    report.add_page(2, diff_page(
+        [{"id": "pre-1", "status": "cancelled"}, {"id": "pre-2", "status": "authorized"}], local
+    ))
+    report.add_missing_remote([7, 8])
+
+    summary = report.as_dict()
+
+    assert summary["checked"] == 2 and summary["corrected"] == 1
+    assert summary["transitions"] == {"active->cancelled": 1}
+    assert summary["missing_locally"] == {"count": 1, "ids": ["pre-2"]}
+    assert summary["missing_remote"]["count"] == 2
+
+
+async def test_fetch_pages_reads_every_page(monkeypatch):
+    monkeypatch.setattr(settings, "RECONCILIATION_PAGE_SIZE", 2)
+    monkeypatch.setattr(settings, "RECONCILIATION_CONCURRENCY", 2)
+    fake = FakeMercadoPago()
+    for i in range(5):
+        fake.preapprovals[f"pre-{i}"] = {"id": f"pre-{i}", "status": "authorized"}
+    service = BillingReconciliationService(gateway=fake.gateway())
+    seen = []
+
+    async def handle_page(results):
+        seen.extend(preapproval["id"] for preapproval in results)
+
+    total = await service.fetch_pages(handle_page)
+
+    assert total == 5
+    assert sorted(seen) == [f"pre-{i}" for i in range(5)]
+    assert sum(1 for r in fake.requests if r["path"] == "/preapproval/search") == 3
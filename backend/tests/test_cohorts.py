@@ -0,0 +1,52 @@
+from datetime import date, datetime
+
+from app.services.cohorts import NO_REASON, CohortRow, build_cohorts, to_row
+
+TODAY = date(2026, 3, 18)  # quarta-feira
+
+
+def _row(signup, paid_on=None, cancelled_on=None, trial=True, reason=None):
+    return CohortRow(signup, trial, paid_on, cancelled_on, paid_on is not None and not cancelled_on, reason)
+
+
+def test_to_row_dates_conversion_at_trial_end():
+    row = to_row(
+        datetime(2026, 3, 2, 10), datetime(2026, 3, 16), "active", 50.0,
+        None, date(2026, 5, 16), datetime(2026, 3, 2, 10), None, None
+    )
+
+    assert row.signup == date(2026, 3, 2)
+    assert row.had_trial and row.paying
+    assert row.paid_on == date(2026, 3, 16)
+
+
+def test_to_row_trial_without_payment_is_not_converted():
+    row = to_row(
+        datetime(2026, 3, 2), datetime(2026, 3, 16), "cancelled", 0.0,
+        date(2026, 3, 16), None, datetime(2026, 3, 2), datetime(2026, 3, 10), None
+    )
+
+    assert row.paid_on is None and not row.paying
+    assert row.cancelled_on == date(2026, 3, 10) and row.reason == NO_REASON
+
+
+def test_build_cohorts_conversion_and_retention_curves():
+    rows = [
+        _row(date(2026, 3, 2), paid_on=date(2026, 3, 3)),
+        _row(date(2026, 3, 3), paid_on=date(2026, 3, 10), cancelled_on=date(2026, 3, 17), reason="caro"),
+        _row(date(2026, 3, 4)),
+        _row(date(2026, 3, 5)),
+        _row(date(2026, 3, 16), paid_on=date(2026, 3, 16), trial=False),
+        _row(date(2025, 1, 6), paid_on=date(2025, 1, 6)),  # fora da janela
+    ]
+
+    data = build_cohorts(rows, TODAY, cohorts=3, horizon=4)
+
+    march_2, march_9, march_16 = data["cohorts"]
+    assert march_2["week"] == "2026-03-02" and march_2["signups"] == 4
+    assert march_2["conversion"] == [0.25, 0.5, 0.5, None]
+    assert march_2["retention"] == [0.25, 0.5, 0.25, None]
+    assert march_9["signups"] == 0 and march_9["conversion"] == [0.0, 0.0, None, None]
+    assert march_16["trials"] == 0 and march_16["conversion"] == [1.0, None, None, None]
+    assert data["funnel"] == {"signups": 6, "trials": 5, "converted": 4, "paying": 3, "cancelled": 1}
+    assert data["cancellation_reasons"] == {"caro": 1}
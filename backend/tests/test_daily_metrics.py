@@ -0,0 +1,121 @@
+from datetime import date
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import Appointment, Subscription, User
+from app.services.daily_metrics import (
+    SNAPSHOT_METRIC,
+    _upsert_increments,
+    collect_deltas,
+    daily_metrics,
+    month_bounds,
+    payment_deltas,
+)
+
+TODAY = date(2026, 3, 18)
+
+
+def _persisted_subscription(**committed):
+    subscription = Subscription(id=1, plan_amount=29.9)
+    for attribute, value in committed.items():
+        set_committed_value(subscription, attribute, value)
+    return subscription
+
+
+def test_new_rows_become_event_increments():
+    new = [
+        User(is_professional=True, is_admin=False),
+        User(is_professional=False, is_admin=False),
+        User(is_professional=False, is_admin=True),
+        Appointment(date=date(2026, 3, 20), is_manual_block=False),
+        Appointment(date=date(2026, 3, 20), is_manual_block=True),
+    ]
+
+    deltas = collect_deltas(new, [], today=TODAY)
+
+    assert deltas == {
+        ("new_professionals", TODAY, ""): 1,
+        ("new_clients", TODAY, ""): 1,
+        ("appointments", date(2026, 3, 20), ""): 1,
+    }
+
+
+def test_cancellation_counted_once_by_reason_code():
+    subscription = _persisted_subscription(status="active")
+    subscription.status = "cancelled"
+    subscription.cancellation_reason_code = "too_expensive"
+    already_cancelled = _persisted_subscription(status="cancelled")
+    already_cancelled.status = "cancelled"
+
+    deltas = collect_deltas([], [subscription, already_cancelled], today=TODAY)
+
+    assert deltas == {("cancellations", TODAY, "too_expensive"): 1}
+
+
+def test_payment_adds_revenue_on_payment_day():
+    subscription = _persisted_subscription(status="active", last_payment_date=date(2026, 2, 18))
+    subscription.last_payment_date = TODAY
+
+    deltas = collect_deltas([], [subscription], today=TODAY)
+
+    assert deltas == {("revenue", TODAY, ""): 29.9}
+
+
+def test_increment_is_an_additive_upsert():
+    sql = str(_upsert_increments({("appointments", TODAY, ""): 2}).compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT ON CONSTRAINT uq_daily_metrics_metric_day_dimension" in sql
+    assert "daily_metrics.value + excluded.value" in sql
+
+
+def test_increments_are_upserted_in_key_order():
+    deltas = {
+        ("revenue", TODAY, ""): 29.9,
+        ("appointments", date(2026, 3, 20), ""): 1,
+        ("appointments", TODAY, ""): 2,
+    }
+
+    params = _upsert_increments(deltas).compile(dialect=postgresql.dialect()).params
+    metrics = [(params[f"metric_m{i}"], params[f"day_m{i}"]) for i in range(3)]
+
+    assert metrics == [
+        ("appointments", TODAY),
+        ("appointments", date(2026, 3, 20)),
+        ("revenue", TODAY),
+    ]
+
+
+def test_month_bounds_cover_the_whole_month():
+    assert month_bounds(TODAY) == (date(2026, 3, 1), date(2026, 3, 31))
+    assert month_bounds(date(2028, 2, 10)) == (date(2028, 2, 1), date(2028, 2, 29))
+
+
+def test_bulk_payments_add_revenue_only_when_date_changes():
+    deltas = payment_deltas([
+        (date(2026, 2, 18), TODAY, 29.9),
+        (TODAY, TODAY, 29.9),
+        (None, TODAY, 0),
+        (None, date(2026, 3, 17), 49.9),
+    ])
+
+    assert deltas == {("revenue", TODAY, ""): 29.9, ("revenue", date(2026, 3, 17), ""): 49.9}
+
+
+async def test_dashboard_snapshot_is_keyed_on_a_metric_always_written():
+    statements = []
+
+    class _Result:
+        def all(self):
+            return [(SNAPSHOT_METRIC, "", 3, TODAY)]
+
+    class _Session:
+        async def execute(self, statement):
+            statements.append(statement.compile(dialect=postgresql.dialect()))
+            return _Result()
+
+    metrics = await daily_metrics.dashboard_metrics(_Session(), *month_bounds(TODAY))
+
+    assert metrics["snapshot_date"] == TODAY
+    assert SNAPSHOT_METRIC in statements[0].params.values()
+    assert "professionals" not in statements[0].params.values()
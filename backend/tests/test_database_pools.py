@@ -0,0 +1,11 @@
+from app.config import settings
+from app.database import pool_stats
+
+
+def test_pool_stats_reports_web_and_jobs_pools():
+    stats = pool_stats()
+
+    assert set(stats) == {"web", "jobs"}
+    assert stats["web"]["size"] == settings.DB_POOL_SIZE
+    assert stats["jobs"]["size"] == settings.DB_JOBS_POOL_SIZE
+    assert stats["jobs"]["checked_out"] == 0
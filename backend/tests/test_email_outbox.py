@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from app.services.notifications.dispatcher import retry_delay
+from app.services.notifications.outbox import enqueue_emails
+
+
+class _Session:
+    def __init__(self):
+        self.added = []
+
+    def add(self, obj):
+        self.added.append(obj)
+
+
+def test_enqueue_emails_adds_pending_rows_to_session():
+    db = _Session()
+    enqueue_emails(db, [("ana@x.com", "Assunto", "Texto", "<p>Texto</p>")])
+
+    assert len(db.added) == 1
+    email = db.added[0]
+    assert email.to_email == "ana@x.com"
+    assert email.status == "pending"
+    assert email.attempts == 0
+
+
+def test_retry_delay_grows_exponentially_and_is_capped():
+    assert retry_delay(1) == timedelta(minutes=1)
+    assert retry_delay(3) == timedelta(minutes=4)
+    assert retry_delay(10) == timedelta(hours=1)
@@ -0,0 +1,37 @@
+import io
+from datetime import date, datetime, time, timezone
+
+import pyarrow.parquet as pq
+
+from app.services.exports import EXPORTS, ParquetEncoder, column_names, csv_chunk
+
+
+def test_exports_never_include_credentials():
+    for spec in EXPORTS.values():
+        assert not {"hashed_password", "cpf"} & set(column_names(spec))
+
+
+def test_csv_chunk_serializes_dates_and_nulls():
+    rows = [
+        (1, date(2026, 3, 1), time(9, 30), None, datetime(2026, 3, 1, 8, tzinfo=timezone.utc)),
+        (2, None, None, 'com "aspas", e vírgula', None),
+    ]
+
+    assert csv_chunk(rows).splitlines() == [
+        "1,2026-03-01,09:30:00,,2026-03-01T08:00:00+00:00",
+        '2,,,"com ""aspas"", e vírgula",',
+    ]
+
+
+def test_parquet_encoder_writes_one_row_group_per_batch():
+    encoder = ParquetEncoder(EXPORTS["reviews"])
+    created = datetime(2026, 3, 1, 8, tzinfo=timezone.utc)
+    data = encoder.encode([(1, 10, 5, 4, None, "Ana", created)])
+    data += encoder.encode([(2, 11, 5, 5, "Ótimo", "Bia", None)])
+    data += encoder.finish()
+
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    table = parquet.read()
+    assert parquet.num_row_groups == 2
+    assert table.column("comment").to_pylist() == [None, "Ótimo"]
+    assert table.column("rating").to_pylist() == [4, 5]
@@ -0,0 +1,73 @@
+import io
+
+from PIL import Image
+
+from app.config import settings
+from app.services.image_processing import (
+    image_set,
+    process_upload,
+    render_variants,
+    shutdown_pool,
+    variant_widths,
+    write_variants,
+)
+
+
+def _png(width, height, mode="RGB", color="orange"):
+    buffer = io.BytesIO()
+    Image.new(mode, (width, height), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_render_variants_resizes_without_upscaling():
+    rendered = render_variants(_png(1000, 500), [320, 640, 1280], 160, 80)
+
+    sizes = {name: Image.open(io.BytesIO(data)).size for name, data in rendered.items()}
+    assert sizes == {"320w": (320, 160), "640w": (640, 320), "1000w": (1000, 500), "thumb": (160, 160)}
+    assert all(Image.open(io.BytesIO(data)).format == "WEBP" for data in rendered.values())
+
+
+def test_write_variants_keeps_transparency(tmp_path):
+    largest = write_variants(_png(400, 400, "RGBA", (255, 165, 0, 128)), str(tmp_path), "abc", [320], 100, 80)
+
+    assert largest == "320w"
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["abc-320w.webp", "abc-thumb.webp"]
+    assert Image.open(tmp_path / "abc-320w.webp").mode == "RGBA"
+
+
+def test_image_set_for_local_cloudinary_and_legacy_urls(monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_VARIANT_WIDTHS", [320, 640])
+
+    local = image_set("/uploads/services/abc-640w.webp")
+    assert local.srcset == "/uploads/services/abc-320w.webp 320w, /uploads/services/abc-640w.webp 640w"
+    assert local.thumbnail == "/uploads/services/abc-thumb.webp"
+
+    # Original mais estreita que a maior largura: srcset com a largura real
+    narrow = image_set("/uploads/services/abc-500w.webp")
+    assert narrow.srcset == "/uploads/services/abc-320w.webp 320w, /uploads/services/abc-500w.webp 500w"
+
+    cloud = image_set("https://res.cloudinary.com/demo/image/upload/v1/services/abc.webp")
+    assert cloud.variants[320] == (
+        "https://res.cloudinary.com/demo/image/upload/w_320,c_limit,f_webp,q_auto/v1/services/abc.webp"
+    )
+
+    legacy = image_set("/uploads/profiles/old.jpg")
+    assert legacy.srcset is None and legacy.variants == {}
+
+
+def test_variant_widths_never_upscale():
+    assert variant_widths(2000, [320, 640, 1280]) == [320, 640, 1280]
+    assert variant_widths(1000, [320, 640, 1280]) == [320, 640, 1000]
+    assert variant_widths(200, [320, 640, 1280]) == [200]
+
+
+async def test_process_upload_runs_in_spawned_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_VARIANT_WIDTHS", [320, 640])
+    try:
+        largest = await process_upload(_png(500, 250), tmp_path, "abc")
+    finally:
+        shutdown_pool()
+
+    assert largest == "500w"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["abc-320w.webp", "abc-500w.webp", "abc-thumb.webp"]
@@ -0,0 +1,45 @@
+import pytest
+
+from app.services.job_ledger import JobLedger
+
+
+def _ledger(monkeypatch, run_id):
+    ledger = JobLedger()
+    finished = []
+
+    async def begin(job_name, run_key):
+        return run_id
+
+    async def finish(run_id, error=None):
+        finished.append((run_id, error))
+
+    monkeypatch.setattr(ledger, "begin", begin)
+    monkeypatch.setattr(ledger, "finish", finish)
+    return ledger, finished
+
+
+async def test_completed_run_is_not_reopened(monkeypatch):
+    ledger, finished = _ledger(monkeypatch, None)
+
+    async with ledger.run("daily_review_jobs", "2026-03-10") as run_id:
+        assert run_id is None
+
+    assert finished == []
+
+
+async def test_failed_run_is_recorded_for_resume(monkeypatch):
+    ledger, finished = _ledger(monkeypatch, 7)
+
+    with pytest.raises(RuntimeError):
+        async with ledger.run("daily_review_jobs", "2026-03-10"):
+            raise RuntimeError("smtp caiu")
+
+    assert finished == [(7, "smtp caiu")]
+
+
+async def test_record_without_run_is_noop():
+    class _Session:
+        async def execute(self, statement):
+            raise AssertionError("não deveria gravar")
+
+    await JobLedger().record(_Session(), None, ["review_email:1"])
@@ -0,0 +1,28 @@
+from app.services import job_lock as job_lock_module
+from app.services.job_lock import InMemoryJobLock, lock_key, locked_job
+
+
+def test_lock_key_is_stable_signed_bigint():
+    key = lock_key("daily_subscription_jobs")
+    assert key == lock_key("daily_subscription_jobs")
+    assert key != lock_key("daily_review_jobs")
+    assert -(2 ** 63) <= key < 2 ** 63
+
+
+async def test_locked_job_skips_while_another_run_holds_the_lock(monkeypatch):
+    lock = InMemoryJobLock()
+    monkeypatch.setattr(job_lock_module, "job_lock", lock)
+    runs = []
+
+    async def job():
+        runs.append("ran")
+        return "done"
+
+    wrapped = locked_job("daily_review_jobs", job)
+
+    async with lock.acquire("daily_review_jobs") as acquired:
+        assert acquired
+        assert await wrapped() is None
+
+    assert await wrapped() == "done"
+    assert runs == ["ran"]
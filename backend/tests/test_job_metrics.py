@@ -0,0 +1,71 @@
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.routers.metrics import _check_token, format_metric
+from app.services.job_metrics import JobMetrics
+
+
+async def test_stage_collects_counts_from_job_code():
+    metrics = JobMetrics()
+
+    with metrics.track_stage() as stage:
+        metrics.count(rows=500, emails=500)
+        metrics.count(rows=12, emails=10)
+
+    assert stage.as_dict()["rows"] == 512
+    assert stage.emails == 510
+    assert stage.status == "completed"
+    assert stage.duration_seconds >= 0
+
+
+async def test_failed_stage_is_counted_and_reraised():
+    metrics = JobMetrics()
+
+    with pytest.raises(RuntimeError):
+        with metrics.track_stage() as stage:
+            metrics.count(rows=200)
+            raise RuntimeError("smtp caiu")
+
+    assert stage.status == "failed"
+    assert stage.failures == 1
+    assert stage.rows == 200
+
+
+def test_count_outside_stage_is_noop():
+    JobMetrics().count(rows=1, emails=1)
+
+
+def test_format_metric_prometheus_text():
+    lines = format_metric(
+        "contratapro_job_stage_rows", "Linhas", "gauge",
+        [({"job": "daily_review_jobs", "stage": 'a"b'}, 3), ({}, 1)]
+    )
+
+    assert lines == [
+        "# HELP contratapro_job_stage_rows Linhas",
+        "# TYPE contratapro_job_stage_rows gauge",
+        'contratapro_job_stage_rows{job="daily_review_jobs",stage="a\\"b"} 3',
+        "contratapro_job_stage_rows 1",
+    ]
+
+
+def test_metrics_endpoint_is_disabled_without_token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    with pytest.raises(HTTPException) as exc:
+        _check_token("Bearer ")
+    assert exc.value.status_code == 404
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secret")
+    with pytest.raises(HTTPException) as exc:
+        _check_token("Bearer wrong")
+    assert exc.value.status_code == 401
+    _check_token("Bearer secret")
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer sécret", "secret"])
+def test_metrics_token_rejects_missing_or_malformed_header(monkeypatch, authorization):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "secret")
+    with pytest.raises(HTTPException) as exc:
+        _check_token(authorization)
+    assert exc.value.status_code == 401
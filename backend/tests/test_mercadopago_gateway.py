@@ -0,0 +1,79 @@
+import pytest
+
+from app.services.mercadopago_gateway import CircuitBreaker, MercadoPagoError, MercadoPagoUnavailable
+from tests.fake_mercadopago import FakeMercadoPago
+
+
+async def test_retries_transient_errors_with_same_idempotency_key():
+    fake = FakeMercadoPago()
+    fake.fail_next(2, status_code=503)
+    gateway = fake.gateway(max_retries=3)
+
+    response = await gateway.post("/preapproval_plan", json={"reason": "Plano Pro"})
+
+    assert response.status_code == 201
+    assert len(fake.preapproval_plans) == 1
+    keys = {req["idempotency_key"] for req in fake.requests}
+    assert len(fake.requests) == 3 and len(keys) == 1 and None not in keys
+    await gateway.close()
+
+
+async def test_client_errors_are_returned_without_retry():
+    fake = FakeMercadoPago()
+    gateway = fake.gateway()
+
+    with pytest.raises(MercadoPagoError) as exc:
+        await gateway.get_preapproval("nao-existe")
+
+    assert exc.value.status_code == 404
+    assert len(fake.requests) == 1
+    await gateway.close()
+
+
+async def test_cancel_preapproval():
+    fake = FakeMercadoPago()
+    fake.preapprovals["pre-1"] = {"id": "pre-1", "status": "authorized"}
+    gateway = fake.gateway()
+
+    assert await gateway.cancel_preapproval("pre-1")
+    assert fake.preapprovals["pre-1"]["status"] == "cancelled"
+    assert fake.requests[0]["authorization"] == "Bearer TEST-token"
+    await gateway.close()
+
+
+async def test_circuit_breaker_opens_after_consecutive_failures():
+    fake = FakeMercadoPago()
+    gateway = fake.gateway(max_retries=0)
+    gateway.breaker.threshold = 2
+    fake.fail_next(2, status_code=500)
+
+    for _ in range(2):
+        with pytest.raises(MercadoPagoError):
+            await gateway.get("/preapproval/pre-1")
+
+    with pytest.raises(MercadoPagoUnavailable):
+        await gateway.get("/preapproval/pre-1")
+    assert len(fake.requests) == 2
+
+    # Meia-abertura: uma chamada de teste bem-sucedida fecha o circuito
+    gateway.breaker.reset_seconds = 0
+    fake.preapprovals["pre-1"] = {"id": "pre-1", "status": "authorized"}
+    assert (await gateway.get_preapproval("pre-1"))["status"] == "authorized"
+    assert gateway.breaker.state == "closed"
+    await gateway.close()
+
+
+def test_half_open_breaker_lets_a_single_probe_through():
+    breaker = CircuitBreaker(threshold=1, reset_seconds=60)
+    breaker.record_failure()
+    breaker.opened_at -= 60
+
+    assert breaker.state == "half_open"
+    assert [breaker.allow() for _ in range(3)] == [True, False, False]
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
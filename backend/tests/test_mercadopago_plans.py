@@ -0,0 +1,45 @@
+import time
+
+from app.config import settings
+from app.services.mercadopago_plans import (
+    CachedPlan,
+    MercadoPagoPlanCache,
+    checkout_url,
+    definition_key,
+    plan_definition,
+)
+
+
+def test_definition_key_changes_with_price_only():
+    basic = definition_key(plan_definition("Plano Básico - ContrataPro", 29.9))
+
+    assert basic == definition_key(plan_definition("Plano Básico - ContrataPro", 29.9))
+    assert basic != definition_key(plan_definition("Plano Básico - ContrataPro", 34.9))
+
+
+def test_shared_plan_has_no_payer_data(monkeypatch):
+    monkeypatch.setattr(settings, "FRONTEND_URL", "https://contratapro.com.br")
+
+    definition = plan_definition("Plano Pro - ContrataPro", 49.9)
+
+    assert "payer_email" not in definition and "external_reference" not in definition
+    assert definition["back_url"] == "https://contratapro.com.br/subscription/callback"
+
+
+async def test_memory_hit_skips_database_and_mercadopago():
+    cache = MercadoPagoPlanCache()
+    key = definition_key(plan_definition("Plano Pro - ContrataPro", 49.9))
+    cache._memory[key] = (CachedPlan("plan-1", "https://mp/checkout"), time.monotonic())
+
+    plan = await cache.get_or_create("Plano Pro - ContrataPro", 49.9, subscription_plan_id=3)
+
+    assert plan == CachedPlan("plan-1", "https://mp/checkout")
+
+
+def test_checkout_url_carries_the_user_id():
+    init_point = "https://www.mercadopago.com.br/subscriptions/checkout?preapproval_plan_id=plan-1"
+
+    url = checkout_url(init_point, 42)
+
+    assert url == f"{init_point}&external_reference=42"
+    assert checkout_url(url, 7).endswith("preapproval_plan_id=plan-1&external_reference=7")
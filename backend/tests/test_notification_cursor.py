@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.future import select
+
+from app.models import Notification
+from app.routers.notifications import NOTIFICATION_SORT
+from app.services.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+def test_cursor_roundtrip_keeps_position():
+    created_at = datetime(2026, 3, 10, 9, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor("created_at", created_at, 42)
+    assert decode_cursor(cursor, "created_at", NOTIFICATION_SORT) == (created_at, 42)
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor("nao-e-um-cursor", "created_at", NOTIFICATION_SORT)
+
+
+def test_cursor_page_starts_after_last_notification():
+    created_at = datetime(2026, 3, 10, 9, 30, tzinfo=timezone.utc)
+    query = keyset_page(
+        select(Notification.id), NOTIFICATION_SORT, Notification.id, True, 10, (created_at, 42)
+    )
+    sql = str(query)
+
+    assert "(notifications.created_at, notifications.id) < (" in sql
+    assert "ORDER BY notifications.created_at DESC, notifications.id DESC" in sql
@@ -0,0 +1,120 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.models import EmailOutbox
+from app.services.notifications.notification_service import NotificationService
+from app.services.notifications.digest import group_ready_digests, is_urgent
+from app.services.notifications.dispatcher import notifications_of
+from app.services.notifications.templates import email_templates
+
+
+def _appointment(starts_at: datetime):
+    return SimpleNamespace(date=starts_at.date(), start_time=starts_at.time())
+
+
+def test_cancellation_within_24h_is_urgent():
+    now = datetime(2026, 3, 10, 9, 0)
+    appt = _appointment(now + timedelta(hours=5))
+    assert is_urgent("appointment_cancelled", appt, now=now)
+
+
+def test_cancellation_far_ahead_is_not_urgent():
+    now = datetime(2026, 3, 10, 9, 0)
+    appt = _appointment(now + timedelta(days=3))
+    assert not is_urgent("appointment_cancelled", appt, now=now)
+
+
+def test_new_appointment_is_never_urgent():
+    now = datetime(2026, 3, 10, 9, 0)
+    appt = _appointment(now + timedelta(hours=1))
+    assert not is_urgent("new_appointment", appt, now=now)
+
+
+def test_group_ready_digests_waits_for_full_window():
+    now = datetime(2026, 3, 10, 12, 0)
+    window = timedelta(minutes=15)
+    queued = [
+        SimpleNamespace(user_id=1, created_at=now - timedelta(minutes=20)),
+        SimpleNamespace(user_id=1, created_at=now - timedelta(minutes=2)),
+        SimpleNamespace(user_id=2, created_at=now - timedelta(minutes=5)),
+    ]
+
+    ready = group_ready_digests(queued, window, now)
+
+    assert [user_id for user_id, _ in ready] == [1]
+    assert len(ready[0][1]) == 2
+
+
+def test_digest_template_counts_items():
+    subject, plain_text, html = email_templates.notification_digest(
+        recipient_name="Ana",
+        items=[("Novo Agendamento - Corte", "Cliente: Joao"), ("Novo Agendamento - Barba", "Cliente: Pedro")],
+    )
+    assert "2 novas atualizações" in subject
+    assert "Cliente: Pedro" in plain_text
+    assert "Novo Agendamento - Corte" in html
+
+
+async def test_digest_goes_through_outbox_and_stays_pending(monkeypatch):
+    created = datetime.now(timezone.utc) - timedelta(hours=2)
+    queued = [
+        SimpleNamespace(id=7, user_id=1, created_at=created, title="A", message="a",
+                        status="queued", digest_key=None),
+        SimpleNamespace(id=8, user_id=1, created_at=created, title="B", message="b",
+                        status="queued", digest_key=None),
+    ]
+    user = SimpleNamespace(id=1, name="Ana", email="ana@x.com")
+    added = []
+
+    class _Result:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def scalars(self):
+            return self
+
+        def all(self):
+            return self.rows
+
+    class _Session:
+        def __init__(self):
+            self.results = [_Result(queued), _Result([user])]
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, statement):
+            return self.results.pop(0)
+
+        def add(self, obj):
+            added.append(obj)
+
+        async def commit(self):
+            pass
+
+    async def fail_send(**kwargs):
+        raise AssertionError("digest nao deve ir direto ao provedor")
+
+    service = NotificationService()
+    monkeypatch.setattr(service.email_adapter, "send", fail_send)
+    monkeypatch.setattr(
+        sys.modules[NotificationService.__module__], "JobsSessionLocal", _Session
+    )
+
+    assert await service.send_pending_digests() == 1
+
+    assert [n.status for n in queued] == ["pending", "pending"]
+    assert queued[0].digest_key and queued[0].digest_key == queued[1].digest_key
+    assert len(added) == 1 and isinstance(added[0], EmailOutbox)
+    assert added[0].to_email == "ana@x.com"
+    assert added[0].notification_id == 7
+
+
+def test_dispatcher_result_covers_the_whole_digest():
+    sql = str(notifications_of([7]).compile())
+    assert "notifications.id IN" in sql
+    assert "notifications.digest_key IN (SELECT notifications.digest_key" in sql
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from app.config import settings
+from app.services.notifications import retention
+from app.services.notifications.retention import compress_message, decompress_message
+
+
+def _row(notification_id, status):
+    return {
+        "id": notification_id,
+        "user_id": 1,
+        "appointment_id": None,
+        "type": "new_appointment",
+        "channel": "email",
+        "status": status,
+        "title": "Novo agendamento",
+        "message": "Mensagem",
+        "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        "sent_at": None,
+        "error_message": None,
+        "digest_key": None,
+    }
+
+
+def test_archived_message_roundtrip():
+    message = "Olá Ana,\n\nNovo agendamento: Corte de cabelo às 09:00.\n" * 20
+    data = compress_message(message)
+    assert len(data) < len(message.encode("utf-8"))
+    assert decompress_message(data) == message
+
+
+async def test_archive_moves_batches_and_stops_on_short_batch(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_ARCHIVE_BATCH_SIZE", 2)
+    now = datetime(2026, 3, 20, tzinfo=timezone.utc)
+    batches = [
+        [_row(1, "sent"), _row(2, "error")],
+        [_row(3, "pending")],
+    ]
+    events = []
+
+    class _Result:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def mappings(self):
+            return self
+
+        def all(self):
+            return self.rows
+
+    class _Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, statement):
+            sql = str(statement.compile(dialect=postgresql.dialect()))
+            if sql.startswith("SELECT"):
+                events.append(("select", sql))
+                return _Result(batches.pop(0))
+            if sql.startswith("INSERT"):
+                params = statement.compile(dialect=postgresql.dialect()).params
+                events.append(("insert", sorted(v for k, v in params.items() if k.startswith("id_"))))
+            else:
+                events.append(("delete", sql))
+            return _Result([])
+
+        async def commit(self):
+            events.append(("commit", None))
+
+    monkeypatch.setattr(retention, "JobsSessionLocal", _Session)
+
+    assert await retention.archive_old_notifications(now=now) == 3
+
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["select", "insert", "delete", "commit"] * 2
+    select_sql = events[0][1]
+    assert "notifications.status != %(status_1)s" in select_sql
+    assert "FOR UPDATE SKIP LOCKED" in select_sql
+    assert events[1][1] == [1, 2] and events[5][1] == [3]
+    assert "DELETE FROM notifications WHERE notifications.id IN" in events[2][1]
+
+
+async def test_archive_excludes_queued_and_uses_retention_cutoff(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_RETENTION_DAYS", 90)
+    now = datetime(2026, 3, 20, tzinfo=timezone.utc)
+    selects = []
+
+    class _Result:
+        def mappings(self):
+            return self
+
+        def all(self):
+            return []
+
+    class _Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, statement):
+            selects.append(statement.compile(dialect=postgresql.dialect()).params)
+            return _Result()
+
+    monkeypatch.setattr(retention, "JobsSessionLocal", _Session)
+
+    assert await retention.archive_old_notifications(now=now) == 0
+    assert len(selects) == 1
+    assert selects[0]["status_1"] == "queued"
+    assert selects[0]["created_at_1"] == now - timedelta(days=90)
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.models import User
+from app.services.ranking import _set_initial_score, decay_factor, initial_score, ranking_score, status_deltas
+
+NOW = datetime(2026, 3, 26, 12, tzinfo=timezone.utc)
+
+
+def test_bayesian_average_needs_volume_to_beat_the_prior():
+    single_five = ranking_score(5, 1, NOW, 0, 0, now=NOW)
+    many_reviews = ranking_score(4.8 * 200, 200, NOW, 0, 0, now=NOW)
+
+    assert many_reviews > single_five
+
+
+def test_old_reviews_lose_weight():
+    half_life = timedelta(days=settings.RANKING_HALF_LIFE_DAYS)
+    recent = ranking_score(4.9 * 50, 50, NOW, 0, 0, now=NOW)
+    stale = ranking_score(4.9 * 50, 50, NOW - 4 * half_life, 0, 0, now=NOW)
+
+    assert decay_factor(half_life.total_seconds()) == 0.5
+    assert stale < recent
+
+
+def test_completion_rate_breaks_ties():
+    reliable = ranking_score(45, 10, NOW, 20, 0, now=NOW)
+    flaky = ranking_score(45, 10, NOW, 10, 10, now=NOW)
+
+    assert reliable > flaky
+
+
+def test_status_deltas():
+    assert status_deltas("scheduled", "completed") == {"appointments_completed": 1}
+    assert status_deltas("completed", "cancelled") == {
+        "appointments_completed": -1,
+        "appointments_cancelled": 1,
+    }
+    assert status_deltas("cancelled", "suspended") == {}
+
+
+def test_new_users_start_at_the_prior_score(monkeypatch):
+    monkeypatch.setattr(settings, "RANKING_PRIOR_MEAN", 4.0)
+    monkeypatch.setattr(settings, "RANKING_COMPLETION_WEIGHT", 0.2)
+    user = User(is_professional=True)
+
+    _set_initial_score(None, None, user)
+
+    # media prior, com taxa de conclusao suavizada de 1/2
+    assert user.ranking_score == initial_score() == 3.6
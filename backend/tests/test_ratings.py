@@ -0,0 +1,81 @@
+from app.services import ratings as ratings_module
+from app.services.ratings import average, distribution, find_drift, ratings
+
+
+def test_distribution_pads_missing_stars():
+    assert distribution([1, 0, 2, 5, 9]) == {"1": 1, "2": 0, "3": 2, "4": 5, "5": 9}
+    assert distribution(None) == {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0}
+
+
+def test_average_from_running_sum():
+    assert average(14, 3) == 4.67
+    assert average(0, 0) is None
+
+
+def test_find_drift_only_reports_diverging_professionals():
+    rows = [
+        # id, total, soma, histograma, total real, soma real, 1..5 reais
+        (1, 2, 9, [0, 0, 0, 1, 1], 2, 9, 0, 0, 0, 1, 1),
+        (2, 2, 9, [0, 0, 0, 1, 1], 1, 5, 0, 0, 0, 0, 1),
+        (3, 1, 3, [0, 0, 1, 0, 0], None, None, None, None, None, None, None),
+    ]
+
+    corrections = find_drift(rows)
+
+    assert corrections == [
+        {"id": 2, "total_reviews": 1, "rating_sum": 5, "rating_histogram": [0, 0, 0, 0, 1], "average_rating": 5.0},
+        {"id": 3, "total_reviews": 0, "rating_sum": 0, "rating_histogram": [0, 0, 0, 0, 0], "average_rating": None},
+    ]
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class _Session:
+    def __init__(self, log, results):
+        self.log = log
+        self.results = results
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        self.log.append((str(statement), params))
+        return self.results.pop(0) if self.results else _Result([])
+
+    async def commit(self):
+        self.log.append(("COMMIT", None))
+
+
+async def test_verify_locks_the_batch_before_reading_and_correcting(monkeypatch):
+    log = []
+    results = [
+        _Result([7, 8]),
+        _Result([
+            (7, 2, 9, [0, 0, 0, 1, 1], 2, 9, 0, 0, 0, 1, 1),
+            (8, 2, 9, [0, 0, 0, 1, 1], 3, 14, 0, 0, 0, 1, 2),
+        ]),
+    ]
+    monkeypatch.setattr(ratings_module, "JobsSessionLocal", lambda: _Session(log, results))
+
+    assert await ratings.verify() == 1
+
+    lock, read, write, commit = log
+    assert "FOR UPDATE" in lock[0]
+    assert "reviews" in read[0] and "FOR UPDATE" not in read[0]
+    assert write[1] == [{
+        "id": 8, "total_reviews": 3, "rating_sum": 14,
+        "rating_histogram": [0, 0, 0, 1, 2], "average_rating": 4.67,
+    }]
+    assert commit[0] == "COMMIT"
@@ -0,0 +1,27 @@
+from datetime import date, time
+
+from app.services.realtime import RealtimeBroker
+
+
+async def test_publish_reaches_only_subscribed_user():
+    broker = RealtimeBroker()
+
+    async with broker.subscribe(1) as queue_a, broker.subscribe(2) as queue_b:
+        await broker.publish(1, "appointment", {"date": date(2026, 3, 10), "start_time": time(9, 0)})
+
+        message = queue_a.get_nowait()
+        assert message == {
+            "event": "appointment",
+            "data": {"date": "2026-03-10", "start_time": "09:00:00"},
+        }
+        assert queue_b.empty()
+
+
+async def test_subscription_is_removed_on_exit():
+    broker = RealtimeBroker()
+
+    async with broker.subscribe(1):
+        pass
+
+    await broker.publish(1, "notification", {"id": 1})
+    assert broker._subscribers == {}
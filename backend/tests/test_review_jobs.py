@@ -0,0 +1,31 @@
+from datetime import date
+from types import SimpleNamespace
+
+from app.config import settings
+from app.services.review_jobs import ReviewJobsService
+
+
+def test_review_email_uses_token_link_and_defaults(monkeypatch):
+    monkeypatch.setattr(settings, "FRONTEND_URL", "https://contratapro.com.br/")
+    row = SimpleNamespace(
+        id=10,
+        date=date(2026, 3, 9),
+        client_name="Ana",
+        client_email="ana@x.com",
+        professional_name=None,
+        service_title=None,
+    )
+
+    to_email, subject, plain_text, html = ReviewJobsService()._review_email(row, "tok-123")
+
+    assert to_email == "ana@x.com"
+    assert "https://contratapro.com.br/avaliar/tok-123" in plain_text
+    assert "Profissional" in plain_text
+
+
+async def test_empty_chunk_creates_no_tokens():
+    class _Session:
+        async def execute(self, statement):
+            raise AssertionError("não deveria consultar")
+
+    assert await ReviewJobsService()._create_tokens_and_enqueue_emails(_Session(), []) == 0
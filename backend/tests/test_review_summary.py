@@ -0,0 +1,61 @@
+from app.config import settings
+from app.schemas import ReviewsSummaryResponse
+from app.services import review_summary
+from app.services.realtime import RealtimeBroker
+from app.services.review_summary import ReviewSummaryCache
+
+
+def _summary(total):
+    return ReviewsSummaryResponse(average_rating=4.5, total_reviews=total)
+
+
+async def test_cached_summary_is_served_without_database():
+    cache = ReviewSummaryCache()
+    cache._store(1, _summary(3))
+
+    summary = await cache.get(db=None, professional_id=1)
+
+    assert summary.total_reviews == 3
+
+
+async def test_expired_or_invalidated_summary_is_reloaded(monkeypatch):
+    cache = ReviewSummaryCache()
+    loads = []
+
+    async def fake_load(db, professional_id):
+        loads.append(professional_id)
+        return _summary(len(loads))
+
+    monkeypatch.setattr(cache, "_load", fake_load)
+    cache._store(1, _summary(0))
+    cache.invalidate(1)
+    assert (await cache.get(None, 1)).total_reviews == 1
+
+    monkeypatch.setattr(settings, "REVIEW_SUMMARY_TTL_SECONDS", 0)
+    assert (await cache.get(None, 1)).total_reviews == 2
+    assert loads == [1, 1]
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    monkeypatch.setattr(settings, "REVIEW_SUMMARY_CACHE_SIZE", 2)
+    cache = ReviewSummaryCache()
+
+    for professional_id in (1, 2, 3):
+        cache._store(professional_id, _summary(professional_id))
+
+    assert list(cache._entries) == [2, 3]
+
+
+async def test_invalidation_is_broadcast_to_the_registered_caches(monkeypatch):
+    broker = RealtimeBroker()
+    monkeypatch.setattr(review_summary, "realtime_broker", broker)
+    sender, other_worker = ReviewSummaryCache(), ReviewSummaryCache()
+    broker.add_handler(review_summary.INVALIDATION_TOPIC, other_worker.invalidate_many)
+    for cache in (sender, other_worker):
+        cache._store(1, _summary(3))
+        cache._store(2, _summary(5))
+
+    await sender.broadcast_invalidation([1])
+
+    assert list(sender._entries) == [2]
+    assert list(other_worker._entries) == [2]
@@ -0,0 +1,69 @@
+from app.config import settings
+from app.services.subscription_jobs import SubscriptionJobsService
+
+
+class _Session:
+    def __init__(self, events):
+        self.events = events
+
+    def add(self, obj):
+        self.events.append(obj.to_email)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        self.events.append("commit")
+
+
+async def test_chunks_enqueue_emails_in_same_transaction_and_stop_on_short_chunk(monkeypatch):
+    monkeypatch.setattr(settings, "SUBSCRIPTION_JOBS_CHUNK_SIZE", 2)
+    events = []
+    chunks = [
+        [(1, ("a@x.com", "s", "t", "h")), (2, ("b@x.com", "s", "t", "h"))],
+        [(3, ("c@x.com", "s", "t", "h"))],
+    ]
+
+    jobs = SubscriptionJobsService()
+
+    async def get_session():
+        return _Session(events)
+
+    async def process_chunk(db):
+        return chunks.pop(0)
+
+    monkeypatch.setattr(jobs, "get_session", get_session)
+
+    total = await jobs._process_in_chunks(process_chunk)
+
+    assert total == 3
+    assert events == ["a@x.com", "b@x.com", "commit", "c@x.com", "commit"]
+
+
+async def test_reminder_chunk_only_locks_subscriptions_with_plan_and_user(monkeypatch):
+    statements = []
+
+    class _Result:
+        def all(self):
+            return []
+
+    class _ReminderSession(_Session):
+        async def execute(self, statement, *args):
+            statements.append(str(statement.compile()))
+            return _Result()
+
+    jobs = SubscriptionJobsService()
+
+    async def get_session():
+        return _ReminderSession([])
+
+    monkeypatch.setattr(jobs, "get_session", get_session)
+
+    await jobs.send_renewal_reminders()
+
+    due = statements[0].split("FOR UPDATE SKIP LOCKED")[0]
+    assert "subscriptions.plan_id IS NOT NULL" in due
+    assert "EXISTS (SELECT" in due and "users.id = subscriptions.professional_id" in due
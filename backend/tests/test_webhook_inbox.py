@@ -0,0 +1,102 @@
+import hashlib
+import hmac
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers.subscriptions import mercadopago_webhook
+from app.models import Subscription, User
+from app.services.billing import billing
+from app.services.webhook_inbox import parse_event, reference_user_id, verify_signature, webhook_processor
+
+
+def test_redeliveries_share_dedupe_key():
+    body = {"id": 12345, "type": "payment", "action": "payment.created", "data": {"id": "999"}}
+
+    first = parse_event(body)
+    again = parse_event(dict(body))
+
+    assert first.dedupe_key == again.dedupe_key == "payment:12345"
+    assert first.resource_id == "999"
+
+
+def test_event_without_notification_id_uses_resource_and_action():
+    event = parse_event({"type": "preapproval", "action": "updated", "data": {"id": "abc"}})
+
+    assert event.dedupe_key == "preapproval:abc:updated"
+
+
+def test_unsupported_or_incomplete_events_are_ignored():
+    assert parse_event({"type": "merchant_order", "data": {"id": "1"}}) is None
+    assert parse_event({"type": "payment", "data": {}}) is None
+    assert parse_event({"type": "payment", "data": "999"}) is None
+
+
+class _Request:
+    def __init__(self, body):
+        self.body = body
+
+    async def json(self):
+        return self.body
+
+
+@pytest.mark.parametrize("body", [[{"type": "payment"}], "payment", 42, None])
+async def test_webhook_rejects_json_that_is_not_an_object(body):
+    with pytest.raises(HTTPException) as exc:
+        await mercadopago_webhook(_Request(body), db=None)
+
+    assert exc.value.status_code == 400
+
+
+def test_signature_validation():
+    secret = "segredo"
+    manifest = "id:abc123;request-id:req-1;ts:1700000000;"
+    v1 = hmac.new(secret.encode(), manifest.encode(), hashlib.sha256).hexdigest()
+    header = f"ts=1700000000,v1={v1}"
+
+    assert verify_signature(secret, header, "req-1", "ABC123")
+    assert not verify_signature(secret, header, "req-2", "ABC123")
+    assert not verify_signature(secret, None, "req-1", "ABC123")
+
+
+def test_reference_user_id():
+    assert reference_user_id("42") == 42
+    assert reference_user_id("42_upgrade") == 42
+    assert reference_user_id(None) is None
+    assert reference_user_id("abc") is None
+
+
+async def test_shared_plan_checkout_is_linked_by_plan_and_external_reference(monkeypatch):
+    subscription = Subscription(id=5, mercadopago_preapproval_id="plan-1", status="pending")
+    user = User(id=42, email="conta@contratapro.com.br")
+    statements = []
+
+    class _Result:
+        def first(self):
+            return (subscription, user, None)
+
+    class _Session:
+        async def execute(self, statement):
+            statements.append(statement.compile())
+            return _Result()
+
+    async def load(db, preapproval_id):
+        return None
+
+    monkeypatch.setattr(billing, "load", load)
+
+    aggregate = await webhook_processor._find_subscription(
+        _Session(),
+        "preapproval-9",
+        {
+            "preapproval_plan_id": "plan-1",
+            "external_reference": "42",
+            "payer_email": "outro-email@gmail.com",
+        }
+    )
+
+    assert aggregate.subscription is subscription
+    assert subscription.mercadopago_preapproval_id == "preapproval-9"
+    where = str(statements[0]).split("WHERE")[1]
+    assert "users.id =" in where and "lower(users.email)" not in where
+    assert {"plan-1", 42} <= set(statements[0].params.values())
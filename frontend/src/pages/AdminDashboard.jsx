@@ -627,6 +627,12 @@ export default function AdminDashboard() {
     const [professionals, setProfessionals] = useState([]);
     const [clients, setClients] = useState([]);
     const [subscriptions, setSubscriptions] = useState([]);
+    // Listagens paginadas por cursor: total (da primeira pagina) e cursor da proxima
+    const [listings, setListings] = useState({
+        professionals: { total: null, nextCursor: null, loading: false },
+        clients: { total: null, nextCursor: null, loading: false },
+        subscriptions: { total: null, nextCursor: null, loading: false }
+    });
     const [loading, setLoading] = useState(true);
     const [userName, setUserName] = useState('');
     const [activeTab, setActiveTab] = useState('overview');
@@ -682,21 +688,12 @@ export default function AdminDashboard() {
         const token = localStorage.getItem('token');
 
         try {
-            const [userRes, dashboardRes, professionalsRes, clientsRes, subscriptionsRes] = await Promise.all([
+            const [userRes, dashboardRes] = await Promise.all([
                 fetch(`${API_URL}/auth/me`, {
                     headers: { 'Authorization': `Bearer ${token}` }
                 }),
                 fetch(`${API_URL}/admin/dashboard`, {
                     headers: { 'Authorization': `Bearer ${token}` }
-                }),
-                fetch(`${API_URL}/admin/professionals`, {
-                    headers: { 'Authorization': `Bearer ${token}` }
-                }),
-                fetch(`${API_URL}/admin/clients`, {
-                    headers: { 'Authorization': `Bearer ${token}` }
-                }),
-                fetch(`${API_URL}/admin/subscriptions`, {
-                    headers: { 'Authorization': `Bearer ${token}` }
                 })
             ]);
 
@@ -709,29 +706,88 @@ export default function AdminDashboard() {
                 const data = await dashboardRes.json();
                 setDashboardData(data);
             }
+        } catch (error) {
+            toast.error('Erro ao carregar dados do dashboard');
+            console.error(error);
+        } finally {
+            setLoading(false);
+        }
+    };
 
-            if (professionalsRes.ok) {
-                const data = await professionalsRes.json();
-                setProfessionals(data.professionals);
-            }
+    // Busca uma pagina da listagem (filtros aplicados no servidor).
+    // Sem cursor substitui a lista; com cursor acrescenta a proxima pagina
+    const fetchListing = async (name, setItems, filters, cursor = null) => {
+        const token = localStorage.getItem('token');
+        if (!token) return;
 
-            if (clientsRes.ok) {
-                const data = await clientsRes.json();
-                setClients(data.clients);
-            }
+        const params = new URLSearchParams({ size: '50' });
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value) params.append(key, value);
+        });
+        if (cursor) params.append('cursor', cursor);
 
-            if (subscriptionsRes.ok) {
-                const data = await subscriptionsRes.json();
-                setSubscriptions(data.subscriptions);
+        setListings(prev => ({ ...prev, [name]: { ...prev[name], loading: true } }));
+        try {
+            const res = await fetch(`${API_URL}/admin/${name}?${params}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!res.ok) {
+                toast.error('Erro ao carregar listagem');
+                return;
             }
+
+            const data = await res.json();
+            setItems(prev => cursor ? [...prev, ...data[name]] : data[name]);
+            setListings(prev => ({
+                ...prev,
+                [name]: {
+                    ...prev[name],
+                    // total so vem na primeira pagina
+                    total: cursor ? prev[name].total : data.total,
+                    nextCursor: data.next_cursor
+                }
+            }));
         } catch (error) {
-            toast.error('Erro ao carregar dados do dashboard');
+            toast.error('Erro ao carregar listagem');
             console.error(error);
         } finally {
-            setLoading(false);
+            setListings(prev => ({ ...prev, [name]: { ...prev[name], loading: false } }));
         }
     };
 
+    const fetchProfessionals = (cursor = null) => fetchListing(
+        'professionals', setProfessionals, { status: statusFilter, state: stateFilter }, cursor
+    );
+
+    const fetchClients = (cursor = null) => fetchListing('clients', setClients, {}, cursor);
+
+    const fetchSubscriptions = (cursor = null) => fetchListing(
+        'subscriptions', setSubscriptions, { status: subscriptionStatusFilter }, cursor
+    );
+
+    useEffect(() => {
+        fetchProfessionals();
+    }, [statusFilter, stateFilter]);
+
+    useEffect(() => {
+        fetchClients();
+    }, []);
+
+    useEffect(() => {
+        fetchSubscriptions();
+    }, [subscriptionStatusFilter]);
+
+    const renderLoadMore = (name, loadMore) => listings[name].nextCursor && (
+        <div style={{ textAlign: 'center', marginTop: '1.5rem' }}>
+            <ActionButton
+                disabled={listings[name].loading}
+                onClick={() => loadMore(listings[name].nextCursor)}
+            >
+                {listings[name].loading ? 'Carregando...' : 'Carregar mais'}
+            </ActionButton>
+        </div>
+    );
+
     const handleSuspendProfessional = async (professionalId, professionalName) => {
         const token = localStorage.getItem('token');
 
@@ -744,6 +800,7 @@ export default function AdminDashboard() {
             if (res.ok) {
                 toast.success(`Profissional ${professionalName} suspenso com sucesso`);
                 fetchAdminData();
+                fetchProfessionals();
             } else {
                 toast.error('Erro ao suspender profissional');
             }
@@ -765,6 +822,7 @@ export default function AdminDashboard() {
             if (res.ok) {
                 toast.success(`Profissional ${professionalName} reativado com sucesso`);
                 fetchAdminData();
+                fetchProfessionals();
             } else {
                 toast.error('Erro ao reativar profissional');
             }
@@ -990,12 +1048,6 @@ export default function AdminDashboard() {
         }
     };
 
-    const filteredProfessionals = professionals.filter(prof => {
-        if (statusFilter && prof.subscription_status !== statusFilter) return false;
-        if (stateFilter && prof.state !== stateFilter) return false;
-        return true;
-    });
-
     if (loading) {
         return (
             <AdminContainer>
@@ -1381,13 +1433,13 @@ export default function AdminDashboard() {
                                     <MapPin size={18} />
                                     <select value={stateFilter} onChange={(e) => setStateFilter(e.target.value)}>
                                         <option value="">Todos os Estados</option>
-                                        {Array.from(new Set(professionals.map(p => p.state))).sort().map(state => (
+                                        {(dashboardData?.professionals_by_state || []).map(item => item.state).sort().map(state => (
                                             <option key={state} value={state}>{state}</option>
                                         ))}
                                     </select>
                                 </div>
                                 <div style={{ marginLeft: 'auto', color: 'var(--text-secondary)', fontSize: '0.875rem' }}>
-                                    {filteredProfessionals.length} profissionais encontrados
+                                    {listings.professionals.total ?? professionals.length} profissionais encontrados
                                 </div>
                             </FilterBar>
 
@@ -1404,7 +1456,7 @@ export default function AdminDashboard() {
                                     </tr>
                                 </thead>
                                 <tbody>
-                                    {filteredProfessionals.map(prof => (
+                                    {professionals.map(prof => (
                                         <tr key={prof.id}>
                                             <td style={{ fontWeight: 600 }}>{prof.name}</td>
                                             <td style={{ color: 'var(--text-secondary)' }}>{prof.email}</td>
@@ -1435,6 +1487,7 @@ export default function AdminDashboard() {
                                     ))}
                                 </tbody>
                             </Table>
+                            {renderLoadMore('professionals', fetchProfessionals)}
                         </Card>
                     </>
                 )}
@@ -1444,7 +1497,7 @@ export default function AdminDashboard() {
                         <Card>
                             <h2>Clientes Cadastrados</h2>
                             <p style={{ color: 'var(--text-secondary)', marginBottom: '1.5rem' }}>
-                                Total de {clients.length} clientes cadastrados na plataforma
+                                Total de {listings.clients.total ?? clients.length} clientes cadastrados na plataforma
                             </p>
                             <Table>
                                 <thead>
@@ -1468,6 +1521,7 @@ export default function AdminDashboard() {
                                     ))}
                                 </tbody>
                             </Table>
+                            {renderLoadMore('clients', fetchClients)}
                         </Card>
                     </>
                 )}
@@ -1489,7 +1543,7 @@ export default function AdminDashboard() {
                                     </select>
                                 </div>
                                 <div style={{ marginLeft: 'auto', color: 'var(--text-secondary)', fontSize: '0.875rem' }}>
-                                    {subscriptions.filter(sub => !subscriptionStatusFilter || sub.status === subscriptionStatusFilter).length} assinaturas encontradas
+                                    {listings.subscriptions.total ?? subscriptions.length} assinaturas encontradas
                                 </div>
                             </FilterBar>
 
@@ -1508,7 +1562,6 @@ export default function AdminDashboard() {
                                 </thead>
                                 <tbody>
                                     {subscriptions
-                                        .filter(sub => !subscriptionStatusFilter || sub.status === subscriptionStatusFilter)
                                         .map(sub => (
                                             <tr key={sub.id}>
                                                 <td style={{ fontWeight: 600 }}>{sub.professional_name || '-'}</td>
@@ -1541,7 +1594,9 @@ export default function AdminDashboard() {
                                 </tbody>
                             </Table>
 
-                            {subscriptions.filter(sub => !subscriptionStatusFilter || sub.status === subscriptionStatusFilter).length === 0 && (
+                            {renderLoadMore('subscriptions', fetchSubscriptions)}
+
+                            {subscriptions.length === 0 && !listings.subscriptions.loading && (
                                 <div style={{ textAlign: 'center', padding: '3rem', color: 'var(--text-secondary)' }}>
                                     <DollarSign size={48} style={{ opacity: 0.3, marginBottom: '1rem' }} />
                                     <p>Nenhuma assinatura encontrada</p>
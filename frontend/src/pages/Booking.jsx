@@ -871,6 +871,8 @@ export default function Booking() {
     const [reviews, setReviews] = useState([]);
     const [reviewsPage, setReviewsPage] = useState(1);
     const [reviewsPages, setReviewsPages] = useState(0);
+    // Cursor de cada pagina de avaliacoes ja visitada (pagina 1 nao tem cursor)
+    const [reviewsCursors, setReviewsCursors] = useState([null]);
 
     // Buscar dados do cliente logado (incluindo CEP)
     useEffect(() => {
@@ -933,6 +935,7 @@ export default function Booking() {
                         setReviews(reviewData.items || []);
                         setReviewsPage(1);
                         setReviewsPages(reviewData.pages || 0);
+                        setReviewsCursors([null, reviewData.next_cursor]);
                     }
                 }
             } catch (e) { console.error(e); }
@@ -945,12 +948,19 @@ export default function Booking() {
     const loadMoreReviews = async (page) => {
         if (!proId) return;
         try {
-            const res = await fetch(`${API_URL}/reviews/providers/${proId}/reviews?page=${page}&size=5`);
+            const cursor = reviewsCursors[page - 1];
+            const query = cursor ? `cursor=${encodeURIComponent(cursor)}` : `page=${page}`;
+            const res = await fetch(`${API_URL}/reviews/providers/${proId}/reviews?${query}&size=5`);
             if (res.ok) {
                 const data = await res.json();
                 setReviews(data.items || []);
                 setReviewsPage(page);
                 setReviewsPages(data.pages || 0);
+                setReviewsCursors(prev => {
+                    const next = prev.slice(0, page);
+                    next[page] = data.next_cursor;
+                    return next;
+                });
             }
         } catch (e) { console.error(e); }
     };